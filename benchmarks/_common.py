@@ -0,0 +1,51 @@
+"""
+Shared helpers for the Tenda Beli benchmark scripts.
+
+The integration package imports Home Assistant from its ``__init__``, so the
+benchmarks load the component modules through a bare package object that
+skips it. Results are printed as one JSON object per line.
+
+"""
+import json
+import sys
+import time
+import types
+from pathlib import Path
+from typing import Any, Callable
+
+COMPONENT_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "tendabeli"
+
+
+def load_component() -> types.ModuleType:
+    """Register the component directory as the ``tendabeli`` package."""
+    package = sys.modules.get("tendabeli")
+    if package is None:
+        package = types.ModuleType("tendabeli")
+        package.__path__ = [str(COMPONENT_DIR)]
+        sys.modules["tendabeli"] = package
+    return package
+
+
+def frame(packet_type: int, payload: bytes = b"", flags: int = 0) -> bytes:
+    """Build a raw plug frame with the standard 16-byte header."""
+    return (
+        bytes((0x24, 0x00, 0x03, 0x00, flags, packet_type))
+        + len(payload).to_bytes(2, "big")
+        + bytes(8)
+        + payload
+    )
+
+
+def timed(func: Callable[[], Any], repeat: int = 5) -> float:
+    """Return the best wall-clock time of several runs of ``func``."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def report(benchmark: str, case: str, **metrics: Any) -> None:
+    """Print one benchmark result as a JSON line."""
+    print(json.dumps({"benchmark": benchmark, "case": case, **metrics}), flush=True)
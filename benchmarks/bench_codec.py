@@ -0,0 +1,88 @@
+"""
+Decode/encode throughput and fuzzing for the packet codec.
+
+Usage:
+    python benchmarks/bench_codec.py [--iterations N] [--fuzz N] [--seed S]
+"""
+import argparse
+import json
+import random
+
+from _common import frame, load_component, report, timed
+
+load_component()
+from tendabeli import codec  # noqa: E402
+
+
+def sample_frames() -> dict:
+    """Build one representative frame per inbound packet type."""
+    history = ",".join(
+        f'"{1700000000 + i * 3600},{i * 60},0.0{i % 10},{i * 30},1"' for i in range(24)
+    )
+    return {
+        "keepalive": frame(0x65),
+        "status": frame(0x66, json.dumps({"serialNum": "E0000000000000001", "status": 1}).encode()),
+        "command_resp": frame(0x5E, b'{"resp_code":0,"action":1,"result":"ok"}'),
+        "serial": frame(0x67, b'{"serialNum":"E0000000000000001"}'),
+        "power": frame(0xD5, b'{"type":5,"unit":"W","stamp":1700000000,"power":"123.4"}'),
+        "energy": frame(0x89, f'{{"energy":[{history}]}}'.encode(), flags=1),
+    }
+
+
+def fuzz(frames: dict, count: int, seed: int) -> int:
+    """Decode randomly mutated frames; only ValueError may escape."""
+    rng = random.Random(seed)
+    templates = list(frames.values())
+    decoded = 0
+    for _ in range(count):
+        data = bytearray(rng.choice(templates))
+        for _ in range(rng.randint(1, 8)):
+            data[rng.randrange(16, len(data)) if len(data) > 16 else 5] = rng.randrange(256)
+        if rng.random() < 0.3:
+            del data[rng.randrange(16, len(data) + 1):]
+        try:
+            if codec.decode(memoryview(data)) is not None:
+                decoded += 1
+        except ValueError:
+            pass
+    return decoded
+
+
+def main() -> None:
+    """Run codec benchmarks and the fuzz pass."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50000)
+    parser.add_argument("--fuzz", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    frames = sample_frames()
+    for case, data in frames.items():
+        view = memoryview(data)
+        elapsed = timed(lambda: [codec.decode(view) for _ in range(args.iterations)], repeat=3)
+        report(
+            "codec_decode",
+            case,
+            iterations=args.iterations,
+            seconds=round(elapsed, 6),
+            messages_per_second=round(args.iterations / elapsed),
+        )
+
+    elapsed = timed(
+        lambda: [codec.encode(0xD5, argument=0x02050000) for _ in range(args.iterations)],
+        repeat=3,
+    )
+    report(
+        "codec_encode",
+        "power_request",
+        iterations=args.iterations,
+        seconds=round(elapsed, 6),
+        frames_per_second=round(args.iterations / elapsed),
+    )
+
+    decoded = fuzz(frames, args.fuzz, args.seed)
+    report("codec_fuzz", "mutated_frames", frames=args.fuzz, decoded=decoded, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Throughput benchmark for the provisioning stream framer.
+
+Feeds a mixed stream of keepalive, status, power and energy-history frames
+through ``PacketFramer`` using coalesced and fragmented read sizes.
+
+Usage:
+    python benchmarks/bench_framer.py [--frames N]
+"""
+import argparse
+import json
+
+from _common import frame, load_component, report, timed
+
+load_component()
+from tendabeli.codec import PacketFramer  # noqa: E402
+
+
+def build_stream(count: int) -> bytes:
+    """Build a byte stream of ``count`` frames in a realistic mix."""
+    keepalive = frame(0x65)
+    status = frame(0x66, json.dumps({"serialNum": "E0000000000000001", "status": 1}).encode())
+    power = frame(0xD5, json.dumps({"type": 5, "power": "123.4"}).encode())
+    history = ",".join(
+        f'"{1700000000 + i * 3600},{i * 60},0.0{i % 10},{i * 30},1"' for i in range(96)
+    )
+    energy = frame(0x89, f'{{"energy":[{history}],"note":"$"}}'.encode(), flags=1)
+
+    pattern = [keepalive, status, power, keepalive, power, energy]
+    return b"".join(pattern[i % len(pattern)] for i in range(count))
+
+
+def run(stream: bytes, chunk_size: int) -> int:
+    """Feed ``stream`` in ``chunk_size`` reads and count the frames produced."""
+    framer = PacketFramer()
+    for start in range(0, len(stream), chunk_size):
+        for _ in framer.feed(stream[start:start + chunk_size]):
+            pass
+    return framer.frames
+
+
+def main() -> None:
+    """Run all framer cases."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=60000)
+    args = parser.parse_args()
+
+    stream = build_stream(args.frames)
+    cases = {
+        "coalesced_single_chunk": len(stream),
+        "coalesced_64k": 65536,
+        "read_1024": 1024,
+        "fragmented_64": 64,
+        "fragmented_7": 7,
+    }
+    for case, chunk_size in cases.items():
+        assert run(stream, chunk_size) == args.frames
+        elapsed = timed(lambda: run(stream, chunk_size), repeat=3)
+        report(
+            "framer",
+            case,
+            frames=args.frames,
+            bytes=len(stream),
+            seconds=round(elapsed, 6),
+            frames_per_second=round(args.frames / elapsed),
+            megabytes_per_second=round(len(stream) / elapsed / 1e6, 2),
+        )
+
+
+if __name__ == "__main__":
+    main()
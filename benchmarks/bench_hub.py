@@ -0,0 +1,310 @@
+"""
+Hub benchmarks: packet throughput, toggle latency, memory and setup cost.
+
+Drives ``TendaBeliServer`` together with the switch, sensor and button
+entity classes on top of the Home Assistant stubs in ``ha_stubs``. Plugs
+are connected in-process through ``_process_packet_data`` with fake
+stream writers, so the numbers cover the integration code only.
+
+Usage:
+    python benchmarks/bench_hub.py [--plugs N] [--rounds N] [--fleets 10,100,1000,5000]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import ha_stubs
+from _common import frame, load_component, report
+
+load_component()
+ha_stubs.install()
+from tendabeli import button, codec, sensor, switch  # noqa: E402
+from tendabeli.const import DOMAIN, HUB  # noqa: E402
+from tendabeli.tenda import TendaBeliPlug, TendaBeliServer  # noqa: E402
+
+
+def status_frame(serial_number: str, is_on: bool) -> bytes:
+    """Build a status frame for a plug."""
+    return frame(0x66, json.dumps({"serialNum": serial_number, "status": int(is_on)}).encode())
+
+
+def power_frame(watts: float) -> bytes:
+    """Build a power reply frame."""
+    return frame(0xD5, f'{{"type":5,"voltage":"230.1","power":"{watts:.1f}"}}'.encode())
+
+
+class FakeWriter:
+    """In-memory stand-in for ``asyncio.StreamWriter``."""
+
+    def __init__(self, peer: str) -> None:
+        self.peer = peer
+        self.bytes_written = 0
+        self.on_frame: Optional[Callable[[bytes], None]] = None
+        self._closing = False
+
+    def write(self, data: bytes) -> None:
+        self.bytes_written += len(data)
+        if self.on_frame is not None:
+            self.on_frame(bytes(data))
+
+    def writelines(self, chunks) -> None:
+        for chunk in chunks:
+            self.write(chunk)
+
+    async def drain(self) -> None:
+        pass
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self) -> None:
+        self._closing = True
+
+    async def wait_closed(self) -> None:
+        pass
+
+    def get_extra_info(self, name: str, default=None):
+        return (self.peer, 50000) if name == "peername" else default
+
+
+class Harness:
+    """A hub with all entity platforms set up on stub Home Assistant."""
+
+    def __init__(self) -> None:
+        self.hass = ha_stubs.HomeAssistant()
+        self.hub = TendaBeliServer()
+        self.hass.data[DOMAIN] = {HUB: self.hub}
+        self.entities: List[ha_stubs.Entity] = []
+        self.switches: Dict[str, switch.TendaBeliSwitch] = {}
+        self.plugs: List[TendaBeliPlug] = []
+        self._pending: List[asyncio.Task] = []
+
+    def add_entities(self, entities) -> None:
+        """Entity platform callback: attach and add entities."""
+        for entity in entities:
+            entity.hass = self.hass
+            self.entities.append(entity)
+            if isinstance(entity, switch.TendaBeliSwitch):
+                self.switches[entity._serial_number] = entity
+            self._pending.append(asyncio.create_task(entity.async_added_to_hass()))
+
+    async def setup(self) -> None:
+        """Set up all platforms."""
+        entry = ha_stubs.ConfigEntry()
+        for platform in (switch, sensor, button):
+            await platform.async_setup_entry(self.hass, entry, self.add_entities)
+        await self.settle()
+
+    async def settle(self) -> None:
+        """Run the loop until entity and hub background work is done."""
+        while True:
+            await asyncio.sleep(0)
+            pending = [task for task in self._pending if not task.done()]
+            self._pending = pending
+            busy = pending or self.hub._background_tasks or self.hub._flush_handle
+            if not busy:
+                return
+            if pending:
+                await asyncio.gather(*pending)
+
+    async def connect(self, index: int) -> TendaBeliPlug:
+        """Connect a plug the way the provisioning handler does after the handshake."""
+        address = index + 1
+        ip_address = f"10.{address >> 16 & 255}.{address >> 8 & 255}.{address & 255}"
+        writer = FakeWriter(ip_address)
+        plug = TendaBeliPlug(ip_address, writer, self.hub)
+        self.hub._track_plug(plug)
+        self.hub._statistics.total_connections += 1
+        await self.hub._process_packet_data(
+            status_frame(f"E{address:016d}", False), plug, writer
+        )
+        self.plugs.append(plug)
+        return plug
+
+    async def close(self) -> None:
+        """Stop background tasks."""
+        await self.settle()
+        for task in (self.hub._health_check_task, self.hub._hub_update_task, *self.hub._background_tasks):
+            if task:
+                task.cancel()
+        await asyncio.sleep(0)
+
+
+async def bench_throughput(plugs: int, rounds: int) -> None:
+    """Measure packets per second through _process_packet_data."""
+    harness = Harness()
+    await harness.setup()
+    for index in range(plugs):
+        await harness.connect(index)
+    await harness.settle()
+
+    streams = {}
+    for plug in harness.plugs:
+        # Keepalive, power reply and a status that flips every other round
+        streams[plug] = [
+            frame(0x65) + power_frame(100.0 + round_index % 7) + status_frame(plug.sn, round_index % 4 < 2)
+            for round_index in range(rounds)
+        ]
+    packets = plugs * rounds * 3
+
+    ha_stubs.EntityCounters.reset()
+    started = time.perf_counter()
+    for round_index in range(rounds):
+        for plug in harness.plugs:
+            await harness.hub._process_packet_data(streams[plug][round_index], plug, plug._writer)
+        await harness.settle()
+    elapsed = time.perf_counter() - started
+
+    report(
+        "hub_throughput",
+        "keepalive_power_status",
+        plugs=plugs,
+        packets=packets,
+        seconds=round(elapsed, 6),
+        packets_per_second=round(packets / elapsed),
+        state_writes=ha_stubs.EntityCounters.state_writes,
+        state_writes_per_packet=round(ha_stubs.EntityCounters.state_writes / packets, 3),
+    )
+    await harness.close()
+
+
+async def bench_toggle_latency(plugs: int) -> None:
+    """Measure latency from a switch command to the optimistic and confirmed state."""
+    harness = Harness()
+    await harness.setup()
+    for index in range(plugs):
+        await harness.connect(index)
+    await harness.settle()
+
+    loop = asyncio.get_running_loop()
+    started: Dict[str, float] = {}
+    optimistic: Dict[str, float] = {}
+    confirmed: Dict[str, float] = {}
+
+    for plug in harness.plugs:
+        entity = harness.switches[plug.sn]
+        original_write = entity.async_write_ha_state
+
+        def write_state(entity=entity, original_write=original_write) -> None:
+            if entity.is_on and entity._serial_number in started:
+                optimistic.setdefault(entity._serial_number, time.perf_counter())
+            original_write()
+
+        def respond(data: bytes, plug=plug) -> None:
+            if data[5] == codec.TYPE_TOGGLE:
+                reply = frame(0x5E, b'{"resp_code":0}') + status_frame(plug.sn, not plug.is_on)
+                loop.call_soon(
+                    lambda: asyncio.ensure_future(
+                        harness.hub._process_packet_data(reply, plug, plug._writer)
+                    )
+                )
+
+        entity.async_write_ha_state = write_state
+        plug._writer.on_frame = respond
+
+    async def turn_on(entity: switch.TendaBeliSwitch) -> None:
+        started[entity._serial_number] = time.perf_counter()
+        await entity.async_turn_on()
+        confirmed[entity._serial_number] = time.perf_counter()
+
+    await asyncio.gather(*(turn_on(harness.switches[plug.sn]) for plug in harness.plugs))
+    await harness.settle()
+
+    def percentiles(samples: Dict[str, float]) -> Dict[str, Optional[float]]:
+        latencies = sorted(samples[sn] - started[sn] for sn in samples)
+        if not latencies:
+            return {"p50_ms": None, "p99_ms": None}
+        return {
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+        }
+
+    on = sum(plug.is_on for plug in harness.plugs)
+    report("toggle_latency", "turn_on_to_optimistic_state", plugs=plugs, **percentiles(optimistic))
+    report("toggle_latency", "turn_on_to_confirmed_state", plugs=plugs, confirmed=on, **percentiles(confirmed))
+    await harness.close()
+
+
+async def bench_memory(plugs: int) -> None:
+    """Measure memory per connected plug, with and without entities."""
+    hub = TendaBeliServer()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for index in range(plugs):
+        plug = TendaBeliPlug(f"10.1.{index >> 8 & 255}.{index & 255}", FakeWriter("plug"), hub)
+        hub._track_plug(plug)
+        plug.sn = f"E{index + 1:016d}"
+    await asyncio.sleep(0)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    plug_bytes = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    report("memory", "plug_only", plugs=plugs, bytes_per_plug=round(plug_bytes / plugs))
+    for task in (hub._health_check_task, hub._hub_update_task, *hub._background_tasks):
+        task.cancel()
+
+    harness = Harness()
+    await harness.setup()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for index in range(plugs):
+        await harness.connect(index)
+    await harness.settle()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total_bytes = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    report(
+        "memory",
+        "plug_with_entities",
+        plugs=plugs,
+        entities_per_plug=round(len(harness.entities) / plugs, 1),
+        bytes_per_plug=round(total_bytes / plugs),
+    )
+    await harness.close()
+
+
+async def bench_connection_setup(fleets: List[int]) -> None:
+    """Measure connection setup cost, including entity creation, as the fleet grows."""
+    for fleet_size in fleets:
+        harness = Harness()
+        await harness.setup()
+        started = time.perf_counter()
+        for index in range(fleet_size):
+            await harness.connect(index)
+        await harness.settle()
+        elapsed = time.perf_counter() - started
+        report(
+            "connection_setup",
+            "status_to_entities",
+            plugs=fleet_size,
+            seconds=round(elapsed, 6),
+            microseconds_per_connection=round(elapsed / fleet_size * 1e6, 1),
+        )
+        await harness.close()
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Run all hub benchmarks."""
+    await bench_throughput(args.plugs, args.rounds)
+    await bench_toggle_latency(args.plugs)
+    await bench_memory(args.plugs)
+    await bench_connection_setup([int(size) for size in args.fleets.split(",")])
+
+
+def main() -> None:
+    """Parse arguments and run."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--plugs", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--fleets", default="10,100,1000,5000")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
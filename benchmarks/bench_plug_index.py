@@ -0,0 +1,73 @@
+"""
+Plug lookup cost as the number of connected plugs grows.
+
+Compares the hub's indexed lookups against the previous linear scan over
+the connected plugs.
+
+Usage:
+    python benchmarks/bench_plug_index.py [--lookups N]
+"""
+import argparse
+import asyncio
+
+from _common import load_component, report, timed
+
+load_component()
+from tendabeli.tenda import TendaBeliPlug, TendaBeliServer  # noqa: E402
+
+FLEET_SIZES = (10, 100, 1000)
+
+
+def linear_lookup(hub: TendaBeliServer, serial_number: str):
+    """Reference implementation: scan every connected plug."""
+    for plug in hub._connected_plugs.values():
+        if plug.sn == serial_number:
+            return plug
+    return None
+
+
+async def run(lookups: int) -> None:
+    """Populate hubs of increasing size and time lookups."""
+    for fleet_size in FLEET_SIZES:
+        hub = TendaBeliServer()
+        serial_numbers = []
+        for index in range(fleet_size):
+            plug = TendaBeliPlug(f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}", None, hub)
+            hub._track_plug(plug)
+            plug.sn = f"E{index:016d}"
+            plug.mac_address = f"02:00:00:{index >> 16 & 255:02x}:{index >> 8 & 255:02x}:{index & 255:02x}"
+            serial_numbers.append(plug.sn)
+
+        # Worst case for the scan: the most recently connected plug
+        target = serial_numbers[-1]
+        assert hub.get_plug_by_serial_number(target) is linear_lookup(hub, target)
+
+        for case, lookup in (
+            ("indexed_serial", lambda: hub.get_plug_by_serial_number(target)),
+            ("linear_scan", lambda: linear_lookup(hub, target)),
+        ):
+            elapsed = timed(lambda: [lookup() for _ in range(lookups)], repeat=3)
+            report(
+                "plug_lookup",
+                case,
+                plugs=fleet_size,
+                lookups=lookups,
+                nanoseconds_per_lookup=round(elapsed / lookups * 1e9, 1),
+            )
+
+        await hub.stop()
+        for task in (hub._health_check_task, hub._hub_update_task):
+            task.cancel()
+        await asyncio.sleep(0)
+
+
+def main() -> None:
+    """Run lookup benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.lookups))
+
+
+if __name__ == "__main__":
+    main()
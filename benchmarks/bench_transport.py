@@ -0,0 +1,156 @@
+"""
+Provisioning transport comparison: stream handler versus asyncio.Protocol.
+
+Connects real loopback sockets to the hub's provisioning server, once per
+transport, and reports event loop CPU time per received packet and Python
+memory per idle connection. Client sockets are driven from a worker thread
+so only the hub's work is counted against the event loop thread.
+
+Usage:
+    python benchmarks/bench_transport.py [--connections N] [--rounds N]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import socket
+import time
+import tracemalloc
+from typing import List
+
+from _common import frame, load_component, report
+
+load_component()
+from tendabeli.tenda import HubState, TendaBeliServer  # noqa: E402
+
+# Closing clients with unread replies resets connections; keep output to results
+logging.disable(logging.ERROR)
+
+HANDSHAKE = b"\x00" * 32
+KEEPALIVE = frame(0x65)
+
+
+def local_address(index: int) -> str:
+    """Give each client its own loopback address, since plugs are keyed by IP."""
+    address = index + 1
+    return f"127.{1 + (address >> 16)}.{(address >> 8) & 255}.{address & 255}"
+
+
+def open_clients(port: int, count: int) -> List[socket.socket]:
+    """Connect clients, complete the handshake and identify each plug."""
+    clients = []
+    for index in range(count):
+        client = socket.socket()
+        client.bind((local_address(index), 0))
+        client.connect(("127.0.0.1", port))
+        client.sendall(HANDSHAKE)
+        client.recv(1024)
+        clients.append(client)
+    # Keep the second handshake chunk apart from the first real frame
+    for client in clients:
+        client.sendall(HANDSHAKE)
+    time.sleep(0.2)
+    for index, client in enumerate(clients):
+        status = json.dumps({"serialNum": f"E{index + 1:016d}", "status": 0}).encode()
+        client.sendall(frame(0x66, status))
+        client.setblocking(False)
+    return clients
+
+
+def drain(clients: List[socket.socket]) -> None:
+    """Discard hub replies so socket buffers never fill."""
+    for client in clients:
+        try:
+            while client.recv(65536):
+                pass
+        except BlockingIOError:
+            pass
+
+
+def send_keepalives(clients: List[socket.socket], rounds: int) -> None:
+    """Send one keepalive per client per round."""
+    for _ in range(rounds):
+        for client in clients:
+            client.sendall(KEEPALIVE)
+        drain(clients)
+
+
+async def wait_for(predicate, timeout: float = 30.0) -> None:
+    """Poll until ``predicate`` holds."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("benchmark condition not reached")
+        await asyncio.sleep(0.01)
+
+
+async def bench(transport: str, connections: int, rounds: int) -> None:
+    """Run both measurements for one transport."""
+    loop = asyncio.get_running_loop()
+    hub = TendaBeliServer(use_protocol_transport=transport == "protocol")
+    hub._state = HubState.RUNNING
+    server_task = asyncio.create_task(hub._start_provisioning_server(0))
+    await wait_for(lambda: hub._servers)
+    port = hub._servers[0].sockets[0].getsockname()[1]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    clients = await loop.run_in_executor(None, open_clients, port, connections)
+    await wait_for(lambda: len(hub._plugs_by_serial) == connections)
+    await asyncio.sleep(0.2)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    idle_bytes = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    report(
+        "transport_memory",
+        transport,
+        plugs=connections,
+        bytes_per_idle_connection=round(idle_bytes / connections),
+    )
+
+    packets = connections * rounds
+    target = hub.statistics.packets_received + packets
+    cpu_started = time.thread_time()
+    started = time.perf_counter()
+    sender = loop.run_in_executor(None, send_keepalives, clients, rounds)
+    await wait_for(lambda: hub.statistics.packets_received >= target)
+    elapsed = time.perf_counter() - started
+    cpu = time.thread_time() - cpu_started
+    await sender
+    report(
+        "transport_cpu",
+        transport,
+        plugs=connections,
+        packets=packets,
+        seconds=round(elapsed, 6),
+        cpu_microseconds_per_packet=round(cpu / packets * 1e6, 2),
+        packets_per_second=round(packets / elapsed),
+    )
+
+    for client in clients:
+        client.close()
+    await hub.stop()
+    server_task.cancel()
+    await asyncio.sleep(0.1)
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Benchmark both transports."""
+    for transport in ("streams", "protocol"):
+        await bench(transport, args.connections, args.rounds)
+
+
+def main() -> None:
+    """Parse arguments and run."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
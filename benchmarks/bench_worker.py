@@ -0,0 +1,129 @@
+"""
+Hub worker comparison: servers on the main event loop versus a worker thread.
+
+Connects real loopback clients to the provisioning server and streams
+keepalive and power frames at them from a sender thread, once with the hub
+on the main loop and once with ``off_loop=True``. Every plug has one
+operational callback standing in for its entities. The main loop runs a
+ticker that measures how late its 5 ms sleeps wake up, which is the lag
+Home Assistant's automations would see.
+
+Usage:
+    python benchmarks/bench_worker.py [--connections N] [--rounds N]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, List
+
+from _common import frame, load_component, report
+from bench_transport import KEEPALIVE, drain, open_clients, wait_for
+
+load_component()
+from tendabeli.tenda import HubState, TendaBeliServer  # noqa: E402
+
+logging.disable(logging.ERROR)
+
+TICK = 0.005
+
+
+def send_readings(clients, rounds: int) -> None:
+    """Send a keepalive and a changing power reading per client per round."""
+    for round_index in range(rounds):
+        payload = f'{{"type":5,"voltage":"230.1","power":"{100 + round_index % 50}.0"}}'.encode()
+        data = KEEPALIVE + frame(0xD5, payload)
+        for client in clients:
+            client.sendall(data)
+        drain(clients)
+
+
+async def measure_lag(samples: List[float], stop: asyncio.Event) -> None:
+    """Record how late each short sleep on the main loop wakes up."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        samples.append(time.perf_counter() - started - TICK)
+
+
+async def start_servers(hub: TendaBeliServer) -> None:
+    """Start only the provisioning server, on an ephemeral port."""
+    hub._state = HubState.RUNNING
+    hub._server_tasks = [asyncio.create_task(hub._start_provisioning_server(0))]
+    await wait_for(lambda: hub._servers)
+
+
+async def bench(mode: str, connections: int, rounds: int) -> None:
+    """Run one mode."""
+    loop = asyncio.get_running_loop()
+    hub = TendaBeliServer(off_loop=mode == "worker_thread")
+    if hub.off_loop:
+        hub._home_loop = loop
+        hub._move_to_loop(await loop.run_in_executor(None, hub._worker.start))
+    await hub.async_run(start_servers(hub))
+    port = hub._servers[0].sockets[0].getsockname()[1]
+
+    writes: Dict[str, int] = {}
+    for index in range(connections):
+        serial_number = f"E{index + 1:016d}"
+
+        async def entity_callback(serial_number: str = serial_number) -> None:
+            plug = hub.get_plug_by_serial_number(serial_number)
+            if plug is not None:
+                plug.power
+                writes[serial_number] = writes.get(serial_number, 0) + 1
+
+        hub.register_operational_callback(entity_callback, serial_number, ("power",))
+
+    clients = await loop.run_in_executor(None, open_clients, port, connections)
+    await wait_for(lambda: len(hub._plugs_by_serial) == connections)
+
+    samples: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(samples, stop))
+    packets = connections * rounds * 2
+    target = hub.statistics.packets_received + packets
+    started = time.perf_counter()
+    sender = loop.run_in_executor(None, send_readings, clients, rounds)
+    await wait_for(lambda: hub.statistics.packets_received >= target, timeout=120)
+    elapsed = time.perf_counter() - started
+    await sender
+    await asyncio.sleep(0.2)
+    stop.set()
+    await ticker
+
+    samples.sort()
+    report(
+        "worker",
+        mode,
+        plugs=connections,
+        packets=packets,
+        packets_per_second=round(packets / elapsed),
+        loop_lag_p50_ms=round(samples[len(samples) // 2] * 1000, 3),
+        loop_lag_p99_ms=round(samples[int(len(samples) * 0.99)] * 1000, 3),
+        loop_lag_max_ms=round(samples[-1] * 1000, 3),
+        entity_updates=sum(writes.values()),
+    )
+
+    for client in clients:
+        client.close()
+    await hub.stop()
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Benchmark both modes."""
+    for mode in ("main_loop", "worker_thread"):
+        await bench(mode, args.connections, args.rounds)
+
+
+def main() -> None:
+    """Parse arguments and run."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare two benchmark result files.
+
+Results are matched on benchmark, case and the integer parameters of each
+line (such as ``plugs``); every other numeric metric is printed with the
+ratio of the new value to the baseline.
+
+Usage:
+    python benchmarks/bench_hub.py > baseline.jsonl
+    python benchmarks/bench_hub.py > change.jsonl
+    python benchmarks/compare.py baseline.jsonl change.jsonl
+"""
+import argparse
+import json
+from typing import Dict, Tuple
+
+PARAMETERS = ("plugs", "packets", "iterations", "lookups", "frames", "seed", "rounds")
+
+
+def load(path: str) -> Dict[Tuple, dict]:
+    """Load a JSON lines result file keyed by benchmark, case and parameters."""
+    results = {}
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line.startswith("{"):
+                continue
+            result = json.loads(line)
+            key = (
+                result.pop("benchmark"),
+                result.pop("case"),
+                tuple((name, result.pop(name)) for name in PARAMETERS if name in result),
+            )
+            results[key] = result
+    return results
+
+
+def main() -> None:
+    """Print metric ratios for every result present in both files."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("baseline")
+    parser.add_argument("change")
+    args = parser.parse_args()
+
+    baseline = load(args.baseline)
+    change = load(args.change)
+    for key, metrics in change.items():
+        if key not in baseline:
+            continue
+        benchmark, case, parameters = key
+        label = " ".join([benchmark, case] + [f"{name}={value}" for name, value in parameters])
+        print(label)
+        for name, value in metrics.items():
+            old = baseline[key].get(name)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            ratio = f"{value / old:.2f}x" if old else "n/a"
+            print(f"  {name:32} {old:>14} -> {value:<14} {ratio}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Minimal Home Assistant stand-ins for driving the integration in benchmarks.
+
+Only the names imported by the integration modules are provided. Entity
+state writes read the same properties Home Assistant reads and are counted,
+so benchmarks can report how many states a workload writes.
+
+"""
+import sys
+import types
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+
+class EntityCounters:
+    """Global counters updated by stub entities."""
+    state_writes = 0
+
+    @classmethod
+    def reset(cls) -> None:
+        """Reset all counters."""
+        cls.state_writes = 0
+
+
+class Entity:
+    """Stub of ``homeassistant.helpers.entity.Entity``."""
+    hass: Any = None
+    device_entry: Any = None
+    entity_id: Optional[str] = None
+    _attr_available = True
+    _attr_name: Optional[str] = None
+    _attr_icon: Optional[str] = None
+    _attr_extra_state_attributes: Optional[dict] = None
+    _state_properties = ("available", "icon", "extra_state_attributes")
+
+    @property
+    def available(self) -> bool:
+        return self._attr_available
+
+    @property
+    def name(self) -> Optional[str]:
+        return self._attr_name
+
+    @property
+    def icon(self) -> Optional[str]:
+        return self._attr_icon
+
+    @property
+    def extra_state_attributes(self) -> Optional[dict]:
+        return self._attr_extra_state_attributes
+
+    def async_write_ha_state(self) -> None:
+        """Read state properties like Home Assistant does and count the write."""
+        for name in self._state_properties:
+            getattr(self, name)
+        EntityCounters.state_writes += 1
+
+    async def async_added_to_hass(self) -> None:
+        pass
+
+    async def async_will_remove_from_hass(self) -> None:
+        pass
+
+
+class SensorEntity(Entity):
+    """Stub of ``homeassistant.components.sensor.SensorEntity``."""
+    _attr_native_value: Any = None
+    _state_properties = (*Entity._state_properties, "native_value")
+
+    @property
+    def native_value(self) -> Any:
+        return self._attr_native_value
+
+
+class SwitchEntity(Entity):
+    """Stub of ``homeassistant.components.switch.SwitchEntity``."""
+    _state_properties = (*Entity._state_properties, "is_on")
+
+
+class ButtonEntity(Entity):
+    """Stub of ``homeassistant.components.button.ButtonEntity``."""
+
+
+class _StrEnum(str, Enum):
+    pass
+
+
+class SensorDeviceClass(_StrEnum):
+    POWER = "power"
+    ENERGY = "energy"
+    TIMESTAMP = "timestamp"
+    DURATION = "duration"
+
+
+class SensorStateClass(_StrEnum):
+    MEASUREMENT = "measurement"
+    TOTAL = "total"
+    TOTAL_INCREASING = "total_increasing"
+
+
+class SwitchDeviceClass(_StrEnum):
+    OUTLET = "outlet"
+
+
+class ButtonDeviceClass(_StrEnum):
+    UPDATE = "update"
+    RESTART = "restart"
+
+
+class EntityCategory(_StrEnum):
+    CONFIG = "config"
+    DIAGNOSTIC = "diagnostic"
+
+
+class UnitOfPower(_StrEnum):
+    WATT = "W"
+
+
+class UnitOfEnergy(_StrEnum):
+    KILO_WATT_HOUR = "kWh"
+
+
+class UnitOfTime(_StrEnum):
+    SECONDS = "s"
+    MILLISECONDS = "ms"
+
+
+class _Config:
+    components: set = set()
+
+
+class HomeAssistant:
+    """Stub Home Assistant instance holding integration data."""
+
+    def __init__(self) -> None:
+        self.data: Dict[str, Any] = {}
+        self.config = _Config()
+        self.bus = types.SimpleNamespace(async_fire=lambda *args, **kwargs: None)
+
+
+class ConfigEntry:
+    """Stub config entry."""
+
+    def __init__(self, entry_id: str = "benchmark") -> None:
+        self.entry_id = entry_id
+        self.data: Dict[str, Any] = {}
+        self.options: Dict[str, Any] = {}
+
+
+class _DeviceRegistry:
+    def async_update_device(self, device_id: str, **kwargs: Any) -> None:
+        pass
+
+
+def _dict_factory(**kwargs: Any) -> Dict[str, Any]:
+    return dict(kwargs)
+
+
+def _module(name: str, **attributes: Any) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+
+def install() -> None:
+    """Register the stub modules in ``sys.modules``."""
+    if "homeassistant" in sys.modules:
+        return
+
+    _module("homeassistant")
+    _module("homeassistant.components")
+    _module("homeassistant.components.sensor", SensorEntity=SensorEntity,
+            SensorDeviceClass=SensorDeviceClass, SensorStateClass=SensorStateClass)
+    _module("homeassistant.components.switch", SwitchEntity=SwitchEntity,
+            SwitchDeviceClass=SwitchDeviceClass)
+    _module("homeassistant.components.button", ButtonEntity=ButtonEntity,
+            ButtonDeviceClass=ButtonDeviceClass)
+    _module("homeassistant.components.recorder")
+    _module("homeassistant.components.recorder.models",
+            StatisticData=_dict_factory, StatisticMetaData=_dict_factory)
+    _module("homeassistant.components.recorder.statistics",
+            async_add_external_statistics=lambda hass, metadata, statistics: None)
+    _module("homeassistant.config_entries", ConfigEntry=ConfigEntry)
+    _module("homeassistant.const", UnitOfEnergy=UnitOfEnergy, UnitOfPower=UnitOfPower,
+            UnitOfTime=UnitOfTime, EntityCategory=EntityCategory, PERCENTAGE="%")
+    _module("homeassistant.core", HomeAssistant=HomeAssistant, callback=lambda func: func)
+    _module("homeassistant.helpers")
+    _module("homeassistant.helpers.device_registry", CONNECTION_NETWORK_MAC="mac",
+            async_get=lambda hass: _DeviceRegistry())
+    _module("homeassistant.helpers.entity", DeviceInfo=_dict_factory, Entity=Entity)
+    _module("homeassistant.helpers.entity_platform",
+            AddEntitiesCallback=Callable[[List[Entity]], None])
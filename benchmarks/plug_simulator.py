@@ -0,0 +1,332 @@
+"""
+Fleet of simulated Tenda Beli plugs for local load testing.
+
+Each simulated plug performs the rendezvous exchange on port 1821, then
+connects to the provisioning server on port 1822, completes the handshake
+and keeps the connection alive with keepalives. It answers power, energy
+and toggle requests like a real plug. Every plug connects from its own
+loopback address (127.x.y.z) because the hub tracks plugs by IP address.
+
+The simulator does not import the integration, so it exercises the hub
+strictly through the wire protocol.
+
+Usage:
+    python benchmarks/plug_simulator.py --plugs 1000 --duration 120
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from _common import frame, report
+
+HEADER = struct.Struct(">BBBBBBHII")
+HEADER_SIZE = HEADER.size
+
+TYPE_KEEPALIVE = 0x65
+TYPE_STATUS = 0x66
+TYPE_COMMAND_RESP = 0x5E
+TYPE_TOGGLE = 0x5D
+TYPE_POWER = 0xD5
+TYPE_ENERGY = 0x89
+TYPE_HANDSHAKE = 0x1A
+ARG_POWER_REQUEST = 0x02050000
+ARG_ENERGY_REQUEST = 0x02080000
+
+
+@dataclass
+class FleetStatistics:
+    """Counters shared by all simulated plugs."""
+    connected: int = 0
+    handshakes: int = 0
+    reconnects: int = 0
+    failures: int = 0
+    frames_sent: int = 0
+    frames_received: int = 0
+    power_replies: int = 0
+    energy_replies: int = 0
+    toggles: int = 0
+    keepalive_rtt: List[float] = field(default_factory=list)
+
+    def snapshot(self) -> dict:
+        """Return counters and keepalive round-trip percentiles, then reset the samples."""
+        samples = sorted(self.keepalive_rtt)
+        self.keepalive_rtt.clear()
+
+        def percentile(fraction: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000, 3)
+
+        return {
+            "connected": self.connected,
+            "handshakes": self.handshakes,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+            "frames_sent": self.frames_sent,
+            "frames_received": self.frames_received,
+            "power_replies": self.power_replies,
+            "energy_replies": self.energy_replies,
+            "toggles": self.toggles,
+            "keepalive_rtt_p50_ms": percentile(0.5),
+            "keepalive_rtt_p99_ms": percentile(0.99),
+        }
+
+
+class SimulatedPlug:
+    """A single simulated plug speaking the rendezvous and provisioning exchanges."""
+
+    def __init__(self, index: int, args: argparse.Namespace, stats: FleetStatistics) -> None:
+        """Initialize plug identity and state."""
+        self.index = index
+        self.args = args
+        self.stats = stats
+        address = index + 1
+        self.local_ip = f"127.{1 + (address >> 16)}.{(address >> 8) & 255}.{address & 255}"
+        self.serial_number = f"E{args.serial_base + index:016d}"
+        self.rng = random.Random(args.seed + index)
+        self.is_on = self.rng.random() < 0.5
+        self.power = self.rng.uniform(0.0, 2000.0) if self.is_on else 0.0
+        self.energy = round(self.rng.uniform(0.0, 500.0), 3)
+        self.started = time.time()
+        self._keepalive_sent: Optional[float] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: List[bytes] = []
+
+    # Rendezvous and provisioning exchanges
+    def device_info_blob(self) -> bytes:
+        """Build the device information blob sent on the rendezvous port."""
+        fields = [self.serial_number, "V1.0.0.12(2219)", "SP9_V1.0", "V1.0"]
+        payload = b"\x00\x10" + b"\x00\x11".join(value.encode() for value in fields) + b"\x00"
+        return frame(0x01, payload, flags=0)
+
+    async def rendezvous(self) -> tuple:
+        """Ask the rendezvous server where to connect for provisioning."""
+        reader, writer = await asyncio.open_connection(
+            self.args.host, self.args.rendezvous_port, local_addr=(self.local_ip, 0)
+        )
+        try:
+            writer.write(self.device_info_blob())
+            await writer.drain()
+            reply = await asyncio.wait_for(reader.readexactly(HEADER_SIZE + 14), timeout=10.0)
+            ip_address = ".".join(str(octet) for octet in reply[HEADER_SIZE + 4:HEADER_SIZE + 8])
+            port = int.from_bytes(reply[HEADER_SIZE + 12:HEADER_SIZE + 14], "big")
+            return ip_address, port
+        finally:
+            writer.close()
+
+    async def run(self) -> None:
+        """Connect, serve the hub and reconnect until cancelled."""
+        while True:
+            try:
+                redirect_ip, redirect_port = await self.rendezvous()
+                host = redirect_ip if self.args.follow_redirect else self.args.host
+                await self.serve(host, redirect_port)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats.failures += 1
+            self.stats.reconnects += 1
+            await asyncio.sleep(self.args.reconnect_delay * (0.5 + self.rng.random()))
+
+    async def serve(self, host: str, port: int) -> None:
+        """Run one provisioning connection."""
+        reader, writer = await asyncio.open_connection(host, port, local_addr=(self.local_ip, 0))
+        self._writer = writer
+        try:
+            writer.write(frame(0x19, b"\x00\x01\x00\x01\x01"))
+            await writer.drain()
+            await asyncio.wait_for(reader.read(1024), timeout=10.0)
+            writer.write(frame(0x1B, b"\x00\x01\x00\x01\x00"))
+            await writer.drain()
+            self.stats.handshakes += 1
+
+            # The hub reads the handshake as raw chunks, so keep it separate
+            await asyncio.sleep(self.args.handshake_delay)
+            self.stats.connected += 1
+            try:
+                self.send(frame(TYPE_STATUS, self.status_payload()))
+                if self.args.history_on_connect:
+                    self.send(frame(TYPE_ENERGY, self.history_payload(), flags=1))
+                await self.flush()
+                await asyncio.gather(self.keepalive_loop(), self.receive_loop(reader))
+            finally:
+                self.stats.connected -= 1
+        finally:
+            self._writer = None
+            writer.close()
+
+    # Outbound frames
+    def send(self, data: bytes) -> None:
+        """Queue a frame for the next flush."""
+        self._pending.append(data)
+        self.stats.frames_sent += 1
+
+    async def flush(self) -> None:
+        """Write queued frames, optionally coalesced or fragmented."""
+        if not self._pending or self._writer is None:
+            return
+        data = b"".join(self._pending)
+        self._pending.clear()
+
+        if self.args.fragment:
+            position = 0
+            while position < len(data):
+                size = self.rng.randint(1, self.args.fragment)
+                self._writer.write(data[position:position + size])
+                await self._writer.drain()
+                position += size
+        else:
+            self._writer.write(data)
+            await self._writer.drain()
+
+    def status_payload(self) -> bytes:
+        """Build the status JSON reported to the hub."""
+        return json.dumps({"serialNum": self.serial_number, "status": int(self.is_on)}).encode()
+
+    def power_payload(self) -> bytes:
+        """Build a power reply, drifting the reading a little each time."""
+        if self.is_on:
+            self.power = max(0.0, self.power + self.rng.gauss(0.0, self.args.power_noise))
+        else:
+            self.power = 0.0
+        return json.dumps({
+            "type": 5,
+            "voltage": "230.1",
+            "current": f"{self.power / 230.1:.3f}",
+            "power": f"{self.power:.1f}",
+        }, separators=(",", ":")).encode()
+
+    def history_payload(self) -> bytes:
+        """Build an energy history reply with hourly entries."""
+        now = int(time.time())
+        entries = []
+        for offset in range(self.args.history, 0, -1):
+            self.energy = round(self.energy + self.rng.uniform(0.0, 0.2), 3)
+            uptime = int(now - self.started) + self.args.history * 3600 - offset * 3600
+            entries.append(f"{now - offset * 3600},{max(0, uptime)},{self.energy},{max(0, uptime // 2)},0")
+        return json.dumps({"energy": entries}, separators=(",", ":")).encode()
+
+    # Connection loops
+    async def keepalive_loop(self) -> None:
+        """Send keepalives at the configured rate with jitter."""
+        await asyncio.sleep(self.rng.uniform(0, self.args.keepalive))
+        while True:
+            self._keepalive_sent = time.perf_counter()
+            self.send(frame(TYPE_KEEPALIVE))
+            await self.flush()
+            jitter = self.args.keepalive * self.args.jitter
+            await asyncio.sleep(self.args.keepalive + self.rng.uniform(-jitter, jitter))
+
+    async def receive_loop(self, reader: asyncio.StreamReader) -> None:
+        """Answer frames sent by the hub."""
+        buffer = bytearray()
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                raise ConnectionResetError("hub closed the connection")
+            buffer += chunk
+            while len(buffer) >= HEADER_SIZE:
+                _, _, _, _, _, packet_type, length, argument, _ = HEADER.unpack_from(buffer)
+                if len(buffer) < HEADER_SIZE + length:
+                    break
+                del buffer[:HEADER_SIZE + length]
+                self.stats.frames_received += 1
+                self.handle(packet_type, argument)
+            await self.flush()
+
+    def handle(self, packet_type: int, argument: int) -> None:
+        """React to a single frame from the hub."""
+        if packet_type == TYPE_STATUS and self._keepalive_sent is not None:
+            self.stats.keepalive_rtt.append(time.perf_counter() - self._keepalive_sent)
+            self._keepalive_sent = None
+        elif packet_type == TYPE_POWER and argument == ARG_POWER_REQUEST:
+            self.stats.power_replies += 1
+            self.send(frame(TYPE_POWER, self.power_payload()))
+        elif packet_type == TYPE_POWER and argument == ARG_ENERGY_REQUEST:
+            self.stats.energy_replies += 1
+            self.send(frame(TYPE_ENERGY, self.history_payload(), flags=1))
+        elif packet_type == TYPE_TOGGLE:
+            self.stats.toggles += 1
+            self.is_on = not self.is_on
+            self.send(frame(TYPE_COMMAND_RESP, b'{"resp_code":0}'))
+            self.send(frame(TYPE_STATUS, self.status_payload()))
+
+
+async def storm(plugs: List[SimulatedPlug], args: argparse.Namespace) -> None:
+    """Periodically drop a fraction of the fleet so it reconnects at once."""
+    rng = random.Random(args.seed)
+    while True:
+        await asyncio.sleep(args.storm_interval)
+        victims = rng.sample(range(len(plugs)), int(len(plugs) * args.storm_fraction))
+        for index in victims:
+            writer = plugs[index]._writer
+            if writer is not None:
+                writer.transport.abort()
+        report("simulator", "reconnect_storm", dropped=len(victims))
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Start the fleet and report statistics until the duration elapses."""
+    stats = FleetStatistics()
+    plugs = [SimulatedPlug(index, args, stats) for index in range(args.plugs)]
+    tasks: List[asyncio.Task] = []
+
+    started = time.monotonic()
+    for plug in plugs:
+        tasks.append(asyncio.create_task(plug.run()))
+        if args.ramp:
+            await asyncio.sleep(1.0 / args.ramp)
+
+    if args.storm_interval:
+        tasks.append(asyncio.create_task(storm(plugs, args)))
+
+    try:
+        while time.monotonic() - started < args.duration:
+            await asyncio.sleep(args.report_interval)
+            report("simulator", "fleet", elapsed=round(time.monotonic() - started, 1), **stats.snapshot())
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main() -> None:
+    """Parse arguments and run the simulator."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1", help="Hub address")
+    parser.add_argument("--rendezvous-port", type=int, default=1821)
+    parser.add_argument("--follow-redirect", action="store_true",
+                        help="Connect to the address from the redirect instead of --host")
+    parser.add_argument("--plugs", type=int, default=100)
+    parser.add_argument("--serial-base", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--ramp", type=float, default=200.0, help="New plugs per second, 0 for all at once")
+    parser.add_argument("--keepalive", type=float, default=30.0, help="Keepalive interval in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Keepalive jitter as a fraction")
+    parser.add_argument("--fragment", type=int, default=0, help="Split writes into chunks of at most N bytes")
+    parser.add_argument("--history", type=int, default=24, help="Entries per energy history reply")
+    parser.add_argument("--history-on-connect", action="store_true")
+    parser.add_argument("--power-noise", type=float, default=5.0, help="Power reading noise in watts")
+    parser.add_argument("--handshake-delay", type=float, default=0.2)
+    parser.add_argument("--reconnect-delay", type=float, default=2.0)
+    parser.add_argument("--storm-interval", type=float, default=0.0, help="Seconds between reconnect storms")
+    parser.add_argument("--storm-fraction", type=float, default=0.5)
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
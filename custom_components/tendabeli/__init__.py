@@ -13,7 +13,8 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import EVENT_HOMEASSISTANT_STOP
 from homeassistant.core import Event, HomeAssistant
 
-from .const import DOMAIN, HUB, PLATFORMS, SETUP_DONE_KEYS
+from .const import DOMAIN, EVENT_LOOP_LAG_WARNING, HUB, PLATFORMS, SETUP_DONE_KEYS, STORE
+from .storage import TendaBeliStore
 from .tenda import TendaBeliServer
 
 _LOGGER = logging.getLogger(__name__)
@@ -28,6 +29,7 @@ def _reset_runtime_data(hass: HomeAssistant) -> None:
         return
 
     domain_data.pop(HUB, None)
+    domain_data.pop(STORE, None)
     for key in RUNTIME_DATA_KEYS:
         domain_data.pop(key, None)
 
@@ -62,12 +64,29 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hub.config_entry_id = entry.entry_id
     hass.data[DOMAIN][HUB] = hub
 
+    # Load stored plug data so entities can be restored before plugs connect
+    store = TendaBeliStore(hass)
+    try:
+        await store.async_load()
+    except Exception as err:
+        _LOGGER.warning("Unable to load stored plug data: %s", err)
+    hub.attach_store(store)
+    hass.data[DOMAIN][STORE] = store
+
+    # Fire an event when the hub's event loop is starved
+    async def handle_loop_lag_warning(summary: Dict[str, Any]) -> None:
+        """Forward a hub loop lag warning to the event bus."""
+        hass.bus.async_fire(EVENT_LOOP_LAG_WARNING, summary)
+
+    hub.register_health_callback(handle_loop_lag_warning)
+
     # Set up graceful shutdown handler
     async def handle_homeassistant_stop(event: Event) -> None:
         """Handle Home Assistant stop event."""
         _LOGGER.info("Home Assistant stopping, shutting down Tenda Beli hub")
         try:
             await hub.stop()
+            await store.async_flush()
             _LOGGER.info("Tenda Beli hub shutdown completed")
         except Exception as err:
             _LOGGER.error("Error during hub shutdown: %s", err, exc_info=True)
@@ -142,6 +161,9 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         try:
             _LOGGER.info("Stopping Tenda Beli hub")
             await hub.stop()
+            store: TendaBeliStore = hass.data[DOMAIN].get(STORE)
+            if store:
+                await store.async_flush()
             
             _reset_runtime_data(hass)
             _LOGGER.info("Hub stopped and runtime data cleared")
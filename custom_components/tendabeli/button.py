@@ -39,7 +39,8 @@ async def async_setup_entry(
             entities = [
                 TendaBeliPowerRefresh(hub, sn),
                 TendaBeliEnergyRefresh(hub, sn),
-                TendaBeliDisconnect(hub, sn)
+                TendaBeliDisconnect(hub, sn),
+                TendaBeliDumpFrames(hub, sn)
             ]
             async_add_entities(entities)
 
@@ -95,7 +96,7 @@ class TendaBeliButton(ButtonEntity):
     async def async_added_to_hass(self) -> None:
         """Register callbacks when added to hass."""
         if self._sn:
-            self._hub.register_operational_callback(self.process_callback, self._sn)
+            self._hub.register_operational_callback(self.process_callback, self._sn, ("available",))
             await self.process_callback()
         else:
             self._hub.register_hub_callback(self.process_hub_callback)
@@ -133,7 +134,7 @@ class TendaBeliPowerRefresh(TendaBeliButton):
         self._plug = self._hub.get_plug_by_serial_number(self._sn)
         if self._plug:
             _LOGGER.debug(f"Power refresh triggered for {self._sn}")
-            self._plug.send_power_request()
+            await self._hub.async_call(self._plug.send_power_request)
         else:
             _LOGGER.warning(f"Cannot refresh power: plug {self._sn} not found")
 
@@ -153,7 +154,7 @@ class TendaBeliEnergyRefresh(TendaBeliButton):
         self._plug = self._hub.get_plug_by_serial_number(self._sn)
         if self._plug:
             _LOGGER.debug(f"Energy refresh triggered for {self._sn}")
-            self._plug.send_energy_request()
+            await self._hub.async_call(self._plug.send_energy_request)
         else:
             _LOGGER.warning(f"Cannot refresh energy: plug {self._sn} not found")
 
@@ -173,6 +174,25 @@ class TendaBeliDisconnect(TendaBeliButton):
         _LOGGER.info(f"Disconnecting plug {self._sn}")
         await self._hub.remove_plug(self._sn)
 
+class TendaBeliDumpFrames(TendaBeliButton):
+    """Button to log the plug's most recent raw protocol frames."""
+    _attr_icon = "mdi:text-box-search-outline"
+
+    def __init__(self, hub: TendaBeliServer, sn: str) -> None:
+        super().__init__(hub, sn)
+        self._attr_name = "Dump Frames"
+        self._attr_unique_id = f"tbp_dump_frames_{sn}"
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    async def async_press(self) -> None:
+        """Handle button press - log the recent frames."""
+        frames = await self._hub.async_call(self._hub.dump_frames, self._sn)
+        _LOGGER.info("--- Last %d frames for plug %s ---", len(frames), self._sn)
+        for frame in frames:
+            _LOGGER.info(
+                "  %s %-3s %s %s", frame["time"], frame["direction"], frame["type"], frame["data"]
+            )
+
 # Hub Management Buttons
 class TendaBeliHubStart(TendaBeliButton):
     """Button to start the hub."""
@@ -0,0 +1,369 @@
+"""
+Tenda Beli Smart Plug Integration - Wire Codec.
+
+This module implements framing, decoding and encoding for the Tenda plug
+protocol. Every frame starts with a fixed 16-byte header whose first byte is
+0x24 ('$') and whose bytes 6-7 carry the big-endian payload length.
+
+Decoding is table driven: each packet type listed in ``PACKET_TYPES`` maps
+to a decoder that turns the frame into a typed, slotted message object.
+The module has no Home Assistant dependencies so it can be benchmarked and
+fuzzed on its own.
+
+"""
+import json
+import logging
+import re
+import struct
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from .const import PACKET_TYPES
+
+_LOGGER = logging.getLogger(__name__)
+
+# Frame header layout: magic, 0x00, version, 0x00, flags, packet type,
+# payload length, argument word, sequence word
+FRAME_MAGIC = 0x24
+HEADER = struct.Struct(">BBBBBBHII")
+HEADER_SIZE = HEADER.size
+TYPE_OFFSET = 5
+LENGTH_OFFSET = 6
+
+_LENGTH = struct.Struct(">H")
+_TLV = struct.Struct(">HH")
+_MAGIC_BYTE = bytes((FRAME_MAGIC,))
+
+PROTOCOL_VERSION = 3
+REDIRECT_VERSION = 2
+
+# Outbound packet types and argument words
+TYPE_HANDSHAKE = 0x1A
+TYPE_TOGGLE = 0x5D
+TYPE_KEEPALIVE_ACK = 0x66
+TYPE_ENERGY_ACK = 0x8C
+TYPE_REDIRECT = 0xD2
+TYPE_REQUEST = 0xD5
+ARG_POWER_REQUEST = 0x02050000
+ARG_ENERGY_REQUEST = 0x02080000
+TOGGLE_SEQUENCE = 0x5F0C0000
+
+# Power replies shorter than this carry no reading
+MIN_POWER_PAYLOAD = 36
+
+_JSON_OBJECT = re.compile(rb"\{.*\}", re.DOTALL)
+_SERIAL_NUMBER = re.compile(rb".*serialNum.{3}(.{17})", re.DOTALL)
+
+
+class PacketFramer:
+    """
+    Incremental, header-driven frame splitter for a single plug connection.
+
+    Received chunks are fed in as they arrive; complete frames are yielded as
+    memoryview slices of the receive buffer. A yielded frame is only valid
+    until the iterator is advanced, so handlers that keep data around must
+    copy it first.
+    """
+
+    __slots__ = ("_buffer", "frames", "bytes_discarded")
+
+    def __init__(self) -> None:
+        """Initialize an empty framer."""
+        self._buffer = bytearray()
+        self.frames = 0
+        self.bytes_discarded = 0
+
+    @property
+    def pending(self) -> int:
+        """Get the number of buffered bytes waiting for the rest of a frame."""
+        return len(self._buffer)
+
+    def reset(self) -> None:
+        """Drop any partially received frame."""
+        self._buffer.clear()
+
+    def feed(self, data: Union[bytes, bytearray]) -> Iterator[memoryview]:
+        """
+        Append received bytes and yield every complete frame.
+
+        When nothing is buffered the frames are sliced straight out of
+        ``data``; only an incomplete tail is copied into the buffer.
+
+        Args:
+            data: Bytes just read from the connection
+
+        Yields:
+            Complete frames, header included
+        """
+        if self._buffer:
+            self._buffer += data
+            source = self._buffer
+        else:
+            source = data
+
+        view = memoryview(source)
+        end = len(view)
+        pos = 0
+        try:
+            while end - pos >= HEADER_SIZE:
+                if view[pos] != FRAME_MAGIC:
+                    next_magic = source.find(_MAGIC_BYTE, pos)
+                    skipped = (end if next_magic == -1 else next_magic) - pos
+                    self.bytes_discarded += skipped
+                    _LOGGER.debug("Discarding %d bytes while resynchronizing", skipped)
+                    pos += skipped
+                    continue
+
+                (length,) = _LENGTH.unpack_from(view, pos + LENGTH_OFFSET)
+                frame_end = pos + HEADER_SIZE + length
+                if frame_end > end:
+                    break
+
+                frame = view[pos:frame_end]
+                pos = frame_end
+                self.frames += 1
+                try:
+                    yield frame
+                finally:
+                    frame.release()
+        finally:
+            view.release()
+            if source is self._buffer:
+                del self._buffer[:pos]
+            elif pos < end:
+                self._buffer += memoryview(data)[pos:]
+
+
+# Decoded message types
+@dataclass(frozen=True, slots=True)
+class KeepaliveMessage:
+    """Keepalive (0x65) sent periodically by the plug."""
+
+
+@dataclass(frozen=True, slots=True)
+class StatusMessage:
+    """Device status (0x66) with relay state and serial number."""
+    serial_number: Optional[str]
+    status: Optional[int]
+
+
+@dataclass(frozen=True, slots=True)
+class CommandResponseMessage:
+    """Reply (0x5E) to a command sent by the hub."""
+    length: int
+
+
+@dataclass(frozen=True, slots=True)
+class SerialMessage:
+    """Serial number announcement (0x67)."""
+    serial_number: Optional[str]
+
+
+@dataclass(frozen=True, slots=True)
+class PowerMessage:
+    """Power reading (0xD5); ``power`` is None for replies without a value."""
+    power: Optional[str]
+
+
+@dataclass(frozen=True, slots=True)
+class EnergyEntry:
+    """Single energy history record."""
+    timestamp: int
+    uptime: str
+    energy: str
+    on_time: str
+    increment: int
+
+
+@dataclass(frozen=True, slots=True)
+class EnergyMessage:
+    """Energy history (0x89) with parsed and rejected entries."""
+    has_energy: bool
+    entries: Tuple[EnergyEntry, ...]
+    rejected: Tuple[str, ...]
+
+
+Message = Union[
+    KeepaliveMessage,
+    StatusMessage,
+    CommandResponseMessage,
+    SerialMessage,
+    PowerMessage,
+    EnergyMessage,
+]
+
+_KEEPALIVE = KeepaliveMessage()
+_NO_ENERGY = EnergyMessage(False, (), ())
+
+
+def _json_object(payload: memoryview) -> Optional[dict]:
+    """Decode the outermost JSON object found in a payload."""
+    match = _JSON_OBJECT.search(payload)
+    if match is None:
+        return None
+    return json.loads(match.group())
+
+
+def _decode_keepalive(payload: memoryview) -> KeepaliveMessage:
+    return _KEEPALIVE
+
+
+def _decode_status(payload: memoryview) -> Optional[StatusMessage]:
+    document = _json_object(payload)
+    if document is None:
+        return None
+    return StatusMessage(document.get("serialNum"), document.get("status"))
+
+
+def _decode_command_response(payload: memoryview) -> CommandResponseMessage:
+    return CommandResponseMessage(len(payload))
+
+
+def _decode_serial(payload: memoryview) -> SerialMessage:
+    match = _SERIAL_NUMBER.match(payload)
+    return SerialMessage(match.group(1).decode("utf-8") if match else None)
+
+
+def _decode_power(payload: memoryview) -> PowerMessage:
+    if len(payload) < MIN_POWER_PAYLOAD:
+        return PowerMessage(None)
+    text = str(payload, "utf-8", errors="ignore")
+    if ":" not in text:
+        return PowerMessage(None)
+    return PowerMessage(text.rsplit(":", 1)[-1].strip('"}'))
+
+
+def parse_energy_entry(entry: str) -> Optional[EnergyEntry]:
+    """
+    Parse one ``timestamp,uptime,energy,on_time,increment`` history record.
+
+    Returns:
+        Parsed entry, or None if the record is malformed
+    """
+    fields = entry.split(",")
+    if len(fields) < 5:
+        return None
+    try:
+        return EnergyEntry(int(fields[0]), fields[1], fields[2], fields[3], int(fields[4]))
+    except ValueError:
+        return None
+
+
+def _decode_energy(payload: memoryview) -> EnergyMessage:
+    document = _json_object(payload)
+    if not isinstance(document, dict) or "energy" not in document:
+        return _NO_ENERGY
+
+    raw_entries = document["energy"]
+    if not isinstance(raw_entries, list):
+        raw_entries = [raw_entries] if raw_entries else []
+
+    entries = []
+    rejected = []
+    for raw_entry in raw_entries:
+        raw_entry = str(raw_entry)
+        entry = parse_energy_entry(raw_entry)
+        if entry is None:
+            rejected.append(raw_entry)
+        else:
+            entries.append(entry)
+    return EnergyMessage(True, tuple(entries), tuple(rejected))
+
+
+_DECODERS_BY_NAME: Dict[str, Callable[[memoryview], Optional[Message]]] = {
+    "KEEPALIVE": _decode_keepalive,
+    "STATUS": _decode_status,
+    "COMMAND_RESP": _decode_command_response,
+    "SERIAL": _decode_serial,
+    "POWER": _decode_power,
+    "ENERGY": _decode_energy,
+}
+
+DECODERS: Dict[int, Callable[[memoryview], Optional[Message]]] = {
+    code: _DECODERS_BY_NAME[name] for code, name in PACKET_TYPES.items()
+}
+
+
+def decode(frame: memoryview) -> Optional[Message]:
+    """
+    Decode a complete frame into a message object.
+
+    Args:
+        frame: Frame as yielded by ``PacketFramer.feed``
+
+    Returns:
+        Decoded message, or None for unknown packet types and payloads
+        without the expected content
+
+    Raises:
+        ValueError: If the payload is malformed JSON or text
+    """
+    decoder = DECODERS.get(frame[TYPE_OFFSET])
+    if decoder is None:
+        return None
+    return decoder(frame[HEADER_SIZE:])
+
+
+# Encoder for outbound frames
+def encode(
+    packet_type: int,
+    payload: bytes = b"",
+    flags: int = 0,
+    argument: int = 0,
+    sequence: int = 0,
+    version: int = PROTOCOL_VERSION,
+) -> bytes:
+    """
+    Build a frame with a standard header.
+
+    Args:
+        packet_type: Packet type byte
+        payload: Frame payload
+        flags: Header flags byte
+        argument: Header argument word
+        sequence: Header sequence word
+        version: Protocol version byte
+
+    Returns:
+        Encoded frame
+    """
+    return HEADER.pack(
+        FRAME_MAGIC, 0, version, 0, flags, packet_type, len(payload), argument, sequence
+    ) + payload
+
+
+def encode_tlv(items: Iterable[Tuple[int, bytes]]) -> bytes:
+    """Encode ``(tag, value)`` pairs as big-endian tag/length/value records."""
+    return b"".join(_TLV.pack(tag, len(value)) + value for tag, value in items)
+
+
+def encode_redirect(ip_address: str, port: int) -> bytes:
+    """
+    Build the rendezvous reply pointing a plug at a provisioning server.
+
+    Args:
+        ip_address: Dotted IPv4 address of the provisioning server
+        port: Provisioning server port
+    """
+    address = bytes(int(part) for part in ip_address.split("."))
+    if len(address) != 4:
+        raise ValueError(f"Invalid IP address format: {ip_address}")
+    payload = encode_tlv(((0x10, address), (0x11, port.to_bytes(2, "big"))))
+    return encode(TYPE_REDIRECT, payload, version=REDIRECT_VERSION)
+
+
+TOGGLE = encode(TYPE_TOGGLE, b'{"action":1}', flags=1, sequence=TOGGLE_SEQUENCE)
+POWER_REQUEST = encode(TYPE_REQUEST, argument=ARG_POWER_REQUEST)
+ENERGY_REQUEST = encode(TYPE_REQUEST, argument=ARG_ENERGY_REQUEST)
+KEEPALIVE_ACK = encode(TYPE_KEEPALIVE_ACK)
+ENERGY_ACK = encode(TYPE_ENERGY_ACK, b"null", flags=1)
+HANDSHAKE_RESPONSE = encode(
+    TYPE_HANDSHAKE,
+    encode_tlv((
+        (0x07, b"\x00"),
+        (0x08, b"\x00"),
+        (0x09, b"\x00"),
+        (0x0A, (100).to_bytes(2, "big")),
+        (0x0B, (86400).to_bytes(4, "big")),
+    )),
+)
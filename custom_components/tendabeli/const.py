@@ -9,6 +9,7 @@ including network settings, device information, and protocol specifications.
 # Integration metadata
 DOMAIN = "tendabeli"
 HUB = "hub"
+STORE = "store"
 
 # Supported Home Assistant platforms
 PLATFORMS: list[str] = ["switch", "sensor", "button"]
@@ -17,12 +18,73 @@ PLATFORMS: list[str] = ["switch", "sensor", "button"]
 DEFAULT_TIMEOUT = 101  # Timeout in seconds before marking a plug as dead
 DEFAULT_PORT = 1822    # Default provisioning server port
 RENDEZVOUS_PORT = 1821 # Rendezvous server port for device discovery
+HANDSHAKE_TIMEOUT = 10.0  # Seconds to wait for each provisioning handshake read
+PROVISIONING_SHARDS = 1  # Provisioning listeners on consecutive ports from DEFAULT_PORT
+PROVISIONING_USE_PROTOCOL = True  # Serve plugs with asyncio.Protocol instead of streams
+HUB_OFF_LOOP = False  # Run servers and packet decoding in a worker thread with its own loop
+COMMAND_TIMEOUT = 5.0  # Seconds to wait for a plug to confirm a toggle
+OUTBOUND_HIGH_WATER = 4096   # Buffered bytes per plug above which requests are dropped
+OUTBOUND_HARD_LIMIT = 65536  # Buffered bytes per plug at which the connection is closed
+
+# MAC address resolution
+ARP_TABLE_PATH = "/proc/net/arp"  # Kernel ARP table
+ARP_TABLE_MIN_REFRESH = 1.0  # Minimum seconds between ARP table reads
+MAC_CACHE_TTL = 300  # Seconds a resolved MAC address stays cached
+
+# Adaptive power polling
+POWER_POLL_MIN_INTERVAL = 10   # Poll interval while power is changing (seconds)
+POWER_POLL_MAX_INTERVAL = 300  # Longest interval while power is flat (seconds)
+POWER_POLL_BACKOFF = 2.0       # Interval multiplier after each unchanged reading
+POWER_POLL_JITTER = 0.1        # Random +/- fraction applied to every delay
+POWER_POLL_CHANGE_ABSOLUTE = 1.0   # Watts that count as a change
+POWER_POLL_CHANGE_RELATIVE = 0.05  # Fraction of the last reading that counts as a change
+
+# Rolling power statistics: each plug keeps its last POWER_SAMPLE_CAPACITY
+# readings in two float arrays (16 bytes per sample, about 2 KB per plug)
+POWER_SAMPLE_CAPACITY = 128
+POWER_STATS_WINDOWS = (60, 300, 900)  # Window lengths in seconds
+
+# Power sensor state writes: changes inside the deadband or sooner than the
+# minimum interval are held back, and a trailing write records the last value
+POWER_WRITE_DEADBAND_ABSOLUTE = 2.0   # Watts
+POWER_WRITE_DEADBAND_RELATIVE = 0.05  # Fraction of the last written value
+POWER_WRITE_MIN_INTERVAL = 10         # Seconds between writes
+POWER_WRITE_TRAILING_DELAY = 60       # Longest a held-back value waits (seconds)
+
+# Link quality: round trip times of power, energy and toggle requests
+LINK_RTT_ALPHA = 0.125   # EWMA weight of a new RTT sample
+LINK_JITTER_BETA = 0.25  # EWMA weight of a new RTT deviation sample
+LINK_RTT_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500)  # Histogram bucket upper bounds (ms)
+LINK_REPORT_INTERVAL = 60  # Minimum seconds between link quality sensor updates
 
 # Hub operational settings
 HUB_HEALTH_CHECK_INTERVAL = DEFAULT_TIMEOUT + 10  # Health check interval in seconds
 HUB_RETRY_DELAY = 30   # Delay between retries on error (seconds)
 HUB_RESTART_DELAY = 2  # Delay between stop and start during restart (seconds)
 HUB_UPDATE_INTERVAL = 600  # Hub status update interval (seconds)
+FLEET_UPDATE_INTERVAL = 5  # Minimum seconds between fleet aggregate sensor updates
+FLEET_TOP_CONSUMERS = 5    # Number of plugs listed by the top consumers sensor
+
+# Event loop lag and hub task health
+LOOP_MONITOR_INTERVAL = 1.0  # Seconds between loop lag samples
+LOOP_LAG_SAMPLES = 300       # Lag samples kept for percentiles (5 minutes at 1 s)
+LOOP_LAG_WARNING = 0.25      # p99 lag in seconds that raises a warning event
+LOOP_MONITOR_SLOWEST = 5     # Slowest packet handlers and entity callbacks kept
+EVENT_LOOP_LAG_WARNING = f"{DOMAIN}_loop_lag_warning"
+
+# Protocol trace: sampled debug logging and recent raw frames per plug
+TRACE_SAMPLE_EVERY = 50      # Debug-log one in this many packets of each type
+TRACE_WARNING_INTERVAL = 60  # Seconds between repeats of the same warning
+TRACE_FRAMES_PER_PLUG = 8    # Raw frames kept per plug for dumps (0 disables)
+
+# Persistent per-plug energy totals and device information
+STORAGE_KEY = f"{DOMAIN}.plugs"
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 30  # Seconds to batch changes before writing to disk
+
+# Import plug energy history into long-term statistics with real timestamps
+IMPORT_ENERGY_STATISTICS = True
+ENERGY_HISTORY_SEEN_SIZE = 64  # Recent history entry timestamps remembered per plug
 
 # Packet types for Tenda protocol communication
 PACKET_TYPES = {
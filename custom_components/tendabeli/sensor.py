@@ -5,18 +5,22 @@ This module provides sensor entities for monitoring power consumption, energy us
 device uptime, and hub statistics for Tenda SP9/SP3 smart plugs.
 
 """
+import asyncio
 import logging
+import time
 from abc import abstractmethod
 from datetime import datetime, timezone
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfEnergy, UnitOfPower, UnitOfTime
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfEnergy, UnitOfPower, UnitOfTime
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC
 from homeassistant.helpers.entity import DeviceInfo
@@ -25,6 +29,7 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from .const import (
     DOMAIN,
     HUB,
+    IMPORT_ENERGY_STATISTICS,
     MANUFACTURER,
     MODEL_HUB,
     MODEL_PLUG,
@@ -32,7 +37,7 @@ from .const import (
     ENTITY_NAME_PATTERNS,
     HUB_ENTITY_PATTERNS
 )
-from .tenda import TendaBeliPlug, TendaBeliServer, HubState, HubStatistics
+from .tenda import FleetAggregates, TendaBeliPlug, TendaBeliServer, HubState, HubStatistics
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -104,7 +109,10 @@ async def async_setup_entry(
                 TendaBeliUpTime(hub, serial_number),
                 TendaBeliOnTime(hub, serial_number),
                 TendaBeliPlugStatus(hub, serial_number),
-                TendaBeliLastSeen(hub, serial_number)
+                TendaBeliLastSeen(hub, serial_number),
+                TendaBeliLinkRtt(hub, serial_number),
+                TendaBeliLinkJitter(hub, serial_number),
+                TendaBeliLinkMissed(hub, serial_number)
             ]
             async_add_entities(plug_sensors)
 
@@ -118,7 +126,15 @@ async def async_setup_entry(
             TendaBeliHubUptime(hub),
             TendaBeliHubConnections(hub),
             TendaBeliHubPackets(hub),
-            TendaBeliHubErrors(hub)
+            TendaBeliHubErrors(hub),
+            TendaBeliHubBytes(hub),
+            TendaBeliHubHandlerTime(hub),
+            TendaBeliHubLoopLag(hub),
+            TendaBeliHubLoopLagP99(hub),
+            TendaBeliFleetPower(hub),
+            TendaBeliFleetEnergy(hub),
+            TendaBeliFleetLoadsOn(hub),
+            TendaBeliFleetTopConsumers(hub)
         ]
         async_add_entities(hub_sensors)
     
@@ -128,6 +144,8 @@ async def async_setup_entry(
 class TendaBeliSensor(SensorEntity):
     _attr_has_entity_name = True
     _attr_should_poll = False
+    # Plug snapshot fields shown by the entity besides availability
+    _plug_fields: Tuple[str, ...] = ()
 
     def __init__(self, hub: TendaBeliServer, sn: Optional[str] = None) -> None:
         self._hub = hub
@@ -136,14 +154,19 @@ class TendaBeliSensor(SensorEntity):
         self._attr_available = self._plug.alive if self._plug else False
 
         if sn:
+            # Fall back to stored device information for plugs not connected yet
+            record = self._hub.get_plug_record(sn) if not self._plug else {}
+            model = self._plug.model if self._plug else record.get("model")
+            firmware = self._plug.firmware if self._plug else record.get("firmware")
+            mac_address = self._plug._mac_address if self._plug else record.get("mac_address")
             self._attr_device_info = DeviceInfo(
                 #config_entry_id=self._hub.config_entry_id,
                 identifiers={(DOMAIN, sn)},
                 name=f"Tenda Plug {sn[-4:]}",
                 manufacturer=MANUFACTURER,
-                model=self._plug.model if self._plug and self._plug.model else MODEL_PLUG,
-                sw_version=self._plug.firmware if self._plug and self._plug.firmware else "unknown",
-                connections={(CONNECTION_NETWORK_MAC, self._plug._mac_address)} if self._plug and self._plug._mac_address else set(),
+                model=model or MODEL_PLUG,
+                sw_version=firmware or "unknown",
+                connections={(CONNECTION_NETWORK_MAC, mac_address)} if mac_address else set(),
                 serial_number=sn
             )
         else: # Pro Hub senzory
@@ -158,7 +181,9 @@ class TendaBeliSensor(SensorEntity):
         """Handle being added to hass and perform initial update."""
         if self._sn:
             # For plug entities, register the callback and do an initial pull.
-            self._hub.register_operational_callback(self.process_callback, self._sn)
+            self._hub.register_operational_callback(
+                self.process_callback, self._sn, ("available", *self._plug_fields)
+            )
             # This ensures the entity gets the state if the plug is already connected.
             await self.process_callback()
         else:
@@ -182,10 +207,24 @@ class TendaBeliSensor(SensorEntity):
             self._attr_available = self._plug.alive
             await self.async_update()
             self.async_write_ha_state()
+        elif self._restore_from_record(self._hub.get_restored_plug_data(self._sn)):
+            self.async_write_ha_state()
         elif self._attr_available:
             self._attr_available = False
             self.async_write_ha_state()
 
+    def _restore_from_record(self, record: Dict[str, Any]) -> bool:
+        """
+        Show a stored value while the plug has not connected yet.
+        
+        Args:
+            record: Stored plug data, empty once the plug has connected
+            
+        Returns:
+            True if the entity state was restored
+        """
+        return False
+
     async def process_hub_callback(self, state: HubState, statistics: HubStatistics) -> None:
         self._attr_available = True
         await self.async_update()
@@ -201,15 +240,78 @@ class TendaBeliPower(TendaBeliSensor):
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_suggested_display_precision = 1
     _attr_icon = "mdi:flash"
+    _plug_fields = ("power",)
     
     def __init__(self, hub: TendaBeliServer, sn: str) -> None:
         super().__init__(hub, sn)
         self._attr_unique_id = f"tbp_power_{sn}"
+        self._throttle = hub.power_write_throttle(sn)
+        self._trailing_write: Optional[asyncio.TimerHandle] = None
+
+    async def async_will_remove_from_hass(self) -> None:
+        await super().async_will_remove_from_hass()
+        self._cancel_trailing_write()
+        self._throttle.forget()
+
+    async def process_callback(self) -> None:
+        """Write power changes through the deadband and minimum-interval throttle."""
+        plug = self._hub.get_plug_by_sn(self._sn)
+        if not plug or not plug.alive or not self._attr_available:
+            # Availability changes are always written
+            self._cancel_trailing_write()
+            await super().process_callback()
+            self._throttle.record_write(self._attr_native_value, time.monotonic())
+            return
+
+        self._plug = plug
+        await self.async_update()
+        now = time.monotonic()
+        if self._throttle.should_write(self._attr_native_value, now):
+            self._write_power(now)
+        elif self._throttle.is_pending(self._attr_native_value):
+            self._throttle.suppressed += 1
+            if self._trailing_write is None:
+                self._trailing_write = asyncio.get_running_loop().call_later(
+                    self._throttle.trailing_delay_at(now), self._write_trailing
+                )
+
+    def _write_power(self, now: float) -> None:
+        """Write the current reading and remember it as the throttle baseline."""
+        self._cancel_trailing_write()
+        self._throttle.record_write(self._attr_native_value, now)
+        self._throttle.writes += 1
+        self.async_write_ha_state()
+
+    def _write_trailing(self) -> None:
+        """Record the last held-back reading."""
+        self._trailing_write = None
+        if self._throttle.is_pending(self._attr_native_value):
+            self._throttle.trailing_writes += 1
+            self._write_power(time.monotonic())
+
+    def _cancel_trailing_write(self) -> None:
+        if self._trailing_write is not None:
+            self._trailing_write.cancel()
+            self._trailing_write = None
 
     async def async_update(self) -> None:
         if self._plug:
             power, _ = self._plug.power
             self._attr_native_value = float(power) if power != "unknown" else None
+            # The sample buffer belongs to the hub's loop, which may be a worker thread
+            statistics = await self._hub.async_call(
+                self._plug.power_samples.statistics, time.monotonic()
+            )
+            self._attr_extra_state_attributes = self._rolling_statistics(statistics)
+
+    def _rolling_statistics(self, statistics: Dict[float, Optional[Dict[str, float]]]) -> Dict[str, Any]:
+        """Build min/max/mean/stddev attributes for each rolling window."""
+        attributes: Dict[str, Any] = {}
+        for span, stats in statistics.items():
+            suffix = f"{span // 60:g}m" if span % 60 == 0 else f"{span:g}s"
+            for name in ("min", "max", "mean", "stddev"):
+                attributes[f"{name}_{suffix}"] = round(stats[name], 2) if stats else None
+        return attributes
 
 class TendaBeliEnergy(TendaBeliSensor):
     _attr_name = "Energy"
@@ -218,10 +320,59 @@ class TendaBeliEnergy(TendaBeliSensor):
     _attr_state_class = SensorStateClass.TOTAL_INCREASING
     _attr_suggested_display_precision = 3
     _attr_icon = "mdi:lightning-bolt"
+    _plug_fields = ("energy",)
 
     def __init__(self, hub: TendaBeliServer, sn: str) -> None:
         super().__init__(hub, sn)
         self._attr_unique_id = f"tbp_energy_{sn}"
+        self._statistic_id = f"{DOMAIN}:energy_history_{sn.lower()}"
+
+    async def async_added_to_hass(self) -> None:
+        """Register for energy history batches in addition to state updates."""
+        await super().async_added_to_hass()
+        if IMPORT_ENERGY_STATISTICS:
+            self._hub.register_energy_history_callback(self.process_energy_history, self._sn)
+
+    async def async_will_remove_from_hass(self) -> None:
+        await super().async_will_remove_from_hass()
+        self._hub.remove_energy_history_callback(self.process_energy_history, self._sn)
+
+    def _restore_from_record(self, record: Dict[str, Any]) -> bool:
+        """Show the stored energy total so statistics continue across restarts."""
+        if record.get("energy") is None:
+            return False
+        try:
+            self._attr_native_value = float(record["energy"])
+        except (TypeError, ValueError):
+            return False
+        self._attr_available = True
+        return True
+
+    async def process_energy_history(self, history: List[Tuple[datetime, str]]) -> None:
+        """Import an energy history batch as hourly long-term statistics."""
+        if "recorder" not in self.hass.config.components:
+            return
+
+        # Keep the last cumulative total reported within each hour
+        hourly_totals: Dict[datetime, float] = {}
+        for timestamp, total in history:
+            start = timestamp.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+            hourly_totals[start] = float(total)
+
+        metadata = StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=f"Tenda Plug {self._sn[-4:]} Energy History",
+            source=DOMAIN,
+            statistic_id=self._statistic_id,
+            unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        )
+        statistics = [
+            StatisticData(start=start, state=total, sum=total)
+            for start, total in sorted(hourly_totals.items())
+        ]
+        async_add_external_statistics(self.hass, metadata, statistics)
+        _LOGGER.debug("Imported %d hourly energy statistics for %s", len(statistics), self._sn)
 
     async def async_update(self) -> None:
         """Update the sensor's state."""
@@ -236,6 +387,7 @@ class TendaBeliEnergy(TendaBeliSensor):
 class TendaBeliUpTime(TendaBeliSensor):
     _attr_name = "Uptime"
     _attr_icon = "mdi:clock-outline"
+    _plug_fields = ("uptime",)
     
     def __init__(self, hub: TendaBeliServer, sn: str) -> None:
         """Initialize the uptime sensor."""
@@ -262,6 +414,7 @@ class TendaBeliUpTime(TendaBeliSensor):
 class TendaBeliOnTime(TendaBeliSensor):
     _attr_name = "On Time"
     _attr_icon = "mdi:timer-outline"
+    _plug_fields = ("ontime",)
 
     def __init__(self, hub: TendaBeliServer, sn: str) -> None:
         """Initialize the on-time sensor."""
@@ -288,6 +441,7 @@ class TendaBeliOnTime(TendaBeliSensor):
 class TendaBeliPlugStatus(TendaBeliSensor):
     _attr_name = "Status"
     _attr_icon = "mdi:connection"
+    _plug_fields = ("status",)
 
     def __init__(self, hub: TendaBeliServer, sn: str) -> None:
         super().__init__(hub, sn)
@@ -303,6 +457,7 @@ class TendaBeliLastSeen(TendaBeliSensor):
     _attr_name = "Last Seen"
     _attr_device_class = SensorDeviceClass.TIMESTAMP
     _attr_icon = "mdi:clock-check-outline"
+    _plug_fields = ("last_seen",)
 
     def __init__(self, hub: TendaBeliServer, sn: str) -> None:
         super().__init__(hub, sn)
@@ -317,6 +472,55 @@ class TendaBeliLastSeen(TendaBeliSensor):
         else:
             self._attr_native_value = None
 
+class TendaBeliLinkSensor(TendaBeliSensor):
+    """Plug link quality value from the hub's periodic round trip time report."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _plug_fields = ("link",)
+    _key = ""
+    # Position in LinkQuality.report
+    _index = 0
+
+    def __init__(self, hub: TendaBeliServer, sn: str) -> None:
+        super().__init__(hub, sn)
+        self._attr_unique_id = f"tbp_{self._key}_{sn}"
+
+    async def async_update(self) -> None:
+        report = self._plug.link.report if self._plug else None
+        self._attr_native_value = report[self._index] if report else None
+
+class TendaBeliLinkRtt(TendaBeliLinkSensor):
+    _attr_name = "Round Trip Time"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_icon = "mdi:wifi-sync"
+    _key = "rtt"
+    _index = 0
+
+    async def async_update(self) -> None:
+        await super().async_update()
+        if self._plug:
+            link = self._plug.link.as_dict()
+            self._attr_extra_state_attributes = {
+                "requests": link["requests"],
+                "replies": link["replies"],
+                "histogram_ms": link["rtt_histogram_ms"],
+            }
+
+class TendaBeliLinkJitter(TendaBeliLinkSensor):
+    _attr_name = "Round Trip Jitter"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_icon = "mdi:wifi-alert"
+    _key = "rtt_jitter"
+    _index = 1
+
+class TendaBeliLinkMissed(TendaBeliLinkSensor):
+    _attr_name = "Missed Replies"
+    _attr_native_unit_of_measurement = PERCENTAGE
+    _attr_icon = "mdi:wifi-remove"
+    _key = "missed_replies"
+    _index = 2
+
 # --- Hub Sensors ---
 class TendaBeliHubState(TendaBeliSensor):
     _attr_name = "Hub State"
@@ -355,6 +559,9 @@ class TendaBeliHubConnections(TendaBeliSensor):
 
     async def async_update(self) -> None:
         self._attr_native_value = self._hub.stats.current_connections
+        self._attr_extra_state_attributes = {
+            "shards": self._hub.shards.as_dict(list(self._hub.connected_plugs.values()))
+        }
 
 class TendaBeliHubPackets(TendaBeliSensor):
     _attr_name = "Hub Packets Received"
@@ -372,4 +579,133 @@ class TendaBeliHubErrors(TendaBeliSensor):
     _attr_icon = "mdi:alert-circle-outline"
 
     async def async_update(self) -> None:
-        self._attr_native_value = self._hub.stats.errors
\ No newline at end of file
+        self._attr_native_value = self._hub.stats.errors
+
+class TendaBeliHubBytes(TendaBeliSensor):
+    _attr_name = "Hub Bytes Received"
+    _attr_unique_id = "tbh_bytes"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_icon = "mdi:download-network"
+
+    async def async_update(self) -> None:
+        metrics = self._hub.stats.packet_metrics
+        self._attr_native_value = metrics.total_bytes
+        self._attr_extra_state_attributes = {
+            name: {"packets": values["packets"], "bytes": values["bytes"]}
+            for name, values in metrics.as_dict().items()
+        }
+
+class TendaBeliHubHandlerTime(TendaBeliSensor):
+    _attr_name = "Hub Packet Handling Time p99"
+    _attr_unique_id = "tbh_handler_time_p99"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_icon = "mdi:timer-sand"
+
+    async def async_update(self) -> None:
+        metrics = self._hub.stats.packet_metrics
+        p99 = metrics.percentile_us(0.99)
+        self._attr_native_value = p99 / 1000 if p99 is not None else None
+        self._attr_extra_state_attributes = {
+            name: {key: value for key, value in values.items() if key.endswith("_us")}
+            for name, values in metrics.as_dict().items()
+        }
+
+class TendaBeliHubLoopLag(TendaBeliSensor):
+    _attr_name = "Hub Loop Lag p50"
+    _attr_unique_id = "tbh_loop_lag_p50"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_icon = "mdi:timer-alert-outline"
+    _fraction = 0.5
+
+    async def async_update(self) -> None:
+        lag = self._hub.loop_monitor.percentile(self._fraction)
+        self._attr_native_value = round(lag * 1000, 3) if lag is not None else None
+
+class TendaBeliHubLoopLagP99(TendaBeliHubLoopLag):
+    _attr_name = "Hub Loop Lag p99"
+    _attr_unique_id = "tbh_loop_lag_p99"
+    _fraction = 0.99
+
+    async def async_update(self) -> None:
+        await super().async_update()
+        self._attr_extra_state_attributes = {
+            **self._hub.loop_monitor.as_dict(),
+            "slowest_entity_callbacks": self._hub.entity_callbacks.as_list(),
+            "connections": self._hub.stats.current_connections,
+            "warnings": self._hub.stats.loop_lag_warnings,
+        }
+
+
+class TendaBeliFleetSensor(TendaBeliSensor):
+    """Hub sensor fed by the hub's throttled fleet aggregate updates."""
+
+    async def async_added_to_hass(self) -> None:
+        self._hub.register_fleet_callback(self.process_fleet_callback)
+        await self.process_fleet_callback(self._hub.fleet)
+
+    async def async_will_remove_from_hass(self) -> None:
+        self._hub.remove_fleet_callback(self.process_fleet_callback)
+
+    async def process_fleet_callback(self, fleet: FleetAggregates) -> None:
+        self._attr_available = True
+        self.update_from_fleet(fleet)
+        self.async_write_ha_state()
+
+    async def async_update(self) -> None:
+        self.update_from_fleet(self._hub.fleet)
+
+    @abstractmethod
+    def update_from_fleet(self, fleet: FleetAggregates) -> None: pass
+
+class TendaBeliFleetPower(TendaBeliFleetSensor):
+    _attr_name = "Total Power"
+    _attr_unique_id = "tbh_total_power"
+    _attr_device_class = SensorDeviceClass.POWER
+    _attr_native_unit_of_measurement = UnitOfPower.WATT
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 1
+    _attr_icon = "mdi:home-lightning-bolt"
+
+    def update_from_fleet(self, fleet: FleetAggregates) -> None:
+        self._attr_native_value = round(fleet.total_power, 1)
+
+class TendaBeliFleetEnergy(TendaBeliFleetSensor):
+    _attr_name = "Total Energy"
+    _attr_unique_id = "tbh_total_energy"
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_suggested_display_precision = 3
+    _attr_icon = "mdi:lightning-bolt"
+
+    def update_from_fleet(self, fleet: FleetAggregates) -> None:
+        self._attr_native_value = round(fleet.total_energy, 3)
+
+class TendaBeliFleetLoadsOn(TendaBeliFleetSensor):
+    _attr_name = "Loads On"
+    _attr_unique_id = "tbh_loads_on"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_icon = "mdi:power-plug"
+
+    def update_from_fleet(self, fleet: FleetAggregates) -> None:
+        self._attr_native_value = fleet.loads_on
+
+class TendaBeliFleetTopConsumers(TendaBeliFleetSensor):
+    _attr_name = "Top Consumer"
+    _attr_unique_id = "tbh_top_consumer"
+    _attr_icon = "mdi:format-list-numbered"
+
+    def update_from_fleet(self, fleet: FleetAggregates) -> None:
+        consumers = fleet.top_consumers()
+        self._attr_native_value = consumers[0][0] if consumers else None
+        self._attr_extra_state_attributes = {
+            "consumers": [
+                {"serial_number": serial_number, "power": round(watts, 1)}
+                for serial_number, watts in consumers
+            ]
+        }
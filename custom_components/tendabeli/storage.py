@@ -0,0 +1,85 @@
+"""
+Persistent storage for Tenda Beli Smart Plug Integration.
+
+This module keeps per-plug energy totals, the last applied energy history
+timestamp and device information across Home Assistant restarts, so
+entities can show last known values before the plugs reconnect.
+
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import STORAGE_KEY, STORAGE_SAVE_DELAY, STORAGE_VERSION
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TendaBeliStore:
+    """
+    Debounced store of per-plug records keyed by serial number.
+
+    Records are updated in memory and written to disk in one batch at most
+    every ``STORAGE_SAVE_DELAY`` seconds, and once more on unload.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """
+        Initialize the store.
+
+        Args:
+            hass: Home Assistant instance
+        """
+        self._store: Store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+
+    async def async_load(self) -> None:
+        """Load stored records from disk."""
+        data = await self._store.async_load()
+        if isinstance(data, dict):
+            self._records = dict(data.get("plugs", {}))
+        _LOGGER.debug("Loaded stored data for %d plugs", len(self._records))
+
+    @property
+    def serial_numbers(self) -> List[str]:
+        """Get the serial numbers of all stored plugs."""
+        return list(self._records)
+
+    def get(self, serial_number: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the stored record for a plug.
+
+        Args:
+            serial_number: Plug serial number
+
+        Returns:
+            Stored record, or None if the plug is unknown
+        """
+        return self._records.get(serial_number)
+
+    def save_record(self, serial_number: str, record: Dict[str, Any]) -> None:
+        """
+        Update a plug's record and schedule a delayed save.
+
+        Args:
+            serial_number: Plug serial number
+            record: Data to keep for the plug
+        """
+        if self._records.get(serial_number) == record:
+            return
+        self._records[serial_number] = record
+        self._dirty = True
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    async def async_flush(self) -> None:
+        """Write pending changes to disk immediately."""
+        if self._dirty:
+            await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self) -> Dict[str, Any]:
+        """Build the data written to disk."""
+        self._dirty = False
+        return {"plugs": self._records}
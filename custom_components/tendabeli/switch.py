@@ -5,14 +5,16 @@ This module provides Home Assistant switch entities for controlling Tenda SP9/SP
 including power state management and device attribute reporting.
 
 """
-import asyncio
 import logging
 from typing import Any, Dict, Optional
 
 from homeassistant.components.switch import SwitchDeviceClass, SwitchEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC
+from homeassistant.helpers.device_registry import (
+    CONNECTION_NETWORK_MAC,
+    async_get as async_get_device_registry,
+)
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
@@ -88,7 +90,7 @@ class TendaBeliSwitch(SwitchEntity):
         self._serial_number = serial_number
         self._plug: Optional[TendaBeliPlug] = self._hub.get_plug_by_serial_number(serial_number)
 
-        self._state = self._plug.is_on if self._plug else False
+        self._state = self._plug.optimistic_is_on if self._plug else False
         self._available = self._plug.alive if self._plug else False
         
         self._attr_name = "Switch"
@@ -96,15 +98,20 @@ class TendaBeliSwitch(SwitchEntity):
         self._attr_device_class = SwitchDeviceClass.OUTLET
         
         # Device information for Home Assistant device registry
+        # Fall back to stored device information for plugs not connected yet
+        record = hub.get_plug_record(serial_number) if not self._plug else {}
+        model = self._plug.model if self._plug else record.get("model")
+        firmware = self._plug.firmware if self._plug else record.get("firmware")
+        mac_address = self._plug.mac_address if self._plug else record.get("mac_address")
         self._attr_device_info = DeviceInfo(
             identifiers={(DOMAIN, serial_number)},
             name=f"Tenda Plug {serial_number[-4:]}",
             manufacturer=MANUFACTURER,
-            model=self._plug.model if self._plug and self._plug.model else MODEL_PLUG,
-            sw_version=self._plug.firmware if self._plug and self._plug.firmware else "unknown",
+            model=model or MODEL_PLUG,
+            sw_version=firmware or "unknown",
             connections=(
-                {(CONNECTION_NETWORK_MAC, self._plug.mac_address)} 
-                if self._plug and self._plug.mac_address 
+                {(CONNECTION_NETWORK_MAC, mac_address)} 
+                if mac_address 
                 else set()
             ),
             serial_number=serial_number
@@ -114,7 +121,8 @@ class TendaBeliSwitch(SwitchEntity):
         """Register operational callback when added to Home Assistant."""
         self._hub.register_operational_callback(
             self.process_callback, 
-            self._serial_number
+            self._serial_number,
+            ("available", "is_on", "power", "energy", "status", "device", "command")
         )
         await self.process_callback()
 
@@ -128,8 +136,26 @@ class TendaBeliSwitch(SwitchEntity):
     async def process_callback(self) -> None:
         """Handle updates from the hub and refresh entity state."""
         await self.async_update()
+        self._update_device_connections()
         self.async_write_ha_state()
 
+    def _update_device_connections(self) -> None:
+        """Add the MAC address to the device once it has been resolved."""
+        if not self._plug or not self._plug.mac_address or self.device_entry is None:
+            return
+
+        connection = (CONNECTION_NETWORK_MAC, self._plug.mac_address)
+        if connection not in self.device_entry.connections:
+            _LOGGER.debug(
+                "Adding MAC address %s to device %s",
+                self._plug.mac_address,
+                self._serial_number
+            )
+            async_get_device_registry(self.hass).async_update_device(
+                self.device_entry.id,
+                merge_connections={connection}
+            )
+
     @property
     def is_on(self) -> bool:
         """Return True if the switch is on."""
@@ -155,7 +181,8 @@ class TendaBeliSwitch(SwitchEntity):
                 "total_energy": energy_value if energy_value != "unknown" else None,
                 "ip_address": self._plug.ip_address,
                 "mac_address": self._plug.mac_address,
-                "status": self._plug.status.value
+                "status": self._plug.status.value,
+                "command_latency": self._plug.command_latency
             })
         
         return attributes
@@ -167,7 +194,7 @@ class TendaBeliSwitch(SwitchEntity):
         if self._plug:
             self._available = self._plug.alive
             old_state = self._state
-            self._state = self._plug.is_on
+            self._state = self._plug.optimistic_is_on
             
             if old_state != self._state:
                 _LOGGER.debug(
@@ -176,6 +203,9 @@ class TendaBeliSwitch(SwitchEntity):
                     old_state, 
                     self._state
                 )
+        elif self._hub.get_restored_plug_data(self._serial_number):
+            # Restored at startup from storage; the plug has not connected yet
+            self._available = False
         else:
             self._available = False
             _LOGGER.warning(
@@ -183,65 +213,53 @@ class TendaBeliSwitch(SwitchEntity):
                 self._serial_number
             )
 
-    async def _send_toggle_command(self) -> bool:
+    async def _async_set_state(self, turn_on: bool) -> None:
         """
-        Send toggle command with comprehensive error handling.
+        Request a power state and wait for the plug to confirm it.
         
-        Returns:
-            True if command sent successfully, False otherwise
+        Args:
+            turn_on: Requested power state
         """
         self._plug = self._hub.get_plug_by_serial_number(self._serial_number)
+        action = "turn on" if turn_on else "turn off"
         
         if not self._plug:
             _LOGGER.error(
-                "Cannot toggle %s: plug not found", 
+                "Cannot %s %s: plug not found", 
+                action,
                 self._serial_number
             )
-            return False
+            return
         
         if not self.available:
             _LOGGER.error(
-                "Cannot toggle %s: plug not available", 
+                "Cannot %s %s: plug not available", 
+                action,
                 self._serial_number
             )
-            return False
+            return
         
         try:
-            self._plug.send_toggle_request()
-            _LOGGER.debug("Toggle command sent to %s", self._serial_number)
-            
-            # Brief delay then request power update
-            await asyncio.sleep(0.5)
-            self._plug.send_power_request()
-            return True
-            
+            if not await self._hub.async_run(self._plug.async_set_state(turn_on)):
+                _LOGGER.warning("Failed to %s %s", action, self._serial_number)
         except Exception as err:
             _LOGGER.error(
-                "Failed to send toggle command to %s: %s", 
+                "Failed to send command to %s: %s", 
                 self._serial_number, 
                 err
             )
-            return False
 
     async def async_turn_on(self, **kwargs) -> None:
         """Turn the switch on."""
-        if not self._state:
-            success = await self._send_toggle_command()
-            if not success:
-                _LOGGER.warning("Failed to turn on %s", self._serial_number)
+        await self._async_set_state(True)
 
     async def async_turn_off(self, **kwargs) -> None:
         """Turn the switch off."""
-        if self._state:
-            success = await self._send_toggle_command()
-            if not success:
-                _LOGGER.warning("Failed to turn off %s", self._serial_number)
+        await self._async_set_state(False)
 
     async def async_toggle(self, **kwargs) -> None:
         """Toggle the switch state."""
-        success = await self._send_toggle_command()
-        if not success:
-            _LOGGER.warning("Failed to toggle %s", self._serial_number)
+        await self._async_set_state(not self._state)
 
     @property
     def icon(self) -> Optional[str]:
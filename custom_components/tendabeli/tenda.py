@@ -6,23 +6,66 @@ including device discovery, connection management, and data processing.
 
 """
 import asyncio
-import json
+import bisect
+import hashlib
+import heapq
+import itertools
 import logging
+import math
 import os
+import random
 import re
 import time
+from array import array
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any, Callable, Dict, Optional, Set, Tuple
-from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple, Union
+from dataclasses import dataclass, field
 
 from .const import (
     PLATFORMS,
     DEFAULT_TIMEOUT,
     DEFAULT_PORT,
+    RENDEZVOUS_PORT,
     HUB_RESTART_DELAY,
     PACKET_TYPES,
+    ARP_TABLE_PATH,
+    ARP_TABLE_MIN_REFRESH,
+    MAC_CACHE_TTL,
+    COMMAND_TIMEOUT,
+    HANDSHAKE_TIMEOUT,
+    PROVISIONING_USE_PROTOCOL,
+    PROVISIONING_SHARDS,
+    HUB_OFF_LOOP,
+    POWER_POLL_MIN_INTERVAL,
+    POWER_POLL_MAX_INTERVAL,
+    POWER_POLL_BACKOFF,
+    POWER_POLL_JITTER,
+    POWER_POLL_CHANGE_ABSOLUTE,
+    POWER_POLL_CHANGE_RELATIVE,
+    ENERGY_HISTORY_SEEN_SIZE,
+    POWER_SAMPLE_CAPACITY,
+    POWER_STATS_WINDOWS,
+    FLEET_UPDATE_INTERVAL,
+    FLEET_TOP_CONSUMERS,
+    POWER_WRITE_DEADBAND_ABSOLUTE,
+    POWER_WRITE_DEADBAND_RELATIVE,
+    POWER_WRITE_MIN_INTERVAL,
+    POWER_WRITE_TRAILING_DELAY,
+    LOOP_MONITOR_INTERVAL,
+    LOOP_LAG_SAMPLES,
+    LOOP_LAG_WARNING,
+    LOOP_MONITOR_SLOWEST,
+    LINK_RTT_ALPHA,
+    LINK_JITTER_BETA,
+    LINK_RTT_BUCKETS,
+    LINK_REPORT_INTERVAL,
 )
+from . import codec
+from .codec import TYPE_OFFSET, EnergyEntry, PacketFramer
+from .trace import DIRECTION_IN, DIRECTION_OUT, FrameRing, Hex, ProtocolTrace
+from .transport import Enqueued, OutboundQueue, ProvisioningProtocol
+from .worker import HubWorker
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -47,6 +90,123 @@ class HubState(Enum):
     STOPPING = "stopping"
     ERROR = "error"
 
+class PacketTypeMetrics:
+    """
+    Per-packet-type receive counters and handling-time histograms.
+    
+    Everything is stored in flat integer arrays indexed by a slot per known
+    packet type, with one extra slot for unknown types. Recording a packet
+    only increments array elements; totals and percentiles are derived when
+    the data is read.
+    
+    Handling time covers decoding and the packet handler. Histogram bucket 0
+    counts packets handled in under 1 µs and bucket ``i`` counts those that
+    took ``2**(i-1)`` to ``2**i`` µs; the last bucket also takes everything
+    slower.
+    """
+
+    HISTOGRAM_BUCKETS = 20
+    UNKNOWN = "UNKNOWN"
+
+    __slots__ = ("_slots", "_names", "packets", "bytes", "handler_time_ns", "histogram")
+
+    def __init__(self, packet_types: Dict[int, str] = PACKET_TYPES) -> None:
+        """
+        Initialize zeroed metrics.
+        
+        Args:
+            packet_types: Mapping of packet type codes to names
+        """
+        self._names: Tuple[str, ...] = (*packet_types.values(), self.UNKNOWN)
+        unknown_slot = len(packet_types)
+        slots = bytearray([unknown_slot]) * 256
+        for slot, packet_type in enumerate(packet_types):
+            slots[packet_type] = slot
+        self._slots = bytes(slots)
+        self.packets = array("Q", bytes(8 * len(self._names)))
+        self.bytes = array("Q", bytes(8 * len(self._names)))
+        self.handler_time_ns = array("Q", bytes(8 * len(self._names)))
+        self.histogram = array("Q", bytes(8 * len(self._names) * self.HISTOGRAM_BUCKETS))
+
+    def slot(self, packet_type: int) -> int:
+        """Return the array slot for a packet type code."""
+        return self._slots[packet_type]
+
+    def record_received(self, slot: int, size: int) -> None:
+        """Count one received packet of ``size`` bytes."""
+        self.packets[slot] += 1
+        self.bytes[slot] += size
+
+    def record_handled(self, slot: int, elapsed_ns: int) -> None:
+        """Add one handling-time sample to the slot's histogram."""
+        self.handler_time_ns[slot] += elapsed_ns
+        bucket = (elapsed_ns // 1000).bit_length()
+        if bucket >= self.HISTOGRAM_BUCKETS:
+            bucket = self.HISTOGRAM_BUCKETS - 1
+        self.histogram[slot * self.HISTOGRAM_BUCKETS + bucket] += 1
+
+    def reset(self) -> None:
+        """Zero all counters."""
+        for counters in (self.packets, self.bytes, self.handler_time_ns, self.histogram):
+            counters[:] = array("Q", bytes(8 * len(counters)))
+
+    @property
+    def total_bytes(self) -> int:
+        """Total bytes received across all packet types."""
+        return sum(self.bytes)
+
+    def percentile_us(self, fraction: float, slot: Optional[int] = None) -> Optional[int]:
+        """
+        Estimate a handling-time percentile from the histogram.
+        
+        Args:
+            fraction: Percentile as a fraction, e.g. 0.99
+            slot: Packet type slot, or None for all packet types combined
+            
+        Returns:
+            Upper bound in microseconds of the bucket holding the percentile,
+            or None when nothing has been recorded
+        """
+        buckets = self.HISTOGRAM_BUCKETS
+        if slot is None:
+            counts = [sum(self.histogram[bucket::buckets]) for bucket in range(buckets)]
+        else:
+            counts = self.histogram[slot * buckets:(slot + 1) * buckets]
+        total = sum(counts)
+        if not total:
+            return None
+        threshold = total * fraction
+        seen = 0
+        for bucket, count in enumerate(counts):
+            seen += count
+            if seen >= threshold:
+                return 1 << bucket
+        return 1 << (buckets - 1)
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize the metrics per packet type.
+        
+        Returns:
+            Dictionary keyed by packet type name with counts, bytes, mean and
+            percentile handling times; types never received are omitted
+        """
+        summary = {}
+        for slot, name in enumerate(self._names):
+            packets = self.packets[slot]
+            if not packets:
+                continue
+            handled = sum(self.histogram[slot * self.HISTOGRAM_BUCKETS:(slot + 1) * self.HISTOGRAM_BUCKETS])
+            summary[name] = {
+                "packets": packets,
+                "bytes": self.bytes[slot],
+                "mean_handler_us": round(self.handler_time_ns[slot] / handled / 1000, 1) if handled else None,
+                "p50_handler_us": self.percentile_us(0.5, slot),
+                "p99_handler_us": self.percentile_us(0.99, slot),
+            }
+        return summary
+
+
 @dataclass
 class HubStatistics:
     """Container for hub operational statistics and metrics."""
@@ -58,6 +218,20 @@ class HubStatistics:
     errors: int = 0
     last_error: Optional[str] = None
     uptime: float = 0.0
+    state_updates_requested: int = 0
+    state_updates_merged: int = 0
+    state_notifications: int = 0
+    packet_metrics: PacketTypeMetrics = field(default_factory=PacketTypeMetrics)
+    liveness_tracked: int = 0
+    liveness_checks: int = 0
+    liveness_reschedules: int = 0
+    liveness_time_ns: int = 0
+    plugs_expired: int = 0
+    expiry_latency_last: Optional[float] = None
+    expiry_latency_max: float = 0.0
+    energy_entries_applied: int = 0
+    energy_entries_skipped: int = 0
+    loop_lag_warnings: int = 0
     
     def update_uptime(self) -> None:
         """Calculate and update the current uptime."""
@@ -65,28 +239,1211 @@ class HubStatistics:
             self.uptime = time.time() - self.start_time
 
 
-def get_mac_address_from_arp(ip_address: str) -> Optional[str]:
+class LivenessTracker:
+    """
+    Min-heap of plug liveness deadlines.
+    
+    Every tracked plug has exactly one heap entry. Keepalives only move the
+    plug's last-seen time forward; when an entry reaches the top of the heap
+    and the plug has been seen since it was pushed, it is pushed back with
+    the new deadline. A live plug therefore costs one O(log n) push per
+    timeout period instead of work on every keepalive, and a stale plug is
+    found as soon as its real deadline passes.
+    """
+
+    def __init__(self, statistics: HubStatistics) -> None:
+        """
+        Initialize an empty tracker.
+        
+        Args:
+            statistics: Hub statistics receiving the scheduler metrics
+        """
+        self._heap: List[Tuple[float, int, 'TendaBeliPlug']] = []
+        self._counter = itertools.count()
+        self._statistics = statistics
+        self.wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def add(self, plug: 'TendaBeliPlug') -> None:
+        """Start tracking a plug's deadline."""
+        started = time.perf_counter_ns()
+        heapq.heappush(self._heap, (plug.deadline, next(self._counter), plug))
+        if self._heap[0][2] is plug:
+            self.wakeup.set()
+        self._statistics.liveness_time_ns += time.perf_counter_ns() - started
+
+    def next_delay(self) -> Optional[float]:
+        """Seconds until the earliest deadline, or None when nothing is tracked."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.time())
+
+    def pop_expired(self, is_tracked: Callable[['TendaBeliPlug'], bool]) -> List['TendaBeliPlug']:
+        """
+        Remove and return plugs whose deadline has passed.
+        
+        Args:
+            is_tracked: Whether the hub still tracks a plug; entries for
+                plugs that were disconnected or replaced are dropped
+            
+        Returns:
+            Plugs that went stale, in deadline order
+        """
+        started = time.perf_counter_ns()
+        statistics = self._statistics
+        heap = self._heap
+        now = time.time()
+        expired = []
+        while heap and heap[0][0] <= now:
+            plug = heapq.heappop(heap)[2]
+            statistics.liveness_checks += 1
+            if not is_tracked(plug):
+                continue
+
+            deadline = plug.deadline
+            if deadline > now:
+                heapq.heappush(heap, (deadline, next(self._counter), plug))
+                statistics.liveness_reschedules += 1
+                continue
+
+            latency = now - deadline
+            statistics.plugs_expired += 1
+            statistics.expiry_latency_last = latency
+            statistics.expiry_latency_max = max(statistics.expiry_latency_max, latency)
+            expired.append(plug)
+
+        statistics.liveness_time_ns += time.perf_counter_ns() - started
+        return expired
+
+    def clear(self) -> None:
+        """Forget all deadlines."""
+        self._heap.clear()
+
+
+def read_arp_table(path: str = ARP_TABLE_PATH) -> Dict[str, str]:
     """
-    Retrieve MAC address for given IP using ARP table.
+    Read the kernel ARP table.
+    
+    This performs blocking file I/O and must run in an executor.
     
     Args:
-        ip_address: Target IP address
+        path: Location of the ARP table
         
     Returns:
-        MAC address string if found, None otherwise
+        Dictionary mapping IP addresses to MAC addresses for complete entries
     """
+    table: Dict[str, str] = {}
     try:
-        with os.popen(f"arp -n {ip_address}") as process:
-            arp_output = process.read()
+        with open(path, encoding="ascii") as arp_file:
+            next(arp_file, None)  # Skip header line
+            for line in arp_file:
+                fields = line.split()
+                if len(fields) < 4 or fields[2] == "0x0":
+                    continue
+                if fields[3] != "00:00:00:00:00:00":
+                    table[fields[0]] = fields[3].lower()
+    except OSError as err:
+        _LOGGER.debug("ARP table %s not readable: %s", path, err)
+    return table
+
+
+class MacAddressResolver:
+    """
+    Non-blocking MAC address lookup with a TTL cache keyed by IP address.
+    
+    Lookups read the whole kernel ARP table in an executor, so a burst of
+    reconnecting plugs is served by a single read. When an address is not in
+    the table, ``arp -n`` is queried as an asynchronous subprocess.
+    """
+
+    _MAC_PATTERN = re.compile(r'([a-fA-F0-9]{2}[:-]){5}[a-fA-F0-9]{2}')
+
+    def __init__(self, ttl: float = MAC_CACHE_TTL) -> None:
+        """
+        Initialize an empty resolver.
         
-        mac_pattern = r'([a-fA-F0-9]{2}[:-]){5}[a-fA-F0-9]{2}'
-        mac_match = re.search(mac_pattern, arp_output)
+        Args:
+            ttl: Seconds a resolved address stays cached
+        """
+        self._ttl = ttl
+        self._cache: Dict[str, Tuple[str, float]] = {}
+        self._table_read: Optional[asyncio.Future] = None
+        self._table_read_time = 0.0
+
+    def get_cached(self, ip_address: str) -> Optional[str]:
+        """Return a cached MAC address if it has not expired."""
+        entry = self._cache.get(ip_address)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    async def async_resolve(self, ip_address: str) -> Optional[str]:
+        """
+        Resolve the MAC address for an IP without blocking the event loop.
         
-        return mac_match.group(0) if mac_match else None
+        Args:
+            ip_address: Target IP address
+            
+        Returns:
+            MAC address string if found, None otherwise
+        """
+        mac_address = self.get_cached(ip_address)
+        if mac_address:
+            return mac_address
+
+        await self._async_refresh_table()
+        mac_address = self.get_cached(ip_address)
+        if mac_address:
+            return mac_address
+
+        mac_address = await self._async_query_arp(ip_address)
+        if mac_address:
+            self._cache[ip_address] = (mac_address, time.monotonic() + self._ttl)
+        return mac_address
+
+    async def _async_refresh_table(self) -> None:
+        """Re-read the ARP table, sharing one read between concurrent callers."""
+        if self._table_read is None or self._table_read.done():
+            if time.monotonic() - self._table_read_time < ARP_TABLE_MIN_REFRESH:
+                return
+            self._table_read_time = time.monotonic()
+            self._table_read = asyncio.get_running_loop().run_in_executor(None, read_arp_table)
+            self._table_read.add_done_callback(self._store_table)
+
+        await asyncio.shield(self._table_read)
+
+    def _store_table(self, table_read: asyncio.Future) -> None:
+        """Replace expired cache entries with a freshly read ARP table."""
+        if table_read.cancelled() or table_read.exception():
+            return
+
+        now = time.monotonic()
+        self._cache = {ip: entry for ip, entry in self._cache.items() if entry[1] > now}
+        expires = now + self._ttl
+        for ip_address, mac_address in table_read.result().items():
+            self._cache[ip_address] = (mac_address, expires)
+
+    async def _async_query_arp(self, ip_address: str) -> Optional[str]:
+        """Fall back to the ``arp`` command run as an asynchronous subprocess."""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "arp", "-n", ip_address,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            try:
+                arp_output, _ = await asyncio.wait_for(process.communicate(), timeout=5.0)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise
+        except Exception as err:
+            _LOGGER.debug("ARP query for %s failed: %s", ip_address, err)
+            return None
+
+        mac_match = self._MAC_PATTERN.search(arp_output.decode(errors="ignore"))
+        return mac_match.group(0).lower().replace("-", ":") if mac_match else None
+
+
+class PowerPollScheduler:
+    """
+    Adaptive power polling for a single plug.
+    
+    Polls at the minimum interval while readings change and backs off
+    geometrically towards the maximum interval while they stay flat. Every
+    delay gets random jitter so plugs that connected together do not poll
+    in lockstep.
+    """
+
+    __slots__ = (
+        "_plug", "_min_interval", "_max_interval", "_interval", "_handle",
+        "_last_poll", "_last_power", "_mean_interval", "polls",
+    )
+
+    def __init__(
+        self,
+        plug: 'TendaBeliPlug',
+        min_interval: float = POWER_POLL_MIN_INTERVAL,
+        max_interval: float = POWER_POLL_MAX_INTERVAL,
+    ) -> None:
+        """
+        Initialize an idle scheduler.
         
-    except Exception as err:
-        _LOGGER.warning("Failed to retrieve MAC address for %s: %s", ip_address, err)
-        return None
+        Args:
+            plug: Plug to poll
+            min_interval: Poll interval in seconds while power is changing
+            max_interval: Upper bound for the interval while power is flat
+        """
+        self._plug = plug
+        self._min_interval = min_interval
+        self._max_interval = max(min_interval, max_interval)
+        self._interval = min_interval
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._last_poll: Optional[float] = None
+        self._last_power: Optional[float] = None
+        self._mean_interval: Optional[float] = None
+        self.polls = 0
+
+    @property
+    def interval(self) -> float:
+        """Current target interval in seconds."""
+        return self._interval
+
+    @property
+    def effective_rate(self) -> Optional[float]:
+        """Observed polls per minute, smoothed over recent polls."""
+        if not self._mean_interval:
+            return None
+        return 60.0 / self._mean_interval
+
+    @property
+    def running(self) -> bool:
+        """Whether a poll is scheduled."""
+        return self._handle is not None
+
+    def start(self) -> None:
+        """Start polling after a jittered delay if not already running."""
+        if self._handle is None:
+            self._schedule(random.uniform(0, self._interval))
+
+    def poll_now(self) -> None:
+        """Poll immediately and return to the minimum interval."""
+        self._interval = self._min_interval
+        self._poll()
+
+    def stop(self) -> None:
+        """Cancel the pending poll."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def record_reading(self, power: Optional[str]) -> None:
+        """
+        Adapt the interval to a new power reading.
+        
+        Args:
+            power: Reported power in watts
+        """
+        try:
+            value = float(power)
+        except (TypeError, ValueError):
+            return
+
+        last_power = self._last_power
+        self._last_power = value
+        if last_power is None:
+            return
+
+        threshold = max(POWER_POLL_CHANGE_ABSOLUTE, abs(last_power) * POWER_POLL_CHANGE_RELATIVE)
+        if abs(value - last_power) >= threshold:
+            backed_off = self._interval > self._min_interval
+            self._interval = self._min_interval
+            if backed_off and self._handle is not None:
+                self._schedule(self._interval)
+        else:
+            self._interval = min(self._interval * POWER_POLL_BACKOFF, self._max_interval)
+
+    def _schedule(self, delay: float) -> None:
+        """Schedule the next poll ``delay`` seconds from now, with jitter."""
+        self.stop()
+        jitter = 1 + random.uniform(-POWER_POLL_JITTER, POWER_POLL_JITTER)
+        self._handle = asyncio.get_running_loop().call_later(delay * jitter, self._poll)
+
+    def _poll(self) -> None:
+        """Send a power request and schedule the next one."""
+        self._handle = None
+        writer = self._plug._writer
+        if not writer or writer.is_closing():
+            return
+
+        now = time.monotonic()
+        if self._last_poll is not None:
+            elapsed = now - self._last_poll
+            if self._mean_interval is None:
+                self._mean_interval = elapsed
+            else:
+                self._mean_interval += (elapsed - self._mean_interval) / 4
+        self._last_poll = now
+        self.polls += 1
+        self._plug.send_power_request()
+        self._schedule(self._interval)
+
+
+class RollingWindow:
+    """
+    Running statistics over the samples of a ``PowerSampleBuffer`` that
+    fall within the last ``span`` seconds.
+    
+    The window covers sample sequence numbers ``tail`` up to the buffer's
+    next sequence number. Sums give the mean and standard deviation, and
+    monotonic queues of sequence numbers give the minimum and maximum, so
+    every sample is added and expired in amortized O(1). The queues are
+    plain lists with a head index, which are much smaller than deques.
+    """
+
+    __slots__ = (
+        "span", "tail", "count", "total", "total_squares",
+        "minimums", "minimums_head", "maximums", "maximums_head",
+    )
+
+    def __init__(self, span: float) -> None:
+        """
+        Initialize an empty window.
+        
+        Args:
+            span: Window length in seconds
+        """
+        self.span = span
+        self.tail = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.minimums: List[int] = []
+        self.minimums_head = 0
+        self.maximums: List[int] = []
+        self.maximums_head = 0
+
+    def pop_tail(self) -> None:
+        """Advance the queues past the sample at ``tail``."""
+        if self.minimums[self.minimums_head] == self.tail:
+            self.minimums_head += 1
+            if self.minimums_head * 2 > len(self.minimums):
+                del self.minimums[:self.minimums_head]
+                self.minimums_head = 0
+        if self.maximums[self.maximums_head] == self.tail:
+            self.maximums_head += 1
+            if self.maximums_head * 2 > len(self.maximums):
+                del self.maximums[:self.maximums_head]
+                self.maximums_head = 0
+        self.tail += 1
+
+
+class PowerSampleBuffer:
+    """
+    Fixed-size ring buffer of (timestamp, watts) power samples.
+    
+    Samples are stored in two preallocated ``array("d")`` columns, so the
+    memory cost is 16 bytes per sample of capacity (about 2 KB with the
+    default capacity) plus at most two queue entries per sample and window.
+    Rolling minimum, maximum, mean and standard deviation are maintained
+    incrementally for each configured window. A window can never hold more
+    than ``capacity`` samples.
+    """
+
+    __slots__ = ("_times", "_watts", "_capacity", "_next", "_windows")
+
+    def __init__(
+        self,
+        capacity: int = POWER_SAMPLE_CAPACITY,
+        windows: Sequence[float] = POWER_STATS_WINDOWS
+    ) -> None:
+        """
+        Initialize an empty buffer.
+        
+        Args:
+            capacity: Number of samples kept
+            windows: Window lengths in seconds
+        """
+        self._capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._watts = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._windows: Tuple[RollingWindow, ...] = tuple(RollingWindow(span) for span in windows)
+
+    def __len__(self) -> int:
+        return min(self._next, self._capacity)
+
+    @property
+    def windows(self) -> Tuple[float, ...]:
+        """Get the configured window lengths in seconds."""
+        return tuple(window.span for window in self._windows)
+
+    def add(self, timestamp: float, watts: float) -> None:
+        """
+        Record a sample.
+        
+        Args:
+            timestamp: Monotonic time of the reading in seconds
+            watts: Power reading
+        """
+        sequence = self._next
+        for window in self._windows:
+            # Expire old samples, including the one about to be overwritten
+            self._expire(window, timestamp, sequence - self._capacity + 1)
+
+        samples = self._watts
+        capacity = self._capacity
+        slot = sequence % capacity
+        self._times[slot] = timestamp
+        samples[slot] = watts
+        self._next = sequence + 1
+
+        for window in self._windows:
+            window.count += 1
+            window.total += watts
+            window.total_squares += watts * watts
+            minimums, maximums = window.minimums, window.maximums
+            while len(minimums) > window.minimums_head and samples[minimums[-1] % capacity] >= watts:
+                minimums.pop()
+            minimums.append(sequence)
+            while len(maximums) > window.maximums_head and samples[maximums[-1] % capacity] <= watts:
+                maximums.pop()
+            maximums.append(sequence)
+
+    def _expire(self, window: RollingWindow, now: float, oldest: int) -> None:
+        """Drop samples older than the window span or sequence ``oldest``."""
+        cutoff = now - window.span
+        while window.count and (
+            window.tail < oldest or self._times[window.tail % self._capacity] < cutoff
+        ):
+            watts = self._watts[window.tail % self._capacity]
+            window.count -= 1
+            window.total -= watts
+            window.total_squares -= watts * watts
+            window.pop_tail()
+        if not window.count:
+            # Reset the sums so rounding errors cannot accumulate
+            window.tail = self._next
+            window.total = window.total_squares = 0.0
+
+    def statistics(self, now: Optional[float] = None) -> Dict[float, Optional[Dict[str, float]]]:
+        """
+        Get rolling statistics for every window.
+        
+        Args:
+            now: Monotonic time to expire samples against, or None to use
+                the windows as of the latest sample
+            
+        Returns:
+            Dictionary keyed by window length with count, min, max, mean and
+            stddev, or None for windows without samples
+        """
+        result: Dict[float, Optional[Dict[str, float]]] = {}
+        for window in self._windows:
+            if now is not None:
+                self._expire(window, now, self._next - self._capacity)
+            if not window.count:
+                result[window.span] = None
+                continue
+            mean = window.total / window.count
+            variance = max(window.total_squares / window.count - mean * mean, 0.0)
+            result[window.span] = {
+                "count": window.count,
+                "min": self._watts[window.minimums[window.minimums_head] % self._capacity],
+                "max": self._watts[window.maximums[window.maximums_head] % self._capacity],
+                "mean": mean,
+                "stddev": math.sqrt(variance),
+            }
+        return result
+
+
+class PowerWriteThrottle:
+    """
+    Deadband and minimum-interval filter for power state writes.
+    
+    A reading is written when it differs from the last written value by
+    more than the absolute or relative deadband, whichever is larger, and
+    the minimum interval has passed since the last write. Held-back readings
+    are recorded by a trailing write once ``trailing_delay`` has passed, so
+    the final value always reaches the recorder.
+    
+    The write counters are kept here rather than in ``HubStatistics``
+    because the sensor updates them on Home Assistant's loop, which is not
+    the hub's loop when it runs on a worker thread.
+    """
+
+    __slots__ = (
+        "absolute", "relative", "min_interval", "trailing_delay", "_value", "_written_at",
+        "writes", "suppressed", "trailing_writes",
+    )
+
+    def __init__(
+        self,
+        absolute: float = POWER_WRITE_DEADBAND_ABSOLUTE,
+        relative: float = POWER_WRITE_DEADBAND_RELATIVE,
+        min_interval: float = POWER_WRITE_MIN_INTERVAL,
+        trailing_delay: float = POWER_WRITE_TRAILING_DELAY
+    ) -> None:
+        """
+        Initialize a throttle that lets the first reading through.
+        
+        Args:
+            absolute: Deadband in watts
+            relative: Deadband as a fraction of the last written value
+            min_interval: Minimum seconds between writes
+            trailing_delay: Seconds after which a held-back reading is written
+        """
+        self.absolute = absolute
+        self.relative = relative
+        self.min_interval = min_interval
+        self.trailing_delay = trailing_delay
+        self._value: Optional[float] = None
+        self._written_at: Optional[float] = None
+        self.writes = 0
+        self.suppressed = 0
+        self.trailing_writes = 0
+
+    def should_write(self, value: Optional[float], now: float) -> bool:
+        """Check whether a reading should be written immediately."""
+        if self._written_at is None:
+            return True
+        if value is None or self._value is None:
+            return value != self._value
+        if now - self._written_at < self.min_interval:
+            return False
+        return abs(value - self._value) > max(self.absolute, self.relative * abs(self._value))
+
+    def is_pending(self, value: Optional[float]) -> bool:
+        """Check whether a reading differs from the last written value."""
+        return value != self._value
+
+    def trailing_delay_at(self, now: float) -> float:
+        """Get the seconds until a held-back reading should be written."""
+        if self._written_at is None:
+            return 0.0
+        return max(self._written_at + max(self.min_interval, self.trailing_delay) - now, 0.0)
+
+    def record_write(self, value: Optional[float], now: float) -> None:
+        """Remember a written value."""
+        self._value = value
+        self._written_at = now
+
+    def forget(self) -> None:
+        """Let the next reading through, keeping the counters."""
+        self._value = None
+        self._written_at = None
+
+
+class LinkQuality:
+    """
+    Round trip times of one plug's request and reply pairs.
+    
+    The hub sends power requests, energy requests and toggles, and each is
+    answered by a power packet, an energy packet or a command response. The
+    send time of the request in flight is kept per kind; the matching reply
+    turns it into an RTT sample for a smoothed RTT and jitter (the mean
+    deviation from it, as TCP does) and a histogram. A request that is
+    replaced by the next one of its kind, or given up on, counts as a
+    missed reply. Keepalives are started by the plug, so they are not timed.
+    
+    The values shown by sensors are republished at most every
+    ``report_interval`` seconds so replies do not rewrite entity states.
+    Missed replies publish too, so the sensors keep moving when a plug
+    stops answering.
+    """
+
+    POWER = 0
+    ENERGY = 1
+    TOGGLE = 2
+    KINDS = ("power", "energy", "toggle")
+
+    __slots__ = (
+        "_sent_at", "_histogram", "rtt", "jitter", "requests", "replies",
+        "missed", "_report_interval", "_reported_at", "report",
+    )
+
+    def __init__(self, report_interval: float = LINK_REPORT_INTERVAL) -> None:
+        """
+        Initialize without samples.
+        
+        Args:
+            report_interval: Minimum seconds between published reports
+        """
+        self._sent_at: List[Optional[float]] = [None] * len(self.KINDS)
+        self._histogram = array("I", bytes(4 * (len(LINK_RTT_BUCKETS) + 1)))
+        self.rtt: Optional[float] = None
+        self.jitter: Optional[float] = None
+        self.requests = 0
+        self.replies = 0
+        self.missed = 0
+        self._report_interval = report_interval
+        self._reported_at: Optional[float] = None
+        self.report: Optional[Tuple[float, float, float]] = None
+
+    @property
+    def missed_ratio(self) -> Optional[float]:
+        """Get the fraction of answered or missed requests that were missed."""
+        settled = self.replies + self.missed
+        return self.missed / settled if settled else None
+
+    def request_sent(self, kind: int, now: float) -> bool:
+        """
+        Start timing a request.
+        
+        Args:
+            kind: ``POWER``, ``ENERGY`` or ``TOGGLE``
+            now: Monotonic send time
+            
+        Returns:
+            True if a new report was published
+        """
+        superseded = self._sent_at[kind] is not None
+        self._sent_at[kind] = now
+        self.requests += 1
+        if not superseded:
+            return False
+        self.missed += 1
+        return self._publish(now)
+
+    def reply_missed(self, kind: int, now: float) -> bool:
+        """
+        Give up on the request of a kind in flight, if any.
+        
+        Args:
+            kind: ``POWER``, ``ENERGY`` or ``TOGGLE``
+            now: Monotonic time
+            
+        Returns:
+            True if a new report was published
+        """
+        if self._sent_at[kind] is None:
+            return False
+        self._sent_at[kind] = None
+        self.missed += 1
+        return self._publish(now)
+
+    def reply_received(self, kind: int, now: float) -> bool:
+        """
+        Record the reply to the request of a kind in flight.
+        
+        Replies without a request in flight, such as energy history the
+        plug pushes on its own, are ignored.
+        
+        Args:
+            kind: ``POWER``, ``ENERGY`` or ``TOGGLE``
+            now: Monotonic receive time
+            
+        Returns:
+            True if a new report was published
+        """
+        sent_at = self._sent_at[kind]
+        if sent_at is None:
+            return False
+        self._sent_at[kind] = None
+        self.replies += 1
+
+        sample = now - sent_at
+        if self.rtt is None:
+            self.rtt = sample
+            self.jitter = sample / 2
+        else:
+            self.jitter += LINK_JITTER_BETA * (abs(sample - self.rtt) - self.jitter)
+            self.rtt += LINK_RTT_ALPHA * (sample - self.rtt)
+        self._histogram[bisect.bisect_left(LINK_RTT_BUCKETS, sample * 1000)] += 1
+        return self._publish(now)
+
+    def _publish(self, now: float) -> bool:
+        """Refresh the report shown by sensors unless one was published recently."""
+        if self._reported_at is not None and now - self._reported_at < self._report_interval:
+            return False
+        self._reported_at = now
+        self.report = (
+            round(self.rtt * 1000, 1) if self.rtt is not None else None,
+            round(self.jitter * 1000, 1) if self.jitter is not None else None,
+            round(self.missed_ratio * 100, 1),
+        )
+        return True
+
+    def histogram(self) -> Dict[str, int]:
+        """Get RTT sample counts keyed by bucket upper bound in milliseconds."""
+        labels = [f"<={bound}" for bound in LINK_RTT_BUCKETS] + [f">{LINK_RTT_BUCKETS[-1]}"]
+        return dict(zip(labels, self._histogram))
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Summarize the link quality."""
+        missed_ratio = self.missed_ratio
+        return {
+            "rtt_ms": round(self.rtt * 1000, 3) if self.rtt is not None else None,
+            "jitter_ms": round(self.jitter * 1000, 3) if self.jitter is not None else None,
+            "missed_ratio": round(missed_ratio, 4) if missed_ratio is not None else None,
+            "requests": self.requests,
+            "replies": self.replies,
+            "missed": self.missed,
+            "rtt_histogram_ms": self.histogram(),
+        }
+
+
+class SlowestDurations:
+    """
+    The slowest durations recorded, kept in a small min-heap.
+    
+    Labels are only built for durations that are kept, so recording is
+    cheap enough to do for every packet or callback. A record belongs to
+    the loop that writes it.
+    """
+
+    __slots__ = ("_size", "_heap")
+
+    def __init__(self, size: int = LOOP_MONITOR_SLOWEST) -> None:
+        """
+        Initialize an empty record.
+        
+        Args:
+            size: Number of durations kept
+        """
+        self._size = size
+        self._heap: List[Tuple[float, str]] = []
+
+    def record(self, elapsed: float, name: str, subject: Optional[str]) -> None:
+        """
+        Remember a duration if it is among the slowest.
+        
+        Args:
+            elapsed: Seconds it took
+            name: What ran, e.g. the packet type or callback name
+            subject: Plug it ran for
+        """
+        heap = self._heap
+        if len(heap) >= self._size:
+            if elapsed <= heap[0][0]:
+                return
+            heapq.heapreplace(heap, (elapsed, f"{name} {subject}"))
+        else:
+            heapq.heappush(heap, (elapsed, f"{name} {subject}"))
+
+    def as_list(self) -> List[Dict[str, Any]]:
+        """Get the recorded durations, slowest first."""
+        return [
+            {"name": name, "ms": round(elapsed * 1000, 3)}
+            for elapsed, name in sorted(self._heap, reverse=True)
+        ]
+
+
+class LoopMonitor:
+    """
+    Event loop lag sampler and record of the slowest hub work.
+    
+    A timer fires every ``interval`` seconds and records how late it ran,
+    which is how long other callbacks kept the loop busy. The last
+    ``capacity`` samples are kept in a ring for percentiles, together with
+    the number of live tasks at each sample. The slowest packet handlers
+    seen since start are kept in ``packet_handlers``. When the p99 lag
+    crosses ``threshold`` the warning callback is called once, and again
+    only after the lag has dropped back below it.
+    """
+
+    __slots__ = (
+        "_interval", "_threshold", "_lags", "_count", "_next",
+        "_handle", "_due", "_on_warning", "_warning", "tasks", "tasks_max",
+        "packet_handlers",
+    )
+
+    def __init__(
+        self,
+        on_warning: Optional[Callable[[Dict[str, Any]], None]] = None,
+        interval: float = LOOP_MONITOR_INTERVAL,
+        capacity: int = LOOP_LAG_SAMPLES,
+        threshold: float = LOOP_LAG_WARNING,
+        slowest: int = LOOP_MONITOR_SLOWEST,
+    ) -> None:
+        """
+        Initialize a stopped monitor.
+        
+        Args:
+            on_warning: Called with the monitor's summary when the p99 lag
+                crosses the threshold
+            interval: Seconds between samples
+            capacity: Number of samples kept
+            threshold: p99 lag in seconds that counts as starved
+            slowest: Number of slowest packet handlers kept
+        """
+        self._interval = interval
+        self._threshold = threshold
+        self._lags = array("d", bytes(8 * capacity))
+        self._count = 0
+        self._next = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._due = 0.0
+        self._on_warning = on_warning
+        self._warning = False
+        self.tasks = 0
+        self.tasks_max = 0
+        self.packet_handlers = SlowestDurations(slowest)
+
+    @property
+    def running(self) -> bool:
+        """Whether a sample is scheduled."""
+        return self._handle is not None
+
+    @property
+    def warning(self) -> bool:
+        """Whether the p99 lag is currently above the threshold."""
+        return self._warning
+
+    def start(self) -> None:
+        """Start sampling on the running loop if not already running."""
+        if self._handle is None:
+            self._schedule(asyncio.get_running_loop())
+
+    def stop(self) -> None:
+        """Cancel the pending sample."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Schedule the next sample."""
+        self._due = loop.time() + self._interval
+        self._handle = loop.call_at(self._due, self._sample, loop)
+
+    def _sample(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Record the lag of this timer and the live task count."""
+        self.record_lag(max(0.0, loop.time() - self._due))
+        self.tasks = len(asyncio.all_tasks(loop))
+        self.tasks_max = max(self.tasks_max, self.tasks)
+        self._schedule(loop)
+
+        lag_p99 = self.percentile(0.99)
+        above = lag_p99 is not None and lag_p99 >= self._threshold
+        if above and not self._warning and self._on_warning is not None:
+            self._on_warning(self.as_dict())
+        self._warning = above
+
+    def record_lag(self, lag: float) -> None:
+        """Add a lag sample in seconds."""
+        self._lags[self._next] = lag
+        self._next = (self._next + 1) % len(self._lags)
+        self._count = min(self._count + 1, len(self._lags))
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Get a lag percentile over the kept samples.
+        
+        Args:
+            fraction: Percentile as a fraction, e.g. 0.99
+            
+        Returns:
+            Lag in seconds, or None without samples
+        """
+        if not self._count:
+            return None
+        samples = sorted(self._lags[:self._count])
+        return samples[min(self._count - 1, int(self._count * fraction))]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Summarize lag percentiles, task counts and the slowest work."""
+        lag_p50 = self.percentile(0.5)
+        lag_p99 = self.percentile(0.99)
+        return {
+            "lag_p50_ms": round(lag_p50 * 1000, 3) if lag_p50 is not None else None,
+            "lag_p99_ms": round(lag_p99 * 1000, 3) if lag_p99 is not None else None,
+            "lag_max_ms": round(max(self._lags[:self._count]) * 1000, 3) if self._count else None,
+            "lag_samples": self._count,
+            "lag_warning_ms": round(self._threshold * 1000, 3),
+            "tasks": self.tasks,
+            "tasks_max": self.tasks_max,
+            "slowest_packet_handlers": self.packet_handlers.as_list(),
+        }
+
+
+class FleetAggregates:
+    """
+    Running totals across all plugs for the hub's fleet sensors.
+    
+    Each plug's last contribution (power, energy, on/off) is kept by serial
+    number, and an update only applies the difference to the totals, so
+    the cost does not depend on the fleet size. The energy total only
+    grows: a plug whose counter goes down is taken to have reset it, and
+    only its increments from the lower value on are added. Energy of
+    disconnected plugs is kept; their power and on/off state are removed.
+    """
+
+    __slots__ = (
+        "_power", "_energy", "_on", "total_power", "total_energy", "loads_on",
+        "energy_resets", "changed",
+    )
+
+    def __init__(self) -> None:
+        """Initialize empty totals."""
+        self._power: Dict[str, float] = {}
+        self._energy: Dict[str, float] = {}
+        self._on: Set[str] = set()
+        self.total_power = 0.0
+        self.total_energy = 0.0
+        self.loads_on = 0
+        self.energy_resets = 0
+        self.changed = False
+
+    @staticmethod
+    def _number(value: Any) -> Optional[float]:
+        """Convert a plug reading to float, or None if it is not known."""
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    def update(self, plug: 'TendaBeliPlug') -> None:
+        """Apply a plug's current readings to the totals."""
+        serial_number = plug.sn
+        power = self._number(plug.power[0])
+        if power is not None:
+            self.set_power(serial_number, power)
+        energy = self._number(plug.energy[0])
+        if energy is not None:
+            self.set_energy(serial_number, energy)
+        self.set_on(serial_number, plug.is_on)
+
+    def set_power(self, serial_number: str, watts: float) -> None:
+        """Set a plug's power contribution."""
+        previous = self._power.get(serial_number)
+        if previous != watts:
+            self._power[serial_number] = watts
+            self.total_power += watts - (previous or 0.0)
+            self.changed = True
+
+    def set_energy(self, serial_number: str, kwh: float) -> None:
+        """Set a plug's energy counter, adding only its increase to the total."""
+        previous = self._energy.get(serial_number)
+        if previous == kwh:
+            return
+        self._energy[serial_number] = kwh
+        if previous is None:
+            self.total_energy += kwh
+        elif kwh > previous:
+            self.total_energy += kwh - previous
+        else:
+            # Counter reset or replaced by a lower reading: keep the total
+            self.energy_resets += 1
+            return
+        self.changed = True
+
+    def set_on(self, serial_number: str, is_on: bool) -> None:
+        """Set whether a plug counts as a load that is on."""
+        if is_on and serial_number not in self._on:
+            self._on.add(serial_number)
+            self.loads_on += 1
+            self.changed = True
+        elif not is_on and serial_number in self._on:
+            self._on.discard(serial_number)
+            self.loads_on -= 1
+            self.changed = True
+
+    def remove(self, serial_number: str) -> None:
+        """Drop a disconnected plug's power and on/off state."""
+        watts = self._power.pop(serial_number, None)
+        if watts is not None:
+            # Start from an exact zero once nothing contributes
+            self.total_power = self.total_power - watts if self._power else 0.0
+            self.changed = True
+        self.set_on(serial_number, False)
+
+    def clear_loads(self) -> None:
+        """Drop the power and on/off state of all plugs, keeping energy."""
+        self.changed = self.changed or bool(self._power or self._on)
+        self._power.clear()
+        self._on.clear()
+        self.total_power = 0.0
+        self.loads_on = 0
+
+    def top_consumers(self, count: int = FLEET_TOP_CONSUMERS) -> List[Tuple[str, float]]:
+        """Get the plugs drawing the most power, highest first."""
+        # Copy first: with the hub on a worker thread this runs on another thread
+        return heapq.nlargest(count, list(self._power.items()), key=lambda item: item[1])
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the totals as a dictionary."""
+        return {
+            "total_power": round(self.total_power, 1),
+            "total_energy": round(self.total_energy, 3),
+            "loads_on": self.loads_on,
+            "energy_resets": self.energy_resets,
+            "plugs_reporting_power": len(self._power),
+            "top_consumers": self.top_consumers(),
+        }
+
+
+class PlugCoordinator:
+    """
+    Per-plug fan-out of state changes to the plug's entities.
+    
+    Entities register the snapshot fields they display. On every
+    notification the coordinator compares the plug's snapshot with the
+    previous one and only calls the callbacks subscribed to a field that
+    changed, so a power reading no longer rewrites the status, uptime or
+    button entities. Callbacks registered without fields are always called,
+    and all callbacks are called when the plug appears or disappears.
+    
+    Coordinators live on Home Assistant's loop, so they also count the
+    callbacks run and skipped instead of ``HubStatistics``, which belongs
+    to the hub's loop.
+    """
+
+    FIELDS = (
+        "available", "status", "is_on", "power", "energy",
+        "uptime", "ontime", "last_seen", "device", "command", "link",
+    )
+
+    __slots__ = ("_callbacks", "_snapshot", "callbacks_run", "callbacks_skipped")
+
+    def __init__(self) -> None:
+        """Initialize a coordinator without callbacks."""
+        self._callbacks: Dict[Callable, Optional[FrozenSet[str]]] = {}
+        self._snapshot: Optional[Tuple] = None
+        self.callbacks_run = 0
+        self.callbacks_skipped = 0
+
+    def __len__(self) -> int:
+        return len(self._callbacks)
+
+    def add(self, callback: Callable, fields: Optional[Iterable[str]] = None) -> None:
+        """
+        Register a callback.
+        
+        Args:
+            callback: Coroutine function called without arguments
+            fields: Snapshot fields the callback depends on, or None for all
+        """
+        self._callbacks[callback] = frozenset(fields) if fields is not None else None
+
+    def remove(self, callback: Callable) -> None:
+        """Remove a callback, forgetting the snapshot when none are left."""
+        self._callbacks.pop(callback, None)
+        if not self._callbacks:
+            self._snapshot = None
+
+    def changed_fields(self, snapshot: Optional[Tuple]) -> Optional[FrozenSet[str]]:
+        """
+        Store a new snapshot and compare it with the previous one.
+        
+        Args:
+            snapshot: ``TendaBeliPlug.snapshot()`` of the current plug, or
+                None if it is not connected
+            
+        Returns:
+            Names of the changed fields, or None if every field counts as changed
+        """
+        previous, self._snapshot = self._snapshot, snapshot
+        if snapshot is None or previous is None:
+            return None
+        return frozenset(
+            name for name, old, new in zip(self.FIELDS, previous, snapshot) if old != new
+        )
+
+    def callbacks_for(self, changed: Optional[FrozenSet[str]]) -> List[Callable]:
+        """Get and count the callbacks affected by a set of changed fields."""
+        if changed is None:
+            callbacks = list(self._callbacks)
+        else:
+            callbacks = [
+                callback for callback, fields in self._callbacks.items()
+                if fields is None or not fields.isdisjoint(changed)
+            ]
+        self.callbacks_run += len(callbacks)
+        self.callbacks_skipped += len(self._callbacks) - len(callbacks)
+        return callbacks
+
+
+class ProvisioningShards:
+    """
+    Assignment of plugs to provisioning listeners.
+    
+    The hub listens on ``count`` consecutive ports starting at ``base_port``
+    and the rendezvous server redirects every plug to one of them. A plug's
+    listener is chosen by rendezvous (highest random weight) hashing of its
+    serial number, so a plug always lands on the same listener, and changing
+    the number of listeners only moves the plugs whose winning listener was
+    added or removed. Plugs whose serial number is unknown at rendezvous go
+    to the first listener.
+    """
+
+    __slots__ = ("base_port", "count", "_connections", "_misrouted")
+
+    def __init__(self, base_port: int = DEFAULT_PORT, count: int = PROVISIONING_SHARDS) -> None:
+        """
+        Initialize the shard layout.
+        
+        Args:
+            base_port: Port of the first provisioning listener
+            count: Number of listeners
+        """
+        self.base_port = base_port
+        self.count = max(1, count)
+        self._connections = [0] * self.count
+        self._misrouted = [0] * self.count
+
+    @property
+    def ports(self) -> List[int]:
+        """Get the listener ports."""
+        return [self.base_port + index for index in range(self.count)]
+
+    @staticmethod
+    def _weight(serial_number: str, index: int) -> int:
+        """Hash a serial number together with a listener index."""
+        digest = hashlib.blake2b(f"{serial_number}/{index}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+
+    def shard_for(self, serial_number: Optional[str]) -> int:
+        """
+        Get the listener a plug belongs on.
+        
+        Args:
+            serial_number: Plug serial number, if known
+            
+        Returns:
+            Index of the listener
+        """
+        if not serial_number or self.count == 1:
+            return 0
+        return max(range(self.count), key=lambda index: self._weight(serial_number, index))
+
+    def port_for(self, serial_number: Optional[str]) -> int:
+        """Get the port of the listener a plug belongs on."""
+        return self.base_port + self.shard_for(serial_number)
+
+    def shard_of_port(self, port: Optional[int]) -> int:
+        """Get the listener index for a local port, or 0 for unknown ports."""
+        if port is None:
+            return 0
+        index = port - self.base_port
+        return index if 0 <= index < self.count else 0
+
+    def record_connection(self, shard: int) -> None:
+        """Count a new connection on a listener."""
+        self._connections[shard] += 1
+
+    def record_serial(self, shard: int, serial_number: str) -> bool:
+        """
+        Check a plug's listener once its serial number is known.
+        
+        Args:
+            shard: Listener the plug connected to
+            serial_number: Plug serial number
+            
+        Returns:
+            True if the plug is on the listener its serial number hashes to
+        """
+        if self.shard_for(serial_number) == shard:
+            return True
+        self._misrouted[shard] += 1
+        return False
+
+    def as_dict(self, plugs: Iterable['TendaBeliPlug']) -> Dict[int, Dict[str, int]]:
+        """
+        Merge per-listener statistics with the plugs currently connected.
+        
+        Args:
+            plugs: Connected plugs
+            
+        Returns:
+            Statistics keyed by listener port
+        """
+        merged = {
+            self.base_port + index: {
+                "plugs": 0,
+                "packets_received": 0,
+                "connections": self._connections[index],
+                "misrouted": self._misrouted[index],
+            }
+            for index in range(self.count)
+        }
+        for plug in plugs:
+            values = merged[self.base_port + plug.shard]
+            values["plugs"] += 1
+            values["packets_received"] += plug.packets_received
+        return merged
+
 
 class TendaBeliPlug:
     """
@@ -116,10 +1473,17 @@ class TendaBeliPlug:
         self._hub = hub
         self._writer = writer
         self._timeout = timeout
+        self._framer = PacketFramer()
+        self._outbound = OutboundQueue(writer, ip_address)
+        self._power_poll = PowerPollScheduler(self)
+        self._power_samples = PowerSampleBuffer()
+        self._link = LinkQuality()
+        self._frames = FrameRing()
         
         # Network information
         self._ip_address = ip_address
-        self._mac_address = get_mac_address_from_arp(ip_address)
+        self._shard = 0
+        self._mac_address = hub.mac_resolver.get_cached(ip_address) if hub else None
         
         # Connection state
         self._status = PlugStatus.NEW
@@ -144,18 +1508,41 @@ class TendaBeliPlug:
         self._uptime_last_update: Optional[float] = None
         self._on_time = "unknown"
         self._on_time_last_update: Optional[datetime] = None
+        self._history_timestamp: Optional[int] = None
+        self._history_seen: Set[int] = set()
+        self._history_seen_order: List[int] = []
+        self._history_entries_applied = 0
+        self._history_entries_skipped = 0
+        
+        # Switching commands: requested state, in-flight toggle and its reply
+        self._target_state: Optional[bool] = None
+        self._command_generation = 0
+        self._command_lock = asyncio.Lock()
+        self._state_waiter: Optional[asyncio.Future] = None
+        self._waiting_for: Optional[bool] = None
+        self._command_started: Optional[float] = None
+        self._command_ack_latency: Optional[float] = None
+        self._command_latency: Optional[float] = None
+        self._command_latency_mean: Optional[float] = None
+        self._commands_confirmed = 0
+        self._commands_timed_out = 0
         
         # Communication statistics
         self._packets_sent = 0
         self._packets_received = 0
         self._last_command_time: Optional[float] = None
 
-    def _send_command(self, command: bytes) -> None:
+    def _send_command(self, command: bytes, mergeable: bool = False) -> bool:
         """
-        Send command to the plug with error handling and statistics tracking.
+        Queue a command for the plug with error handling and statistics tracking.
         
         Args:
             command: Raw command bytes to send
+            mergeable: Whether an identical command already waiting makes this one redundant
+            
+        Returns:
+            True if the command was queued as a new frame; False if it was
+            merged into an identical waiting frame or not sent
         """
         try:
             if not self._writer or self._writer.is_closing():
@@ -163,17 +1550,21 @@ class TendaBeliPlug:
                     "Cannot send command to %s: connection closed", 
                     self._serial_number or self._ip_address
                 )
-                return
+                return False
                 
-            self._writer.write(command)
+            if self._outbound.enqueue(command, mergeable) is not Enqueued.QUEUED:
+                return False
             self._packets_sent += 1
             self._last_command_time = time.time()
+            self._frames.add(DIRECTION_OUT, command)
             
-            _LOGGER.debug(
-                "Sent command to %s: %s", 
-                self._serial_number or self._ip_address, 
-                command.hex()
-            )
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug(
+                    "Sent command to %s: %s", 
+                    self._serial_number or self._ip_address, 
+                    command.hex()
+                )
+            return True
             
         except Exception as err:
             _LOGGER.error(
@@ -181,29 +1572,231 @@ class TendaBeliPlug:
                 self._serial_number or self._ip_address, 
                 err
             )
+        return False
     
     def send_toggle_request(self) -> None:
         """Send power toggle command to the plug."""
-        toggle_command = bytes.fromhex(
-            "24000300015d000c000000005f0c00007b22616374696f6e223a317d"
-        )
-        self._send_command(toggle_command)
+        if self._send_command(codec.TOGGLE):
+            self._record_request(LinkQuality.TOGGLE)
     
+    async def async_set_state(self, turn_on: bool, timeout: float = COMMAND_TIMEOUT) -> bool:
+        """
+        Switch the plug on or off and wait until it reports the new state.
+        
+        The protocol only has a toggle command, so a toggle is sent only while
+        the reported state differs from the requested one; repeating a request
+        is a no-op. Commands for a plug are serialized and the most recent
+        request wins: a queued request that a newer one replaced before it
+        ran sends nothing. Until the plug confirms, ``optimistic_is_on``
+        reports the requested state; it falls back to the reported state on
+        timeout.
+        
+        Args:
+            turn_on: Requested power state
+            timeout: Seconds to wait for the plug to confirm each toggle
+            
+        Returns:
+            True if the plug reports the state requested by this call, False
+            on timeout, disconnection, or if a newer request replaced it
+        """
+        self._command_generation += 1
+        generation = self._command_generation
+        self._target_state = turn_on
+        self._mark_changed()
+
+        async with self._command_lock:
+            confirmed = True
+            while self._is_powered_on != turn_on:
+                if generation != self._command_generation:
+                    # A newer request owns the target state now
+                    return False
+                if not await self._async_toggle_confirmed(turn_on, timeout):
+                    confirmed = False
+                    break
+
+            if generation == self._command_generation:
+                self._target_state = None
+                self._mark_changed()
+            return confirmed and self._is_powered_on == turn_on
+
+    async def _async_toggle_confirmed(self, turn_on: bool, timeout: float) -> bool:
+        """Send one toggle and wait for the status packet reporting the requested state."""
+        if not self._writer or self._writer.is_closing():
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._state_waiter = waiter
+        self._waiting_for = turn_on
+        self._command_started = time.monotonic()
+        self._command_ack_latency = None
+        self.send_toggle_request()
+        try:
+            confirmed = await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self._commands_timed_out += 1
+            if self._link.reply_missed(LinkQuality.TOGGLE, time.monotonic()):
+                self._mark_changed()
+            _LOGGER.warning(
+                "Plug %s did not confirm toggle within %.1f s",
+                self._serial_number or self._ip_address,
+                timeout
+            )
+            return False
+        finally:
+            self._state_waiter = None
+            self._waiting_for = None
+
+        if confirmed is None:
+            return False
+
+        latency = time.monotonic() - self._command_started
+        self._command_latency = latency
+        if self._command_latency_mean is None:
+            self._command_latency_mean = latency
+        else:
+            self._command_latency_mean += (latency - self._command_latency_mean) / 8
+        self._commands_confirmed += 1
+        _LOGGER.debug(
+            "Plug %s confirmed toggle in %.1f ms",
+            self._serial_number or self._ip_address,
+            latency * 1000
+        )
+        return True
+
+    def acknowledge_command(self) -> None:
+        """Record the plug's command response for the toggle in flight."""
+        if self._state_waiter is not None and self._command_ack_latency is None:
+            self._command_ack_latency = time.monotonic() - self._command_started
+        self.record_reply(LinkQuality.TOGGLE)
+
+    def abort_commands(self) -> None:
+        """Stop waiting for a confirmation that can no longer arrive."""
+        if self._state_waiter is not None and not self._state_waiter.done():
+            self._state_waiter.set_result(None)
+
     def send_power_request(self) -> None:
         """Request current power consumption measurement."""
-        power_command = bytes.fromhex("2400030000d500000205000000000000")
-        self._send_command(power_command)
+        if self._send_command(codec.POWER_REQUEST, mergeable=True):
+            self._record_request(LinkQuality.POWER)
     
     def send_energy_request(self) -> None:
         """Request energy consumption history."""
-        energy_command = bytes.fromhex("2400030000d500000208000000000000")
-        self._send_command(energy_command)
+        if self._send_command(codec.ENERGY_REQUEST, mergeable=True):
+            self._record_request(LinkQuality.ENERGY)
+
+    def _record_request(self, kind: int) -> None:
+        """Time a request and refresh link sensors when a missed reply is due to show."""
+        if self._link.request_sent(kind, time.monotonic()):
+            self._mark_changed()
+
+    def record_reply(self, kind: int) -> None:
+        """
+        Time the reply to a request and refresh link sensors when due.
+        
+        Args:
+            kind: ``LinkQuality.POWER``, ``ENERGY`` or ``TOGGLE``
+        """
+        if self._link.reply_received(kind, time.monotonic()):
+            self._mark_changed()
+
+    @property
+    def frames(self) -> FrameRing:
+        """Get the plug's most recent raw frames."""
+        return self._frames
+
+    @property
+    def link(self) -> LinkQuality:
+        """Get the plug's round trip time and missed reply statistics."""
+        return self._link
+
+    def send_keepalive_ack(self) -> None:
+        """Acknowledge a keepalive."""
+        self._send_command(codec.KEEPALIVE_ACK)
+
+    def send_energy_ack(self) -> None:
+        """Acknowledge an energy history packet."""
+        self._send_command(codec.ENERGY_ACK)
     
+    def snapshot(self) -> Tuple:
+        """
+        Get the values shown by the plug's entities, in ``PlugCoordinator.FIELDS`` order.
+        
+        Returns:
+            Tuple compared by the coordinator to find what changed
+        """
+        return (
+            self.alive,
+            self._status,
+            self.optimistic_is_on,
+            self._power_consumption,
+            self._energy_consumption,
+            self._device_uptime,
+            self._on_time,
+            self._last_seen,
+            (self._model, self._firmware, self._mac_address),
+            self._command_latency,
+            self._link.report,
+        )
+
     async def notify_state_change(self) -> None:
         """Notify the hub of state changes for Home Assistant updates."""
         if self._hub and self._serial_number:
             await self._hub.notify_plug_update(self._serial_number)
 
+    def _mark_changed(self) -> None:
+        """Queue a coalesced state change notification through the hub."""
+        if self._hub:
+            self._hub.schedule_plug_update(self)
+
+    def _persist(self) -> None:
+        """Queue the plug's persistent data for saving through the hub."""
+        if self._hub:
+            self._hub.schedule_plug_save(self)
+
+    def to_record(self) -> Dict[str, Any]:
+        """
+        Get the data kept across restarts.
+        
+        Returns:
+            Dictionary with energy total, last applied history timestamp and
+            device information
+        """
+        energy_updated = self._energy_last_update
+        return {
+            "energy": self._energy_consumption if self._energy_consumption != "unknown" else None,
+            "energy_updated": energy_updated.isoformat() if energy_updated else None,
+            "history_timestamp": self._history_timestamp,
+            "model": self._model,
+            "firmware": self._firmware,
+            "hardware": self._hardware,
+            "mac_address": self._mac_address,
+        }
+
+    def restore(self, record: Dict[str, Any]) -> None:
+        """
+        Fill in values this connection has not reported yet from a stored record.
+        
+        Seeding the energy total keeps incremental history entries from
+        being lost after a restart or reconnect.
+        
+        Args:
+            record: Dictionary produced by ``to_record``
+        """
+        if self._energy_consumption == "unknown" and record.get("energy") is not None:
+            self._energy_consumption = record["energy"]
+            if record.get("energy_updated"):
+                try:
+                    self._energy_last_update = datetime.fromisoformat(record["energy_updated"])
+                except ValueError:
+                    pass
+        if self._history_timestamp is None:
+            self._history_timestamp = record.get("history_timestamp")
+        self._model = self._model or record.get("model")
+        self._firmware = self._firmware or record.get("firmware")
+        self._hardware = self._hardware or record.get("hardware")
+        if not self._mac_address and record.get("mac_address"):
+            self.mac_address = record["mac_address"]
+
     # Properties for status and connection state
     @property
     def status(self) -> PlugStatus:
@@ -232,6 +1825,11 @@ class TendaBeliPlug:
         """Update the last seen timestamp."""
         self._last_seen = timestamp
 
+    @property
+    def deadline(self) -> float:
+        """Time at which the plug stops being alive without further contact."""
+        return self._last_seen + self._timeout
+
     @property
     def ip_address(self) -> str:
         """Get the plug's IP address."""
@@ -242,6 +1840,32 @@ class TendaBeliPlug:
         """Get the plug's MAC address."""
         return self._mac_address
 
+    @mac_address.setter
+    def mac_address(self, value: Optional[str]) -> None:
+        """Set the MAC address once it has been resolved."""
+        if value and value != self._mac_address:
+            old_mac_address = self._mac_address
+            self._mac_address = value
+            if self._hub:
+                self._hub.reindex_plug(self, old_mac_address=old_mac_address)
+            self._mark_changed()
+            self._persist()
+
+    @property
+    def framer(self) -> PacketFramer:
+        """Get the frame splitter for this plug's connection."""
+        return self._framer
+
+    @property
+    def outbound(self) -> OutboundQueue:
+        """Get the outbound frame queue for this plug's connection."""
+        return self._outbound
+
+    @property
+    def power_poll(self) -> PowerPollScheduler:
+        """Get the adaptive power polling scheduler."""
+        return self._power_poll
+
     # Properties for device identification
     @property  
     def sn(self) -> Optional[str]:
@@ -260,9 +1884,12 @@ class TendaBeliPlug:
                 self.ip_address, 
                 value
             )
+            old_serial_number = self._serial_number
             self._serial_number = value
             self._status = PlugStatus.SN_RETRIEVED
-            asyncio.create_task(self.notify_state_change())
+            if self._hub:
+                self._hub.reindex_plug(self, old_serial_number=old_serial_number)
+            self._mark_changed()
        
     @property
     def nick(self) -> Optional[str]:
@@ -282,7 +1909,9 @@ class TendaBeliPlug:
     @model.setter
     def model(self, value: str) -> None:
         """Set the plug's device model."""
-        self._model = value
+        if value != self._model:
+            self._model = value
+            self._persist()
     
     @property
     def firmware(self) -> Optional[str]:
@@ -292,7 +1921,9 @@ class TendaBeliPlug:
     @firmware.setter
     def firmware(self, value: str) -> None:
         """Set the plug's firmware version."""
-        self._firmware = value
+        if value != self._firmware:
+            self._firmware = value
+            self._persist()
     
     @property
     def hardware(self) -> Optional[str]:
@@ -302,7 +1933,9 @@ class TendaBeliPlug:
     @hardware.setter
     def hardware(self, value: str) -> None:
         """Set the plug's hardware version."""
-        self._hardware = value
+        if value != self._hardware:
+            self._hardware = value
+            self._persist()
         
     # Properties for device state
     @property
@@ -315,7 +1948,42 @@ class TendaBeliPlug:
         """Set the power state and trigger updates if changed."""
         if isinstance(value, bool) and value != self._is_powered_on:
             self._is_powered_on = value
-            asyncio.create_task(self.notify_state_change())
+            # Only the requested state confirms a toggle, not e.g. a button press away from it
+            waiter = self._state_waiter
+            if waiter is not None and not waiter.done() and value == self._waiting_for:
+                waiter.set_result(value)
+            self._mark_changed()
+
+    @property
+    def shard(self) -> int:
+        """Get the index of the provisioning listener the plug connected to."""
+        return self._shard
+
+    @shard.setter
+    def shard(self, value: int) -> None:
+        """Set the provisioning listener index."""
+        self._shard = value
+
+    @property
+    def packets_received(self) -> int:
+        """Get the number of packets received from the plug."""
+        return self._packets_received
+
+    def record_packet(self) -> None:
+        """Count a packet received from the plug."""
+        self._packets_received += 1
+
+    @property
+    def command_latency(self) -> Optional[float]:
+        """Get seconds from the last confirmed toggle to the plug reporting its new state."""
+        return self._command_latency
+
+    @property
+    def optimistic_is_on(self) -> bool:
+        """Get the requested power state while a command is pending, else the reported one."""
+        if self._target_state is not None:
+            return self._target_state
+        return self._is_powered_on
 
     @property
     def power(self) -> Tuple[str, Optional[float]]:
@@ -326,11 +1994,11 @@ class TendaBeliPlug:
     def power(self, value: str) -> None:
         """Set power consumption with validation."""
         try:
-            float(value)  # Validate numeric value
+            self._power_samples.add(time.monotonic(), float(value))
             if self._power_consumption != value:
                 self._power_consumption = value
                 self._power_last_update = time.time()
-                asyncio.create_task(self.notify_state_change())
+                self._mark_changed()
         except ValueError:
             _LOGGER.warning(
                 "Invalid power value for %s: %s", 
@@ -338,6 +2006,11 @@ class TendaBeliPlug:
                 value
             )
             
+    @property
+    def power_samples(self) -> PowerSampleBuffer:
+        """Get the recent power samples with rolling statistics."""
+        return self._power_samples
+
     @property
     def energy(self) -> Tuple[str, Optional[datetime]]:
         """Get energy consumption and last update timestamp."""
@@ -350,7 +2023,8 @@ class TendaBeliPlug:
             if self._energy_consumption != value:
                 self._energy_consumption = value
                 self._energy_last_update = timestamp
-                asyncio.create_task(self.notify_state_change())
+                self._mark_changed()
+                self._persist()
         except ValueError:
             _LOGGER.warning(
                 "Invalid energy value for %s: %s", 
@@ -362,7 +2036,99 @@ class TendaBeliPlug:
     def energy(self, value: str) -> None:
         """Set energy consumption with current timestamp."""
         self.set_energy(value, datetime.now())
+
+    def apply_energy_history(self, entries: Sequence[EnergyEntry]) -> List[Tuple[datetime, str]]:
+        """
+        Apply a batch of energy history entries in one pass.
+        
+        Entries are accumulated in order; incremental entries are added to the
+        running total. Uptime, on-time and energy are then set once from the
+        final new entry, so a long history causes a single state update.
+        
+        Plugs resend their history after reconnecting, so entries at or below
+        the watermark (the newest timestamp applied before this batch) and
+        entries already in the recent-timestamp index are skipped. Replays
+        therefore never add incremental energy twice.
+        
+        Args:
+            entries: Parsed history entries in the order sent by the plug
+            
+        Returns:
+            List of (timestamp, cumulative energy) points that were accepted
+        """
+        total = self._energy_consumption
+        history: List[Tuple[datetime, str]] = []
+        watermark = self._history_timestamp
+        newest: Optional[EnergyEntry] = None
+
+        for entry in entries:
+            if (watermark is not None and entry.timestamp <= watermark) or entry.timestamp in self._history_seen:
+                self._history_entries_skipped += 1
+                continue
+            self._remember_history_timestamp(entry.timestamp)
+            if newest is None or entry.timestamp >= newest.timestamp:
+                newest = entry
+
+            new_total = entry.energy
+            if entry.increment > 0 and total != "unknown":
+                try:
+                    new_total = str(float(total) + float(entry.energy))
+                except (ValueError, TypeError):
+                    _LOGGER.warning(
+                        "Could not calculate incremental energy for %s: current value '%s' is not a number",
+                        self._serial_number or self._ip_address,
+                        total
+                    )
+
+            try:
+                float(new_total)
+            except ValueError:
+                _LOGGER.warning(
+                    "Invalid energy value for %s: %s",
+                    self._serial_number or self._ip_address,
+                    new_total
+                )
+                continue
+
+            total = new_total
+            self._history_entries_applied += 1
+            history.append((datetime.fromtimestamp(entry.timestamp), total))
+
+        if newest is not None:
+            self.uptime, self.ontime = newest.uptime, newest.on_time
+            if watermark is None or newest.timestamp > watermark:
+                self._history_timestamp = newest.timestamp
+                self._persist()
+        if history:
+            timestamp, total = history[-1]
+            self.set_energy(total, timestamp)
+
+        return history
+
+    def _remember_history_timestamp(self, timestamp: int) -> None:
+        """Add a timestamp to the bounded index of recently applied history entries."""
+        self._history_seen.add(timestamp)
+        self._history_seen_order.append(timestamp)
+        if len(self._history_seen_order) >= 2 * ENERGY_HISTORY_SEEN_SIZE:
+            # Forget the older half at once to keep the cost amortized O(1)
+            self._history_seen.difference_update(self._history_seen_order[:ENERGY_HISTORY_SEEN_SIZE])
+            del self._history_seen_order[:ENERGY_HISTORY_SEEN_SIZE]
     
+    @property
+    def history_timestamp(self) -> Optional[int]:
+        """Get the timestamp of the newest energy history entry applied."""
+        return self._history_timestamp
+
+    @property
+    def history_entries_applied(self) -> int:
+        """Get the number of energy history entries applied."""
+        return self._history_entries_applied
+
+    @property
+    def history_entries_skipped(self) -> int:
+        """Get the number of replayed energy history entries skipped."""
+        return self._history_entries_skipped
+
     @property
     def uptime(self) -> Tuple[str, Optional[float]]:
         """Get device uptime and last update timestamp."""
@@ -374,7 +2140,7 @@ class TendaBeliPlug:
         if self._device_uptime != value:
             self._device_uptime = value
             self._uptime_last_update = time.time()
-            asyncio.create_task(self.notify_state_change())
+            self._mark_changed()
 
     @property
     def ontime(self) -> Tuple[str, Optional[datetime]]:
@@ -387,7 +2153,7 @@ class TendaBeliPlug:
         if self._on_time != value:
             self._on_time = value
             self._on_time_last_update = datetime.now()
-            asyncio.create_task(self.notify_state_change())
+            self._mark_changed()
 
     def get_statistics(self) -> Dict[str, Any]:
         """
@@ -400,6 +2166,7 @@ class TendaBeliPlug:
             "serial_number": self._serial_number,
             "ip_address": self._ip_address,
             "mac_address": self._mac_address,
+            "shard": self._shard,
             "status": self._status.value,
             "is_alive": self.alive,
             "is_powered_on": self._is_powered_on,
@@ -410,6 +2177,21 @@ class TendaBeliPlug:
             "packets_sent": self._packets_sent,
             "packets_received": self._packets_received,
             "last_command_time": self._last_command_time,
+            "outbound_queue_depth": self._outbound.depth,
+            "outbound_buffered_bytes": self._outbound.buffered_bytes,
+            "outbound_frames_merged": self._outbound.frames_merged,
+            "outbound_frames_dropped": self._outbound.frames_dropped,
+            "commands_confirmed": self._commands_confirmed,
+            "commands_timed_out": self._commands_timed_out,
+            "command_latency": self._command_latency,
+            "command_latency_mean": self._command_latency_mean,
+            "command_ack_latency": self._command_ack_latency,
+            "link": self._link.as_dict(),
+            "energy_history_watermark": self._history_timestamp,
+            "energy_entries_applied": self._history_entries_applied,
+            "energy_entries_skipped": self._history_entries_skipped,
+            "power_poll_interval": self._power_poll.interval,
+            "power_polls_per_minute": self._power_poll.effective_rate,
             "registration_time": self._registration_time,
             "last_seen": self._last_seen
         }
@@ -425,22 +2207,74 @@ class TendaBeliServer:
     - Statistics and operational state tracking
     """
     
-    def __init__(self) -> None:
-        """Initialize the server with default state and empty collections."""
+    def __init__(
+        self,
+        use_protocol_transport: bool = PROVISIONING_USE_PROTOCOL,
+        off_loop: bool = HUB_OFF_LOOP,
+        shards: int = PROVISIONING_SHARDS
+    ) -> None:
+        """
+        Initialize the server with default state and empty collections.
+        
+        Args:
+            use_protocol_transport: Serve provisioning connections with
+                ``ProvisioningProtocol`` instead of the stream-based handler
+            off_loop: Run the servers, packet decoding and plug state on a
+                worker thread's event loop once started
+            shards: Number of provisioning listeners, on consecutive ports
+                from ``DEFAULT_PORT``
+        """
         # Core server state
         self._state = HubState.STOPPED
         self._statistics = HubStatistics()
+        self._liveness = LivenessTracker(self._statistics)
         
         # Network configuration
         self._ha_ip: Optional[str] = None
         self._provisioning_server_ip = ""
+        self._use_protocol_transport = use_protocol_transport
+        self._shards = ProvisioningShards(DEFAULT_PORT, shards)
+        self._mac_resolver = MacAddressResolver()
+        self._fleet = FleetAggregates()
+        self._power_throttles: Dict[str, PowerWriteThrottle] = {}
+        self._fleet_callbacks: Set[Callable] = set()
+        self._fleet_handle: Optional[asyncio.TimerHandle] = None
+        self._loop_monitor = LoopMonitor(self._loop_lag_warning)
+        # Written on Home Assistant's loop, which is not the monitored one off-loop
+        self._entity_callbacks = SlowestDurations()
+        self._trace = ProtocolTrace(_LOGGER)
+        self._health_callbacks: Set[Callable] = set()
+
+        # Optional worker thread; Home Assistant callbacks stay on the home loop
+        self._worker: Optional[HubWorker] = HubWorker() if off_loop else None
+        self._home_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._delivery_tasks: Set[asyncio.Task] = set()
+
+        # Persistent per-plug data, attached by the integration setup
+        self._plug_store: Optional[Any] = None
+        self._seen_serials: Set[str] = set()
         
         # Server management
         self._servers: list = []
         self._server_tasks: list = []
         
-        # Connected devices
+        # Connected devices, keyed by IP address, with secondary indexes
         self._connected_plugs: Dict[str, TendaBeliPlug] = {}
+        self._plugs_by_serial: Dict[str, TendaBeliPlug] = {}
+        self._plugs_by_mac: Dict[str, TendaBeliPlug] = {}
+
+        # Packet dispatch table keyed by the packet type byte
+        handlers_by_name: Dict[str, Callable] = {
+            "KEEPALIVE": self._handle_keepalive_packet,
+            "STATUS": self._handle_status_packet,
+            "COMMAND_RESP": self._handle_command_response,
+            "SERIAL": self._handle_serial_packet,
+            "POWER": self._handle_power_packet,
+            "ENERGY": self._handle_energy_packet,
+        }
+        self._packet_handlers: Dict[int, Callable] = {
+            code: handlers_by_name[name] for code, name in PACKET_TYPES.items()
+        }
         
         # Temporary storage for rendezvous device information
         self._rendezvous_device_info: Dict[str, Dict[str, str]] = {}
@@ -448,11 +2282,17 @@ class TendaBeliServer:
         # Callback management
         self._setup_callbacks: Set[Callable] = set()
         self._hub_callbacks: Set[Callable] = set()
-        self._operational_callbacks: Dict[str, Set[Callable]] = {}
+        self._energy_history_callbacks: Dict[str, Set[Callable]] = {}
+        self._coordinators: Dict[str, PlugCoordinator] = {}
         
         # Background tasks
         self._health_check_task: Optional[asyncio.Task] = None
         self._hub_update_task: Optional[asyncio.Task] = None
+        self._background_tasks: Set[asyncio.Task] = set()
+
+        # Plugs with state changes waiting for the next notification flush
+        self._changed_plugs: Dict[TendaBeliPlug, None] = {}
+        self._flush_handle: Optional[asyncio.Handle] = None
         
         # Platform readiness
         self.platforms_ready = False
@@ -467,22 +2307,38 @@ class TendaBeliServer:
     # Callback and notification management
     async def notify_plug_update(self, serial_number: str) -> None:
         """
-        Notify all registered operational callbacks for a specific plug.
+        Notify the operational callbacks of a plug whose displayed values changed.
         
         Args:
             serial_number: Serial number of the plug that was updated
         """
-        if serial_number not in self._operational_callbacks:
+        if not self._coordinators.get(serial_number):
             return
-            
-        callbacks = self._operational_callbacks[serial_number].copy()
+        if self._off_home_loop():
+            self._post_plug_updates([serial_number])
+            return
+
+        plug = self.get_plug_by_serial_number(serial_number)
+        await self._notify_snapshot(serial_number, plug.snapshot() if plug else None)
+
+    async def _notify_snapshot(self, serial_number: str, snapshot: Optional[Tuple]) -> None:
+        """Call the callbacks affected by a plug snapshot."""
+        coordinator = self._coordinators.get(serial_number)
+        if not coordinator:
+            return
+
+        changed = coordinator.changed_fields(snapshot)
+        callbacks = coordinator.callbacks_for(changed)
         _LOGGER.debug(
-            "Notifying %d callbacks for plug %s", 
-            len(callbacks), 
+            "Notifying %d of %d callbacks for plug %s",
+            len(callbacks),
+            len(coordinator),
             serial_number
         )
         
+        durations = self._entity_callbacks
         for callback in callbacks:
+            started = time.perf_counter()
             try:
                 await callback()
             except Exception as err:
@@ -491,6 +2347,74 @@ class TendaBeliServer:
                     serial_number, 
                     err
                 )
+            durations.record(
+                time.perf_counter() - started,
+                getattr(callback, "__qualname__", "callback"),
+                serial_number
+            )
+
+    def _post_plug_updates(self, serial_numbers: List[str]) -> None:
+        """Send decoded plug snapshots from the worker to the home loop."""
+        deltas = []
+        for serial_number in serial_numbers:
+            if self._coordinators.get(serial_number):
+                plug = self.get_plug_by_serial_number(serial_number)
+                deltas.append((serial_number, plug.snapshot() if plug else None))
+        if deltas:
+            self._home_loop.call_soon_threadsafe(self._deliver_plug_updates, deltas)
+
+    def _deliver_plug_updates(self, deltas: List[Tuple[str, Optional[Tuple]]]) -> None:
+        """Notify entities of a batch of snapshots on the home loop."""
+        task = asyncio.create_task(self._notify_snapshots(deltas))
+        self._delivery_tasks.add(task)
+        task.add_done_callback(self._delivery_tasks.discard)
+
+    async def _notify_snapshots(self, deltas: List[Tuple[str, Optional[Tuple]]]) -> None:
+        """Notify callbacks for several snapshots in turn."""
+        for serial_number, snapshot in deltas:
+            await self._notify_snapshot(serial_number, snapshot)
+
+    def schedule_plug_update(self, plug: TendaBeliPlug) -> None:
+        """
+        Mark a plug as changed and schedule one notification for it.
+        
+        Changes made while the current batch of packets is processed are
+        merged, and each changed plug is notified once on the next loop
+        iteration.
+        
+        Args:
+            plug: Plug whose state changed
+        """
+        self._statistics.state_updates_requested += 1
+        if plug in self._changed_plugs:
+            self._statistics.state_updates_merged += 1
+            return
+
+        self._changed_plugs[plug] = None
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush_plug_updates)
+
+    def _flush_plug_updates(self) -> None:
+        """Send one notification for every plug changed since the last flush."""
+        self._flush_handle = None
+        serial_numbers = [plug.sn for plug in self._changed_plugs if plug.sn]
+        for plug in self._changed_plugs:
+            if plug.sn and self._is_tracked(plug):
+                self._fleet.update(plug)
+        self._changed_plugs.clear()
+        self._schedule_fleet_update()
+
+        if serial_numbers:
+            self._statistics.state_notifications += len(serial_numbers)
+            if self._off_home_loop():
+                self._post_plug_updates(serial_numbers)
+            else:
+                self._create_background_task(self._notify_plug_updates(serial_numbers))
+
+    async def _notify_plug_updates(self, serial_numbers: list) -> None:
+        """Notify callbacks for several plugs in turn."""
+        for serial_number in serial_numbers:
+            await self.notify_plug_update(serial_number)
 
     async def _notify_hub_state_change(self) -> None:
         """Notify all hub callbacks of state or statistics changes."""
@@ -500,10 +2424,101 @@ class TendaBeliServer:
         callbacks = self._hub_callbacks.copy()
         for callback in callbacks:
             try:
-                await callback(self._state, self._statistics)
+                await self._call_home(callback, self._state, self._statistics)
             except Exception as err:
                 _LOGGER.error("Error in hub state callback: %s", err)
 
+    def _schedule_fleet_update(self) -> None:
+        """Schedule a throttled fleet notification if the totals changed."""
+        if self._fleet.changed and self._fleet_handle is None and self._fleet_callbacks:
+            self._fleet_handle = asyncio.get_running_loop().call_later(
+                FLEET_UPDATE_INTERVAL, self._flush_fleet_update
+            )
+
+    def _flush_fleet_update(self) -> None:
+        """Notify fleet callbacks with the current totals."""
+        self._fleet_handle = None
+        self._fleet.changed = False
+        self._create_background_task(self._notify_fleet_callbacks())
+
+    async def _notify_fleet_callbacks(self) -> None:
+        """Call every fleet callback with the aggregates."""
+        for callback in self._fleet_callbacks.copy():
+            try:
+                await self._call_home(callback, self._fleet)
+            except Exception as err:
+                _LOGGER.error("Error in fleet callback: %s", err)
+
+    def register_fleet_callback(self, callback: Callable) -> None:
+        """Register a callback for throttled fleet aggregate updates."""
+        self._fleet_callbacks.add(callback)
+
+    def remove_fleet_callback(self, callback: Callable) -> None:
+        """Remove a fleet aggregate callback."""
+        self._fleet_callbacks.discard(callback)
+
+    @property
+    def fleet(self) -> FleetAggregates:
+        """Get the fleet-wide power and energy totals."""
+        return self._fleet
+
+    def _loop_lag_warning(self, summary: Dict[str, Any]) -> None:
+        """Report an event loop that is too busy to serve plugs on time."""
+        self._statistics.loop_lag_warnings += 1
+        summary = {**summary, "connections": self._statistics.current_connections}
+        _LOGGER.warning(
+            "Hub event loop is lagging: p99 %s ms, %d tasks, %d connections",
+            summary["lag_p99_ms"],
+            summary["tasks"],
+            summary["connections"]
+        )
+        self._create_background_task(self._notify_health_callbacks(summary))
+
+    async def _notify_health_callbacks(self, summary: Dict[str, Any]) -> None:
+        """Notify all health callbacks of a loop lag warning and refresh hub entities."""
+        for callback in self._health_callbacks.copy():
+            try:
+                await self._call_home(callback, summary)
+            except Exception as err:
+                _LOGGER.error("Error in hub health callback: %s", err)
+        await self._notify_hub_state_change()
+
+    def register_health_callback(self, callback: Callable) -> None:
+        """Register a callback for event loop lag warnings."""
+        self._health_callbacks.add(callback)
+
+    def remove_health_callback(self, callback: Callable) -> None:
+        """Remove an event loop lag warning callback."""
+        self._health_callbacks.discard(callback)
+
+    @property
+    def trace(self) -> ProtocolTrace:
+        """Get the protocol trace used for packet logging."""
+        return self._trace
+
+    def dump_frames(self, serial_number: str) -> List[Dict[str, Any]]:
+        """
+        Get the most recent raw frames exchanged with a plug.
+        
+        Args:
+            serial_number: Plug serial number
+            
+        Returns:
+            Frames oldest first, or an empty list for unknown plugs
+        """
+        plug = self._plugs_by_serial.get(serial_number)
+        return plug.frames.dump() if plug else []
+
+    @property
+    def loop_monitor(self) -> LoopMonitor:
+        """Get the event loop lag and task health monitor."""
+        return self._loop_monitor
+
+    @property
+    def entity_callbacks(self) -> SlowestDurations:
+        """Get the slowest entity callbacks, recorded on Home Assistant's loop."""
+        return self._entity_callbacks
+
     def register_hub_callback(self, callback: Callable) -> None:
         """Register a callback for hub state changes."""
         self._hub_callbacks.add(callback)
@@ -512,19 +2527,44 @@ class TendaBeliServer:
         """Remove a hub state change callback."""
         self._hub_callbacks.discard(callback)
 
-    def register_operational_callback(self, callback: Callable, serial_number: str) -> None:
+    def register_energy_history_callback(self, callback: Callable, serial_number: str) -> None:
+        """
+        Register a callback receiving each applied energy history batch of a plug.
+        
+        Args:
+            callback: Coroutine function called with a list of (timestamp, total) points
+            serial_number: Serial number of the plug to monitor
+        """
+        self._energy_history_callbacks.setdefault(serial_number, set()).add(callback)
+
+    def remove_energy_history_callback(self, callback: Callable, serial_number: str) -> None:
+        """Remove an energy history callback for a specific plug."""
+        if serial_number in self._energy_history_callbacks:
+            self._energy_history_callbacks[serial_number].discard(callback)
+            if not self._energy_history_callbacks[serial_number]:
+                del self._energy_history_callbacks[serial_number]
+
+    def register_operational_callback(
+        self,
+        callback: Callable,
+        serial_number: str,
+        fields: Optional[Iterable[str]] = None
+    ) -> None:
         """
         Register an operational callback for a specific plug.
         
         Args:
             callback: Function to call when plug state changes
             serial_number: Serial number of the plug to monitor
+            fields: ``PlugCoordinator.FIELDS`` the callback depends on, or
+                None to be called on every change
         """
-        self._operational_callbacks.setdefault(serial_number, set()).add(callback)
+        coordinator = self._coordinators.setdefault(serial_number, PlugCoordinator())
+        coordinator.add(callback, fields)
         _LOGGER.debug(
             "Registered operational callback for %s (total: %d)", 
             serial_number, 
-            len(self._operational_callbacks[serial_number])
+            len(coordinator)
         )
     
     def remove_operational_callback(self, callback: Callable, serial_number: str) -> None:
@@ -535,10 +2575,10 @@ class TendaBeliServer:
             callback: Function to remove
             serial_number: Serial number of the monitored plug
         """
-        if serial_number in self._operational_callbacks:
-            self._operational_callbacks[serial_number].discard(callback)
-            if not self._operational_callbacks[serial_number]:
-                del self._operational_callbacks[serial_number]
+        coordinator = self._coordinators.get(serial_number)
+        if coordinator is not None:
+            # Kept when empty so its callback counts add up in the hub information
+            coordinator.remove(callback)
         _LOGGER.debug("Removed operational callback for %s", serial_number)
 
     async def register_setup_callback(self, callback: Callable) -> None:
@@ -550,6 +2590,9 @@ class TendaBeliServer:
         Args:
             callback: Platform setup function
         """
+        if self._forward_to_worker():
+            return await self._worker.run(self.register_setup_callback(callback))
+
         self._setup_callbacks.add(callback)
         callback_count = len(self._setup_callbacks)
         platform_count = len(PLATFORMS)
@@ -568,15 +2611,88 @@ class TendaBeliServer:
                 if plug.status == PlugStatus.SN_RETRIEVED and plug.sn:
                     _LOGGER.info("Triggering setup for connected plug %s", plug.sn)
                     for setup_callback in self._setup_callbacks:
-                        await setup_callback(plug.sn, "setup")
+                        await self._call_home(setup_callback, plug.sn, "setup")
                     plug.status = PlugStatus.REGISTERED
 
+            # Restore entities for stored plugs that have not connected yet
+            stored_serials = self._plug_store.serial_numbers if self._plug_store is not None else []
+            for serial_number in stored_serials:
+                if serial_number not in self._plugs_by_serial:
+                    _LOGGER.debug("Restoring entities for stored plug %s", serial_number)
+                    for setup_callback in self._setup_callbacks:
+                        await self._call_home(setup_callback, serial_number, "setup")
+
     def remove_setup_callback(self, callback: Callable) -> None:
         """Remove a platform setup callback."""
         self._setup_callbacks.discard(callback)
         _LOGGER.debug("Setup callback removed")
 
+    # Worker thread support
+    @property
+    def off_loop(self) -> bool:
+        """Check whether the hub runs on a worker thread's event loop."""
+        return self._worker is not None
+
+    def _forward_to_worker(self) -> bool:
+        """Check whether a call must be forwarded to the running worker loop."""
+        return self._worker is not None and self._worker.running and not self._worker.in_worker()
+
+    def _off_home_loop(self) -> bool:
+        """Check whether the caller runs on the worker, away from Home Assistant's loop."""
+        return self._home_loop is not None and self._worker is not None and self._worker.in_worker()
+
+    async def async_run(self, coro: Any) -> Any:
+        """
+        Run a coroutine on the hub's event loop and wait for its result.
+        
+        Entities use this for plug commands so the plug is only touched by
+        the loop that owns it.
+        
+        Args:
+            coro: Coroutine to run
+        """
+        if self._forward_to_worker():
+            return await self._worker.run(coro)
+        return await coro
+
+    async def async_call(self, func: Callable, *args: Any) -> Any:
+        """
+        Call a function on the hub's event loop and wait for its result.
+        
+        Args:
+            func: Function to call
+            *args: Positional arguments for ``func``
+        """
+        if self._forward_to_worker():
+            return await self._worker.call(func, *args)
+        return func(*args)
+
+    async def _call_home(self, callback: Callable, *args: Any) -> Any:
+        """Await a Home Assistant callback on the Home Assistant loop."""
+        if not self._off_home_loop():
+            return await callback(*args)
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(callback(*args), self._home_loop)
+        )
+
+    def _move_to_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Drop loop-bound state created on another loop before the worker takes over."""
+        for attribute in ("_health_check_task", "_hub_update_task"):
+            task = getattr(self, attribute)
+            if task is not None and task.get_loop() is not loop:
+                if task.get_loop() is self._home_loop:
+                    task.cancel()
+                setattr(self, attribute, None)
+        self._liveness.wakeup = asyncio.Event()
+
     # Background task management
+    def _create_background_task(self, coro) -> asyncio.Task:
+        """Create a task that is tracked until done and cancelled on stop."""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
     def _start_periodic_updates(self) -> None:
         """Start the periodic hub update task if not already running."""
         if self._hub_update_task is None or self._hub_update_task.done():
@@ -616,14 +2732,144 @@ class TendaBeliServer:
 
         _LOGGER.info("Platforms ready, triggering setup for %s (%s)", plug.sn, source)
         for callback in self._setup_callbacks:
-            await callback(plug.sn, "setup")
+            await self._call_home(callback, plug.sn, "setup")
 
         plug.status = PlugStatus.REGISTERED
 
+    def _schedule_mac_resolution(self, plug: TendaBeliPlug) -> None:
+        """Resolve a plug's MAC address in the background."""
+        self._create_background_task(self._resolve_plug_mac(plug))
+
+    async def _resolve_plug_mac(self, plug: TendaBeliPlug) -> None:
+        """Look up a plug's MAC address and attach it once known."""
+        mac_address = await self._mac_resolver.async_resolve(plug.ip_address)
+        if mac_address:
+            plug.mac_address = mac_address
+            _LOGGER.debug("Resolved MAC address %s for %s", mac_address, plug.sn or plug.ip_address)
+        else:
+            _LOGGER.debug("No MAC address found for %s", plug.ip_address)
+
+    # Plug tracking and indexes
+    def _track_plug(self, plug: TendaBeliPlug) -> None:
+        """Start tracking a plug, replacing any older connection from its IP."""
+        previous_plug = self._connected_plugs.get(plug.ip_address)
+        if previous_plug is not None and previous_plug is not plug:
+            self._unindex_plug(previous_plug)
+            previous_plug.power_poll.stop()
+
+        self._connected_plugs[plug.ip_address] = plug
+        self._index_plug(plug)
+        self._liveness.add(plug)
+
+    # Persistent plug data
+    def attach_store(self, store: Any) -> None:
+        """
+        Attach storage for per-plug data kept across restarts.
+        
+        Args:
+            store: Object providing ``serial_numbers``, ``get(serial_number)``
+                and ``save_record(serial_number, record)``
+        """
+        self._plug_store = store
+        # Count stored energy totals until the plugs report again
+        for serial_number in store.serial_numbers:
+            energy = FleetAggregates._number((store.get(serial_number) or {}).get("energy"))
+            if energy is not None:
+                self._fleet.set_energy(serial_number, energy)
+
+    def schedule_plug_save(self, plug: TendaBeliPlug) -> None:
+        """Queue a plug's persistent data for a debounced save."""
+        if self._plug_store is not None and plug.sn:
+            if self._off_home_loop():
+                self._home_loop.call_soon_threadsafe(
+                    self._plug_store.save_record, plug.sn, plug.to_record()
+                )
+            else:
+                self._plug_store.save_record(plug.sn, plug.to_record())
+
+    def get_plug_record(self, serial_number: str) -> Dict[str, Any]:
+        """Get the stored data for a plug, or an empty dictionary."""
+        if self._plug_store is None:
+            return {}
+        return self._plug_store.get(serial_number) or {}
+
+    def get_restored_plug_data(self, serial_number: str) -> Dict[str, Any]:
+        """
+        Get stored data for a plug that has not connected since the hub was created.
+        
+        Entities use this to show last known values right after startup.
+        """
+        if serial_number in self._seen_serials:
+            return {}
+        return self.get_plug_record(serial_number)
+
+    def _is_tracked(self, plug: TendaBeliPlug) -> bool:
+        """Check whether a plug is the current connection for its IP address."""
+        return self._connected_plugs.get(plug.ip_address) is plug
+
+    def _index_plug(self, plug: TendaBeliPlug) -> None:
+        """Add a plug's serial number and MAC address to the lookup indexes."""
+        if plug.sn:
+            newly_indexed = self._plugs_by_serial.get(plug.sn) is not plug
+            self._plugs_by_serial[plug.sn] = plug
+            self._seen_serials.add(plug.sn)
+            if newly_indexed and not self._shards.record_serial(plug.shard, plug.sn):
+                _LOGGER.debug(
+                    "Plug %s connected to port %d instead of %d",
+                    plug.sn, self._shards.base_port + plug.shard, self._shards.port_for(plug.sn)
+                )
+            record = self.get_plug_record(plug.sn)
+            if record:
+                plug.restore(record)
+            self.schedule_plug_save(plug)
+        if plug.mac_address:
+            self._plugs_by_mac[plug.mac_address] = plug
+
+    def _unindex_plug(
+        self,
+        plug: TendaBeliPlug,
+        serial_number: Optional[str] = None,
+        mac_address: Optional[str] = None
+    ) -> None:
+        """
+        Remove index entries that point at a plug.
+        
+        Args:
+            plug: Plug whose entries are removed
+            serial_number: Serial number to remove instead of the current one
+            mac_address: MAC address to remove instead of the current one
+        """
+        serial_number = serial_number or plug.sn
+        if serial_number and self._plugs_by_serial.get(serial_number) is plug:
+            del self._plugs_by_serial[serial_number]
+
+        mac_address = mac_address or plug.mac_address
+        if mac_address and self._plugs_by_mac.get(mac_address) is plug:
+            del self._plugs_by_mac[mac_address]
+
+    def reindex_plug(
+        self,
+        plug: TendaBeliPlug,
+        old_serial_number: Optional[str] = None,
+        old_mac_address: Optional[str] = None
+    ) -> None:
+        """
+        Update the indexes after a tracked plug's identity changed.
+        
+        Args:
+            plug: Plug whose serial number or MAC address changed
+            old_serial_number: Previous serial number, if it changed
+            old_mac_address: Previous MAC address, if it changed
+        """
+        if self._connected_plugs.get(plug.ip_address) is not plug:
+            return
+
+        self._unindex_plug(plug, old_serial_number, old_mac_address)
+        self._index_plug(plug)
+
     async def _disconnect_plug(self, plug: TendaBeliPlug, source: str) -> bool:
         """Remove a plug only if the currently tracked connection is this instance."""
-        current_plug = self._connected_plugs.get(plug.ip_address)
-        if current_plug is not plug:
+        if not self._is_tracked(plug):
             _LOGGER.debug(
                 "Skipping stale plug cleanup for %s from %s",
                 plug.sn or plug.ip_address,
@@ -632,6 +2878,13 @@ class TendaBeliServer:
             return False
 
         self._connected_plugs.pop(plug.ip_address, None)
+        self._unindex_plug(plug)
+        if plug.sn and plug.sn not in self._plugs_by_serial:
+            self._fleet.remove(plug.sn)
+            self._schedule_fleet_update()
+        plug.power_poll.stop()
+        plug.outbound.clear()
+        plug.abort_commands()
         plug.alive = 0
 
         if plug.sn:
@@ -645,40 +2898,34 @@ class TendaBeliServer:
         return True
 
     async def _monitor_plug_health(self) -> None:
-        """Monitor plug health and remove disconnected devices."""
+        """Remove plugs as soon as their liveness deadline passes."""
+        loop = asyncio.get_running_loop()
+        wakeup = self._liveness.wakeup
         while True:
             try:
-                if self._state not in [HubState.RUNNING, HubState.STARTING]:
-                    await asyncio.sleep(DEFAULT_TIMEOUT + 10)
-                    continue
-                    
-                disconnected_plugs = []
-                
-                for address, plug in list(self._connected_plugs.items()):
-                    if not plug.alive:
-                        disconnected_plugs.append((address, plug))
-                        _LOGGER.info(
-                            "Plug %s is no longer alive, removing", 
-                            plug.sn or address
-                        )
-                    else:
-                        _LOGGER.debug(
-                            "Plug %s is healthy", 
-                            plug.sn or address
-                        )
+                # Sleep until the earliest deadline or until an earlier one is added
+                delay = self._liveness.next_delay()
+                timer = loop.call_later(delay, wakeup.set) if delay is not None else None
+                try:
+                    await wakeup.wait()
+                finally:
+                    wakeup.clear()
+                    if timer:
+                        timer.cancel()
 
-                # Clean up disconnected plugs
-                for address, plug in disconnected_plugs:
+                for plug in self._liveness.pop_expired(self._is_tracked):
+                    _LOGGER.info(
+                        "Plug %s is no longer alive, removing", 
+                        plug.sn or plug.ip_address
+                    )
                     try:
                         await self._disconnect_plug(plug, "health_monitor")
                     except Exception as err:
                         _LOGGER.error(
                             "Error during plug cleanup for %s: %s", 
-                            address, 
+                            plug.ip_address, 
                             err
                         )
-
-                await asyncio.sleep(DEFAULT_TIMEOUT + 10)
                 
             except asyncio.CancelledError:
                 _LOGGER.debug("Health monitoring task cancelled")
@@ -700,6 +2947,7 @@ class TendaBeliServer:
         """Get current hub statistics with updated uptime."""
         self._statistics.update_uptime()
         self._statistics.current_connections = len(self._connected_plugs)
+        self._statistics.liveness_tracked = len(self._liveness)
         return self._statistics
 
     @property
@@ -707,6 +2955,16 @@ class TendaBeliServer:
         """Check if the hub is currently running."""
         return self._state == HubState.RUNNING
 
+    @property
+    def shards(self) -> ProvisioningShards:
+        """Get the provisioning listener layout and its statistics."""
+        return self._shards
+
+    @property
+    def mac_resolver(self) -> MacAddressResolver:
+        """Get the shared MAC address resolver."""
+        return self._mac_resolver
+
     @property
     def connected_plugs(self) -> Dict[str, TendaBeliPlug]:
         """Get a copy of currently connected plugs."""
@@ -722,10 +2980,33 @@ class TendaBeliServer:
         Returns:
             TendaBeliPlug instance if found, None otherwise
         """
-        for plug in self._connected_plugs.values():
-            if plug.sn == serial_number:
-                return plug
-        return None
+        return self._plugs_by_serial.get(serial_number)
+
+    def get_plug_by_ip_address(self, ip_address: str) -> Optional[TendaBeliPlug]:
+        """Find a plug by its IP address."""
+        return self._connected_plugs.get(ip_address)
+
+    def get_plug_by_mac_address(self, mac_address: str) -> Optional[TendaBeliPlug]:
+        """Find a plug by its MAC address."""
+        return self._plugs_by_mac.get(mac_address.lower())
+
+    def power_write_throttle(self, serial_number: str) -> PowerWriteThrottle:
+        """
+        Get the power write throttle of a plug's power sensor.
+        
+        The throttle is kept across sensor reloads so its counters add up
+        in the hub information.
+        
+        Args:
+            serial_number: Plug serial number
+            
+        Returns:
+            The plug's throttle, created on first use
+        """
+        throttle = self._power_throttles.get(serial_number)
+        if throttle is None:
+            throttle = self._power_throttles[serial_number] = PowerWriteThrottle()
+        return throttle
 
     # Compatibility alias for old code
     def get_plug_by_sn(self, sn: str) -> Optional[TendaBeliPlug]:
@@ -754,12 +3035,20 @@ class TendaBeliServer:
                 self._state.value
             )
             return False
+
+        if self._worker is not None and not self._worker.in_worker():
+            # Move the servers and background tasks to the worker thread
+            self._home_loop = asyncio.get_running_loop()
+            loop = await self._home_loop.run_in_executor(None, self._worker.start)
+            self._move_to_loop(loop)
+            return await self._worker.run(self.start(home_assistant_ip))
             
         try:
             self._state = HubState.STARTING
             self._ha_ip = home_assistant_ip
             self._start_health_monitoring()
             self._start_periodic_updates()
+            self._loop_monitor.start()
             await self._notify_hub_state_change()
             
             # Validate and convert IP address for provisioning responses
@@ -777,10 +3066,11 @@ class TendaBeliServer:
             # Start network servers
             self._server_tasks = [
                 asyncio.create_task(
-                    self._start_server(1821, self._handle_rendezvous_connection)
+                    self._start_server(RENDEZVOUS_PORT, self._handle_rendezvous_connection)
                 ),
-                asyncio.create_task(
-                    self._start_server(DEFAULT_PORT, self._handle_provisioning_connection)
+                *(
+                    asyncio.create_task(self._start_provisioning_server(port))
+                    for port in self._shards.ports
                 )
             ]
             
@@ -811,6 +3101,11 @@ class TendaBeliServer:
         Returns:
             True if stopped successfully, False otherwise
         """
+        if self._forward_to_worker():
+            stopped = await self._worker.run(self.stop())
+            await asyncio.get_running_loop().run_in_executor(None, self._worker.stop)
+            return stopped
+
         if self._state == HubState.STOPPED:
             _LOGGER.debug("Stop requested but hub is already stopped")
             return True
@@ -824,6 +3119,7 @@ class TendaBeliServer:
 
             # Close all plug connections gracefully
             for plug in plugs_to_notify:
+                plug.power_poll.stop()
                 try:
                     if plug._writer and not plug._writer.is_closing():
                         plug._writer.close()
@@ -842,9 +3138,10 @@ class TendaBeliServer:
                 self._hub_update_task
             ]
             
-            for task in tasks_to_cancel:
+            for task in [*tasks_to_cancel, *self._background_tasks]:
                 if task and not task.done():
                     task.cancel()
+            self._loop_monitor.stop()
             
             # Close all servers
             for server in self._servers:
@@ -861,6 +3158,13 @@ class TendaBeliServer:
             self._servers.clear()
             self._server_tasks.clear()
             self._connected_plugs.clear()
+            self._liveness.clear()
+            self._plugs_by_serial.clear()
+            self._plugs_by_mac.clear()
+            self._fleet.clear_loads()
+            if self._fleet_handle is not None:
+                self._fleet_handle.cancel()
+                self._fleet_handle = None
 
             # Update state
             self._state = HubState.STOPPED
@@ -900,16 +3204,32 @@ class TendaBeliServer:
             return False
 
     # Network server management
-    async def _start_server(self, port: int, handler: Callable) -> None:
+    async def _start_provisioning_server(self, port: int) -> None:
+        """
+        Start the provisioning server with the configured transport.
+        
+        Args:
+            port: Port number to listen on
+        """
+        if self._use_protocol_transport:
+            await self._start_server(port, lambda: ProvisioningProtocol(self), protocol=True)
+        else:
+            await self._start_server(port, self._handle_provisioning_connection)
+
+    async def _start_server(self, port: int, handler: Callable, protocol: bool = False) -> None:
         """
         Start a network server on the specified port.
         
         Args:
             port: Port number to listen on
-            handler: Connection handler function
+            handler: Connection handler function, or a protocol factory
+            protocol: Whether ``handler`` is an ``asyncio.Protocol`` factory
         """
         try:
-            server = await asyncio.start_server(handler, "0.0.0.0", port)
+            if protocol:
+                server = await asyncio.get_running_loop().create_server(handler, "0.0.0.0", port)
+            else:
+                server = await asyncio.start_server(handler, "0.0.0.0", port)
             self._servers.append(server)
             
             addr = server.sockets[0].getsockname()
@@ -942,16 +3262,18 @@ class TendaBeliServer:
         try:
             # Wait for initial discovery packet
             initial_data = await asyncio.wait_for(reader.read(1024), timeout=5.0)
-            _LOGGER.debug(
-                "Rendezvous request from %s:%d - data: %s", 
-                addr, 
-                port,
-                initial_data.hex() if initial_data else 'None'
-            )
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug(
+                    "Rendezvous request from %s:%d - data: %s", 
+                    addr, 
+                    port,
+                    initial_data.hex() if initial_data else 'None'
+                )
             
             # Extract device information from rendezvous data
+            decoded_device_info = None
             if initial_data:
-                decoded_device_info = self.decode_device_info(initial_data.hex())
+                decoded_device_info = self.decode_device_info(initial_data)
                 if decoded_device_info:
                     self._rendezvous_device_info[addr] = decoded_device_info
                     _LOGGER.info(
@@ -962,29 +3284,29 @@ class TendaBeliServer:
             
             _LOGGER.info("Rendezvous connection from %s:%d", addr, port)
             
-            # Send provisioning server details
-            response = bytes.fromhex(
-                f"2400020000d2000e000000000000000000100004{self._provisioning_server_ip}"
-                f"00110002{DEFAULT_PORT:04x}"
-            )
-            writer.write(response)
+            # Send the details of the provisioning listener this plug belongs on
+            serial_number = decoded_device_info.get('serial_number') if decoded_device_info else None
+            provisioning_port = self._shards.port_for(serial_number)
+            writer.write(codec.encode_redirect(self._ha_ip, provisioning_port))
             await writer.drain()
             
             _LOGGER.debug(
-                "Redirected %s:%d to provisioning server. Waiting for unexpected responses...", 
+                "Redirected %s:%d to provisioning server on port %d. Waiting for unexpected responses...", 
                 addr, 
-                port
+                port,
+                provisioning_port
             )
             
             # Check for unexpected responses (should be none)
             try:
                 unexpected_data = await asyncio.wait_for(reader.read(1024), timeout=2.0)
                 if unexpected_data:
-                    _LOGGER.warning(
+                    self._trace.warning(
+                        f"rendezvous:{addr}",
                         "Unexpected response from %s:%d after redirection: %s", 
                         addr, 
                         port,
-                        unexpected_data.hex()
+                        Hex(unexpected_data)
                     )
             except asyncio.TimeoutError:
                 _LOGGER.debug("No unexpected response from %s:%d (expected)", addr, port)
@@ -1008,8 +3330,8 @@ class TendaBeliServer:
                 writer.close()
                 await writer.wait_closed()
     
-    def decode_device_info(self, hex_string: str):
-        data = bytes.fromhex(hex_string)
+    def decode_device_info(self, hex_string: Union[str, bytes]):
+        data = bytes.fromhex(hex_string) if isinstance(hex_string, str) else hex_string
 
         parts = []
         current = []
@@ -1030,7 +3352,7 @@ class TendaBeliServer:
         for i, text in enumerate(parts):
             if serial_pattern.match(text):
                 start_offset = i
-                _LOGGER.debug(f"Found serial number at position {i}: {text}")
+                _LOGGER.debug("Found serial number at position %d: %s", i, text)
                 break
         
         if start_offset == 0 and len(parts) > 0 and not serial_pattern.match(parts[0]):
@@ -1041,40 +3363,38 @@ class TendaBeliServer:
         # Direct assignment based on expected positions, adjusted for offset
         if len(parts) > start_offset:
             device_info['serial_number'] = parts[start_offset]  # Serial number
-            _LOGGER.debug(f"{start_offset + 1}: {parts[start_offset]} (serial_number)")
+            _LOGGER.debug("%d: %s (serial_number)", start_offset + 1, parts[start_offset])
             
         if len(parts) > start_offset + 1:
             device_info['firmware'] = parts[start_offset + 1]  # Firmware
-            _LOGGER.debug(f"{start_offset + 2}: {parts[start_offset + 1]} (firmware)")
+            _LOGGER.debug("%d: %s (firmware)", start_offset + 2, parts[start_offset + 1])
             
         if len(parts) > start_offset + 2:
             device_info['model'] = parts[start_offset + 2].replace('_', ' ').strip()  # Model
-            _LOGGER.debug(f"{start_offset + 3}: {parts[start_offset + 2]} (model -> {device_info['model']})")
+            _LOGGER.debug("%d: %s (model -> %s)", start_offset + 3, parts[start_offset + 2], device_info['model'])
             
         if len(parts) > start_offset + 3:
             device_info['hardware'] = parts[start_offset + 3]  # Hardware version
-            _LOGGER.debug(f"{start_offset + 4}: {parts[start_offset + 3]} (hardware)")
+            _LOGGER.debug("%d: %s (hardware)", start_offset + 4, parts[start_offset + 3])
 
         _LOGGER.debug("Extracted device info: %s", device_info)
         return device_info
 
-    async def _handle_provisioning_connection(
-        self, 
-        reader: asyncio.StreamReader, 
-        writer: asyncio.StreamWriter
-    ) -> None:
+    def _accept_plug(self, address: str, writer: asyncio.StreamWriter) -> TendaBeliPlug:
         """
-        Handle provisioning connections from plugs for ongoing communication.
+        Create and track a plug for a new provisioning connection.
         
         Args:
-            reader: Stream reader for incoming data
-            writer: Stream writer for responses
+            address: IP address of the connecting plug
+            writer: Writer used to send commands to the plug
+            
+        Returns:
+            The newly tracked plug
         """
-        address, port = writer.get_extra_info('peername')
-        _LOGGER.info("Provisioning connection from %s:%d", address, port)
-        
-        # Create new plug instance and register it
         plug = TendaBeliPlug(address, writer, self)
+        sockname = writer.get_extra_info('sockname')
+        plug.shard = self._shards.shard_of_port(sockname[1] if sockname else None)
+        self._shards.record_connection(plug.shard)
         
         # Apply stored rendezvous device information if available
         if address in self._rendezvous_device_info:
@@ -1092,22 +3412,39 @@ class TendaBeliServer:
             # Clean up stored info after use
             del self._rendezvous_device_info[address]
         
-        self._connected_plugs[address] = plug
+        self._track_plug(plug)
         self._statistics.total_connections += 1
 
+        if not plug.mac_address:
+            self._schedule_mac_resolution(plug)
+        return plug
+
+    async def _handle_provisioning_connection(
+        self, 
+        reader: asyncio.StreamReader, 
+        writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Handle provisioning connections from plugs for ongoing communication.
+        
+        Args:
+            reader: Stream reader for incoming data
+            writer: Stream writer for responses
+        """
+        address, port = writer.get_extra_info('peername')
+        _LOGGER.info("Provisioning connection from %s:%d", address, port)
+        
+        plug = self._accept_plug(address, writer)
         await self._register_plug_if_ready(plug, "rendezvous")
         
         try:
             # Perform handshake
             try:
-                await asyncio.wait_for(reader.read(1024), timeout=10.0)
-                handshake_response = bytes.fromhex(
-                    "24000300001a001d0000000000000000000700010000080001000009000100000a00020064000b000400015180"
-                )
-                writer.write(handshake_response)
+                await asyncio.wait_for(reader.read(1024), timeout=HANDSHAKE_TIMEOUT)
+                writer.write(codec.HANDSHAKE_RESPONSE)
                 await writer.drain()
                 
-                await asyncio.wait_for(reader.read(1024), timeout=10.0)
+                await asyncio.wait_for(reader.read(1024), timeout=HANDSHAKE_TIMEOUT)
                 _LOGGER.debug("Handshake completed for %s:%d", address, port)
                 
             except asyncio.TimeoutError:
@@ -1126,7 +3463,6 @@ class TendaBeliServer:
                         _LOGGER.info("Connection closed by plug %s:%d", address, port)
                         break
                     
-                    self._statistics.packets_received += 1
                     await self._process_packet_data(datapack, plug, writer)
                         
                 except asyncio.TimeoutError:
@@ -1165,191 +3501,157 @@ class TendaBeliServer:
             _LOGGER.debug("Provisioning connection cleanup finished for %s:%d", address, port)
 
     async def _process_packet_data(self, datapack: bytes, plug: TendaBeliPlug, writer: asyncio.StreamWriter) -> None:
-        packets = datapack.split(b'$')
-        
-        for data in packets:
-            if len(data) == 0: continue
-                
+        metrics = self._statistics.packet_metrics
+        monitor = self._loop_monitor
+        trace = self._trace
+        tracing = trace.enabled
+        for data in plug.framer.feed(datapack):
             try:
-                packet_type = data[4] if len(data) > 4 else 0
-                _LOGGER.debug(f"Processing packet type {packet_type} for {plug.sn or plug.ip_address}: {data.hex()}")
-                
-                if packet_type == 101: await self._handle_keepalive_packet(plug, writer)
-                elif packet_type == 102: await self._handle_status_packet(data, plug)
-                elif packet_type == 94: await self._handle_command_response(data, plug)
-                elif packet_type == 103: await self._handle_serial_packet(data, plug)
-                elif packet_type == 213: await self._handle_power_packet(data, plug)
-                elif packet_type == 137: await self._handle_energy_packet(data, plug, writer)
-                else: _LOGGER.debug(f"Unknown packet type {packet_type}: {data.hex()}")
-                    
+                self._statistics.packets_received += 1
+                plug.record_packet()
+                plug.frames.add(DIRECTION_IN, data)
+                packet_type = data[TYPE_OFFSET]
+                slot = metrics.slot(packet_type)
+                metrics.record_received(slot, len(data))
+                if tracing and trace.sampled(packet_type, plug.sn):
+                    _LOGGER.debug(
+                        "Processing packet type %d for %s: %s",
+                        packet_type, plug.sn or plug.ip_address, data.hex()
+                    )
+
+                handler = self._packet_handlers.get(packet_type)
+                if handler is None:
+                    if tracing:
+                        _LOGGER.debug("Unknown packet type %d: %s", packet_type, data.hex())
+                    continue
+
+                started = time.perf_counter_ns()
+                message = codec.decode(data)
+                if message is None:
+                    trace.warning(
+                        f"content:{packet_type}:{plug.ip_address}",
+                        "Could not find expected content in packet type %d for %s",
+                        packet_type, plug.sn or plug.ip_address
+                    )
+                    continue
+
+                await handler(message, plug, writer)
+                elapsed_ns = time.perf_counter_ns() - started
+                metrics.record_handled(slot, elapsed_ns)
+                monitor.packet_handlers.record(
+                    elapsed_ns / 1e9, PACKET_TYPES[packet_type], plug.sn or plug.ip_address
+                )
+
+            except ValueError as err:
+                trace.limited(
+                    logging.ERROR, f"decode:{plug.ip_address}",
+                    "Error decoding packet: %s - Data: %s", err, Hex(data)
+                )
+                self._statistics.errors += 1
             except Exception as err:
-                _LOGGER.error(f"Error processing individual packet: {err}", exc_info=True)
+                _LOGGER.error("Error processing individual packet: %s", err, exc_info=True)
                 self._statistics.errors += 1
 
     
-    async def _handle_keepalive_packet(self, plug: TendaBeliPlug, writer: asyncio.StreamWriter) -> None:
+    async def _handle_keepalive_packet(self, message: codec.KeepaliveMessage, plug: TendaBeliPlug, writer: asyncio.StreamWriter) -> None:
         if plug.sn:
-            writer.write(bytes.fromhex("24000300006600000000000000000000"))
-            await writer.drain()
+            plug.send_keepalive_ack()
             plug.alive = time.time()
-            plug.send_power_request()
-            _LOGGER.debug(f"Keepalive acknowledged for {plug.sn}")
+            plug.power_poll.start()
+            _LOGGER.debug("Keepalive acknowledged for %s", plug.sn)
         else:
             _LOGGER.debug("Keepalive received before serial assignment; replying and marking connection alive.")
             plug.alive = time.time()
-            writer.write(bytes.fromhex("24000300006600000000000000000000"))
-            await writer.drain()
+            plug.send_keepalive_ack()
 
-    async def _handle_status_packet(self, data: bytes, plug: TendaBeliPlug) -> None:
+    async def _handle_status_packet(self, message: codec.StatusMessage, plug: TendaBeliPlug, writer: asyncio.StreamWriter) -> None:
         """Handle status packet with serial number."""
-        try:
-            json_start_idx = data.find(b'{')
-            if json_start_idx == -1:
-                _LOGGER.warning(f"Could not find JSON in status packet for {plug.sn or plug.ip_address}")
-                return
-
-            json_str = data[json_start_idx:].decode('utf-8')
-            payload = json.loads(json_str)
-
-            new_sn = payload.get("serialNum")
-            status_val = payload.get("status")
+        had_sn = bool(plug.sn)
+        if message.serial_number:
+            plug.sn = message.serial_number
 
-            had_sn = bool(plug.sn)
-            if new_sn:
-                plug.sn = new_sn
+        if message.status is not None:
+            new_is_on = bool(message.status)
+            
+            state_changed = plug.is_on != new_is_on
+            if state_changed:
+                _LOGGER.info("State change detected for %s: %s", plug.sn, 'ON' if new_is_on else 'OFF')
+                plug.is_on = new_is_on
+            else:
+                _LOGGER.debug("Status update for %s received, state is unchanged: %s", plug.sn, 'ON' if new_is_on else 'OFF')
 
-            if status_val is not None:
-                new_is_on = bool(status_val)
-                
-                if plug.is_on != new_is_on:
-                    _LOGGER.info(f"State change detected for {plug.sn}: {'ON' if new_is_on else 'OFF'}")
-                    plug.is_on = new_is_on
-                else:
-                    _LOGGER.debug(f"Status update for {plug.sn} received, state is unchanged: {'ON' if new_is_on else 'OFF'}")
+            if state_changed or not plug.power_poll.running:
+                plug.power_poll.poll_now()
 
-                plug.send_power_request()
+            if not had_sn:
+                await self._register_plug_if_ready(plug, "status_packet")
 
-                if not had_sn:
-                    await self._register_plug_if_ready(plug, "status_packet")
-            
-        except (json.JSONDecodeError, UnicodeDecodeError, KeyError) as err:
-            _LOGGER.error(f"Error processing status packet JSON: {err} - Data: {data.hex()}")
-        except Exception as err:
-            _LOGGER.error(f"Unexpected error in _handle_status_packet: {err}", exc_info=True)
+    async def _handle_command_response(self, message: codec.CommandResponseMessage, plug: TendaBeliPlug, writer: asyncio.StreamWriter) -> None:
+        plug.acknowledge_command()
+        if message.length >= 35: _LOGGER.debug("Command response received for %s", plug.sn)
 
-    async def _handle_command_response(self, data: bytes, plug: TendaBeliPlug) -> None:
-        if len(data) >= 50: _LOGGER.debug(f"Command response received for {plug.sn}")
+    async def _handle_serial_packet(self, message: codec.SerialMessage, plug: TendaBeliPlug, writer: asyncio.StreamWriter) -> None:
+        if message.serial_number:
+            had_sn = bool(plug.sn)
+            plug.sn = message.serial_number
 
-    async def _handle_serial_packet(self, data: bytes, plug: TendaBeliPlug) -> None:
-        try:
-            sn_idx = data.rfind(b'serialNum')
-            if sn_idx != -1:
-                had_sn = bool(plug.sn)
-                new_sn = data[sn_idx+12:sn_idx+29].decode('utf-8')
-                plug.sn = new_sn
-
-                if not had_sn:
-                    await self._register_plug_if_ready(plug, "serial_packet")
-        except Exception as err:
-            _LOGGER.error(f"Error processing serial packet: {err} - Data: {data.hex()}")
+            if not had_sn:
+                await self._register_plug_if_ready(plug, "serial_packet")
 
-    async def _handle_power_packet(self, data: bytes, plug: TendaBeliPlug) -> None:
-        if len(data) > 50:
-            try:
-                data_str = data.decode('utf-8', errors='ignore')
-                if ':' in data_str:
-                    power_str = data_str.split(':')[-1].strip('"}')
-                    plug.power = power_str
-                    _LOGGER.debug(f"Power update for {plug.sn}: {power_str}W")
-            except Exception as err:
-                _LOGGER.error(f"Error processing power packet: {err}")
+    async def _handle_power_packet(self, message: codec.PowerMessage, plug: TendaBeliPlug, writer: asyncio.StreamWriter) -> None:
+        plug.record_reply(LinkQuality.POWER)
+        if message.power is not None:
+            plug.power = message.power
+            plug.power_poll.record_reading(message.power)
+            _LOGGER.debug("Power update for %s: %sW", plug.sn, message.power)
 
-    async def _handle_energy_packet(self, data: bytes, plug: TendaBeliPlug, writer: asyncio.StreamWriter) -> None:
-        _LOGGER.debug(f"[{plug.sn or plug.ip_address}] - Received raw energy data packet: {data.hex()}")
+    async def _handle_energy_packet(self, message: codec.EnergyMessage, plug: TendaBeliPlug, writer: asyncio.StreamWriter) -> None:
+        plug.record_reply(LinkQuality.ENERGY)
         try:
             # Send acknowledgement to the plug
-            ack_response = bytes.fromhex("24000300018c000400000000000000006e756c6c")
-            writer.write(ack_response)
-            await writer.drain()
-            _LOGGER.debug(f"[{plug.sn}] - Sent energy packet acknowledgement.")
+            plug.send_energy_ack()
+            _LOGGER.debug("[%s] - Queued energy packet acknowledgement.", plug.sn)
             
-            # Check if the keyword 'energy' is in the packet
-            if b'energy' not in data:
-                _LOGGER.debug(f"[{plug.sn}] - 'energy' keyword not found in packet. Skipping.")
+            if not message.has_energy:
+                _LOGGER.debug("[%s] - 'energy' keyword not found in packet. Skipping.", plug.sn)
                 return
-                
-            # Find the start and end of the JSON object
-            start_idx, end_idx = data.find(b'{'), data.rfind(b'}')
-            if start_idx == -1 or end_idx == -1:
-                _LOGGER.warning(f"[{plug.sn}] - Could not find valid JSON object in energy packet. Data: {data.hex()}")
-                return
-                
-            json_str = data[start_idx:end_idx + 1].decode('utf-8')
-            _LOGGER.debug(f"[{plug.sn}] - Extracted JSON string: {json_str}")
 
-            # Find the start and end of the energy data list within the JSON
-            energy_start, energy_end = json_str.find('['), json_str.find(']')
-            if energy_start == -1 or energy_end == -1:
-                _LOGGER.warning(f"[{plug.sn}] - Could not find energy data list '[]' in the JSON string.")
-                return
-                
-            # Extract and parse the list of energy entries
-            energy_list_str = json_str[energy_start + 1:energy_end]
-            if not energy_list_str:
-                _LOGGER.debug(f"[{plug.sn}] - Energy data list is empty. Nothing to process.")
+            for entry in message.rejected:
+                self._trace.warning(
+                    f"energy_entry:{plug.ip_address}",
+                    "[%s] - Could not parse energy data entry '%s'", plug.sn, entry
+                )
+
+            if not message.entries:
+                _LOGGER.debug("[%s] - Energy data list is empty. Nothing to process.", plug.sn)
                 return
 
-            _LOGGER.debug(f"[{plug.sn}] - Raw energy list content: '{energy_list_str}'")
-            energy_entries = [e.strip('"') for e in energy_list_str.split('","')]
-            _LOGGER.debug(f"[{plug.sn}] - Found {len(energy_entries)} energy entries to process.")
-            
-            # Process each entry in the list
-            for i, entry in enumerate(energy_entries):
-                _LOGGER.debug(f"[{plug.sn}] - Processing entry {i+1}/{len(energy_entries)}: '{entry}'")
-                energy_data = entry.split(',')
-                
-                if len(energy_data) >= 5:
-                    try:
-                        # Extract individual data points
-                        ts = int(energy_data[0])
-                        up = energy_data[1]
-                        en = energy_data[2]
-                        on = energy_data[3]
-                        inc = int(energy_data[4])
-                        
-                        _LOGGER.debug(f"[{plug.sn}] - Parsed entry -> Timestamp: {ts}, Uptime: {up}, Energy: {en}, Ontime: {on}, Increment: {inc}")
+            _LOGGER.debug("[%s] - Found %d energy entries to process.", plug.sn, len(message.entries))
 
-                        # Update plug's uptime and ontime
-                        plug.uptime, plug.ontime = up, on
-                        
-                        # Calculate new total energy
-                        new_energy = en
-                        if inc > 0:
-                            current_en, _ = plug.energy
-                            # Only add if the current value is a valid number
-                            if current_en != "unknown":
-                                try:
-                                    calculated_energy = str(float(current_en) + float(en))
-                                    _LOGGER.debug(f"[{plug.sn}] - Incremental energy. Current: {current_en}, Increment: {en}, New Total: {calculated_energy}")
-                                    new_energy = calculated_energy
-                                except (ValueError, TypeError):
-                                    _LOGGER.warning(f"[{plug.sn}] - Could not calculate incremental energy. Current value '{current_en}' is not a number.")
-                        
-                        # Set the final energy value with its timestamp
-                        dt_object = datetime.fromtimestamp(ts)
-                        plug.set_energy(new_energy, dt_object)
-                        _LOGGER.info(f"[{plug.sn}] - Energy updated to {new_energy} kWh, Uptime: {up}s, Ontime: {on}s (Timestamp: {dt_object.isoformat()})")
-                        
-                        # A small delay to allow Home Assistant to process updates if many come in at once
-                        await asyncio.sleep(0.05)
+            skipped = plug.history_entries_skipped
+            history = plug.apply_energy_history(message.entries)
+            skipped = plug.history_entries_skipped - skipped
+            self._statistics.energy_entries_applied += len(history)
+            self._statistics.energy_entries_skipped += skipped
+            if skipped:
+                _LOGGER.debug("[%s] - Skipped %d already applied energy entries.", plug.sn, skipped)
+            if not history:
+                return
+
+            last_entry = message.entries[-1]
+            _LOGGER.info(
+                "[%s] - Energy updated to %s kWh from %d entries, Uptime: %ss, Ontime: %ss (Timestamp: %s)",
+                plug.sn, history[-1][1], len(history), last_entry.uptime, last_entry.on_time, history[-1][0].isoformat()
+            )
 
-                    except (ValueError, IndexError) as e:
-                        _LOGGER.warning(f"[{plug.sn}] - Could not parse energy data entry '{entry}'. Error: {e}")
-                else:
-                    _LOGGER.warning(f"[{plug.sn}] - Energy data entry has fewer than 5 parts: '{entry}'")
+            for callback in self._energy_history_callbacks.get(plug.sn, set()).copy():
+                try:
+                    await self._call_home(callback, history)
+                except Exception as err:
+                    _LOGGER.error("[%s] - Error in energy history callback: %s", plug.sn, err)
                     
         except Exception as err:
-            _LOGGER.error(f"[{plug.sn}] - Unexpected error processing energy packet: {err}", exc_info=True)
+            _LOGGER.error("[%s] - Unexpected error processing energy packet: %s", plug.sn, err, exc_info=True)
 
     async def remove_plug(self, serial_number: str) -> bool:
         """
@@ -1361,6 +3663,9 @@ class TendaBeliServer:
         Returns:
             True if successfully removed, False otherwise
         """
+        if self._forward_to_worker():
+            return await self._worker.run(self.remove_plug(serial_number))
+
         try:
             plug = self.get_plug_by_serial_number(serial_number)
             if not plug:
@@ -1390,19 +3695,36 @@ class TendaBeliServer:
         Returns:
             Dictionary containing hub status, statistics, configuration, and connected devices
         """
+        statistics = {
+            key: value.as_dict() if isinstance(value, PacketTypeMetrics) else value
+            for key, value in self._statistics.__dict__.items()
+        }
+        # Counted on the home loop by the power sensors and plug coordinators; reading is safe
+        throttles = list(self._power_throttles.values())
+        statistics["power_writes"] = sum(throttle.writes for throttle in throttles)
+        statistics["power_writes_suppressed"] = sum(throttle.suppressed for throttle in throttles)
+        statistics["power_writes_trailing"] = sum(throttle.trailing_writes for throttle in throttles)
+        coordinators = list(self._coordinators.values())
+        statistics["entity_callbacks_run"] = sum(coordinator.callbacks_run for coordinator in coordinators)
+        statistics["entity_callbacks_skipped"] = sum(
+            coordinator.callbacks_skipped for coordinator in coordinators
+        )
         return {
             "state": self._state.value,
-            "statistics": {
-                key: value for key, value in self._statistics.__dict__.items()
-            },
+            "statistics": statistics,
+            "fleet": self._fleet.as_dict(),
+            "loop": self._loop_monitor.as_dict(),
+            "slowest_entity_callbacks": self._entity_callbacks.as_list(),
             "configuration": {
                 "home_assistant_ip": self._ha_ip,
                 "provisioning_server_ip": self._provisioning_server_ip,
                 "timeout": DEFAULT_TIMEOUT,
-                "port": DEFAULT_PORT
+                "port": DEFAULT_PORT,
+                "ports": self._shards.ports
             },
+            "shards": self._shards.as_dict(list(self._connected_plugs.values())),
             "connected_plugs": [
-                plug.get_statistics() for plug in self._connected_plugs.values()
+                plug.get_statistics() for plug in list(self._connected_plugs.values())
             ]
         }
 
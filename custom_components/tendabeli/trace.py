@@ -0,0 +1,251 @@
+"""
+Tenda Beli Smart Plug Integration - Protocol Trace.
+
+This module keeps protocol logging off the packet hot path. Packet traces
+are only formatted when debug logging is enabled, and then only for a
+sample of packets per packet type unless a plug is traced in full. Repeated
+warnings are rate limited per message. Every plug keeps its last raw frames
+in a small ring buffer that can be dumped on demand, whatever the log level.
+
+The module has no Home Assistant dependencies.
+
+"""
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .const import (
+    PACKET_TYPES,
+    TRACE_FRAMES_PER_PLUG,
+    TRACE_SAMPLE_EVERY,
+    TRACE_WARNING_INTERVAL,
+)
+from . import codec
+from .codec import TYPE_OFFSET
+
+DIRECTION_IN = "in"
+DIRECTION_OUT = "out"
+
+# Names of the packet types the hub sends; some codes mean something else inbound
+OUTBOUND_TYPES = {
+    codec.TYPE_HANDSHAKE: "HANDSHAKE",
+    codec.TYPE_TOGGLE: "TOGGLE",
+    codec.TYPE_KEEPALIVE_ACK: "KEEPALIVE_ACK",
+    codec.TYPE_ENERGY_ACK: "ENERGY_ACK",
+    codec.TYPE_REDIRECT: "REDIRECT",
+    codec.TYPE_REQUEST: "REQUEST",
+}
+
+
+class Hex:
+    """
+    Log argument that shows bytes as hex only when the message is formatted.
+
+    Passing ``Hex(data)`` instead of ``data.hex()`` avoids the conversion
+    for messages that are filtered out or rate limited.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Any) -> None:
+        """
+        Wrap bytes for logging.
+
+        Args:
+            data: Bytes, bytearray or memoryview
+        """
+        self._data = data
+
+    def __str__(self) -> str:
+        return self._data.hex()
+
+
+class FrameRing:
+    """
+    The last raw frames exchanged with one plug.
+
+    Frames are kept as received or sent, together with their wall clock
+    time and direction, and only converted to hex when dumped.
+    """
+
+    __slots__ = ("_frames", "_next", "_capacity")
+
+    def __init__(self, capacity: int = TRACE_FRAMES_PER_PLUG) -> None:
+        """
+        Initialize an empty ring.
+
+        Args:
+            capacity: Number of frames kept; 0 keeps none
+        """
+        self._frames: List[Tuple[float, str, bytes]] = []
+        self._next = 0
+        self._capacity = capacity
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def add(self, direction: str, frame: bytes) -> None:
+        """
+        Remember a frame, replacing the oldest one when full.
+
+        Args:
+            direction: ``DIRECTION_IN`` or ``DIRECTION_OUT``
+            frame: Raw frame bytes
+        """
+        if not self._capacity:
+            return
+        entry = (time.time(), direction, bytes(frame))
+        if len(self._frames) < self._capacity:
+            self._frames.append(entry)
+        else:
+            self._frames[self._next] = entry
+            self._next = (self._next + 1) % self._capacity
+
+    def dump(self) -> List[Dict[str, Any]]:
+        """
+        Get the kept frames, oldest first.
+
+        Returns:
+            One dictionary per frame with time, direction, packet type and hex data
+        """
+        frames = self._frames[self._next:] + self._frames[:self._next]
+        return [
+            {
+                "time": datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat(),
+                "direction": direction,
+                "type": self._type_name(direction, frame),
+                "data": frame.hex(),
+            }
+            for timestamp, direction, frame in frames
+        ]
+
+    @staticmethod
+    def _type_name(direction: str, frame: bytes) -> Any:
+        """Get the name of a frame's packet type, or its code if unknown."""
+        if len(frame) <= TYPE_OFFSET:
+            return None
+        packet_type = frame[TYPE_OFFSET]
+        names = PACKET_TYPES if direction == DIRECTION_IN else OUTBOUND_TYPES
+        return names.get(packet_type, packet_type)
+
+    def clear(self) -> None:
+        """Forget all frames."""
+        self._frames.clear()
+        self._next = 0
+
+
+class ProtocolTrace:
+    """
+    Sampled packet tracing and rate limited warnings for a logger.
+
+    ``enabled`` is checked once per batch of packets; when debug logging is
+    off nothing else is done. When it is on, every ``sample_every``-th
+    packet of each type is traced, and every packet of plugs added with
+    ``trace_plug``. A warning or error with the same key is logged at most
+    once per ``warning_interval`` seconds, with the number of suppressed
+    repeats.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        sample_every: int = TRACE_SAMPLE_EVERY,
+        warning_interval: float = TRACE_WARNING_INTERVAL,
+    ) -> None:
+        """
+        Initialize the trace.
+
+        Args:
+            logger: Logger traces and warnings are written to
+            sample_every: Trace one in this many packets of each type
+            warning_interval: Seconds between repeats of the same warning
+        """
+        self._logger = logger
+        self._sample_every = max(1, sample_every)
+        self._warning_interval = warning_interval
+        self._counters: Dict[int, int] = {}
+        self._traced_plugs: Set[str] = set()
+        self._warnings: Dict[str, Tuple[float, int]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether packet traces would be logged."""
+        return self._logger.isEnabledFor(logging.DEBUG)
+
+    @property
+    def traced_plugs(self) -> Set[str]:
+        """Get the serial numbers of plugs traced in full."""
+        return set(self._traced_plugs)
+
+    def trace_plug(self, serial_number: str, enabled: bool = True) -> None:
+        """
+        Trace every packet of a plug instead of a sample.
+
+        Args:
+            serial_number: Plug serial number
+            enabled: False to return the plug to sampling
+        """
+        if enabled:
+            self._traced_plugs.add(serial_number)
+        else:
+            self._traced_plugs.discard(serial_number)
+
+    def sampled(self, packet_type: int, serial_number: Optional[str]) -> bool:
+        """
+        Decide whether to trace a packet. Only call this while ``enabled``.
+
+        Args:
+            packet_type: Packet type byte
+            serial_number: Plug serial number, if known
+
+        Returns:
+            True if the packet should be traced
+        """
+        if serial_number in self._traced_plugs:
+            return True
+        count = self._counters.get(packet_type, 0)
+        self._counters[packet_type] = count + 1
+        return count % self._sample_every == 0
+
+    def warning(self, key: str, message: str, *args: Any) -> None:
+        """
+        Log a warning unless the same key was logged recently.
+
+        Args:
+            key: Identifies repeats of the same warning, e.g. message and plug
+            message: Log message with ``%`` placeholders
+            *args: Placeholder values
+        """
+        self.limited(logging.WARNING, key, message, *args)
+
+    def limited(self, level: int, key: str, message: str, *args: Any) -> None:
+        """
+        Log a message unless the same key was logged recently.
+
+        Args:
+            level: Logging level
+            key: Identifies repeats of the same message
+            message: Log message with ``%`` placeholders
+            *args: Placeholder values
+        """
+        now = time.monotonic()
+        last_logged, suppressed = self._warnings.get(key, (None, 0))
+        if last_logged is not None and now - last_logged < self._warning_interval:
+            self._warnings[key] = (last_logged, suppressed + 1)
+            return
+
+        self._warnings[key] = (now, 0)
+        if suppressed:
+            self._logger.log(level, message + " (%d similar messages suppressed)", *args, suppressed)
+        else:
+            self._logger.log(level, message, *args)
+        if len(self._warnings) > 1024:
+            self._forget_warnings(now)
+
+    def _forget_warnings(self, now: float) -> None:
+        """Drop warning keys whose interval has passed."""
+        self._warnings = {
+            key: value for key, value in self._warnings.items()
+            if now - value[0] < self._warning_interval
+        }
@@ -0,0 +1,389 @@
+"""
+Tenda Beli Smart Plug Integration - Provisioning Transport.
+
+This module implements the provisioning connection as an ``asyncio.Protocol``.
+Received data goes straight to the hub's packet processing instead of through
+a ``StreamReader``, and each connection checks its read deadline with a
+single timer that is only rescheduled when it fires, rather than wrapping
+every read in ``asyncio.wait_for``.
+
+"""
+import asyncio
+import logging
+import sys
+from collections import deque
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Deque, Iterable, List, Optional, Set
+
+from .const import DEFAULT_TIMEOUT, HANDSHAKE_TIMEOUT, OUTBOUND_HARD_LIMIT, OUTBOUND_HIGH_WATER
+from . import codec
+
+if TYPE_CHECKING:
+    from .tenda import TendaBeliPlug, TendaBeliServer
+
+_LOGGER = logging.getLogger(__name__)
+
+# Eagerly started tasks run synchronously until their first real suspension,
+# so packets whose handlers never wait are processed inside data_received
+_EAGER_START = sys.version_info >= (3, 12)
+
+
+class Enqueued(Enum):
+    """Outcome of queueing an outbound frame."""
+    QUEUED = "queued"
+    MERGED = "merged"
+    NOT_SENT = "not_sent"
+
+
+class TransportWriter:
+    """
+    The subset of ``asyncio.StreamWriter`` used by plugs and packet handlers,
+    backed directly by a protocol's transport.
+    """
+
+    __slots__ = ("_transport", "_protocol")
+
+    def __init__(self, transport: asyncio.Transport, protocol: "ProvisioningProtocol") -> None:
+        self._transport = transport
+        self._protocol = protocol
+
+    def write(self, data: bytes) -> None:
+        self._transport.write(data)
+
+    def writelines(self, data: Iterable[bytes]) -> None:
+        self._transport.writelines(data)
+
+    async def drain(self) -> None:
+        """Wait until the transport's write buffer is below its high-water mark."""
+        await self._protocol.wait_writable()
+
+    def is_closing(self) -> bool:
+        return self._transport.is_closing()
+
+    def close(self) -> None:
+        self._transport.close()
+
+    async def wait_closed(self) -> None:
+        await self._protocol.wait_closed()
+
+    def get_extra_info(self, name: str, default: Any = None) -> Any:
+        return self._transport.get_extra_info(name, default)
+
+    @property
+    def transport(self) -> asyncio.Transport:
+        return self._transport
+
+
+class OutboundQueue:
+    """
+    Outbound frames for one plug, written once per event loop iteration.
+
+    Frames queued during an iteration go out together in a single
+    ``writelines`` call, so handlers never wait on ``drain``. Mergeable
+    frames (requests whose reply answers any number of identical requests)
+    are dropped when an identical frame is already waiting. Once the queue
+    plus the transport's own buffer pass the high-water mark, mergeable
+    frames are discarded, and a plug that lets the buffer reach the hard
+    limit has its connection closed.
+    """
+
+    __slots__ = (
+        "_writer", "_name", "_frames", "_mergeable", "_queued_bytes", "_flush_handle",
+        "high_water", "hard_limit", "frames_sent", "frames_merged", "frames_dropped", "flushes",
+    )
+
+    def __init__(
+        self,
+        writer: Any,
+        name: str,
+        high_water: int = OUTBOUND_HIGH_WATER,
+        hard_limit: int = OUTBOUND_HARD_LIMIT,
+    ) -> None:
+        """
+        Initialize an empty queue.
+
+        Args:
+            writer: Stream writer or ``TransportWriter`` for the connection
+            name: Plug name used in log messages
+            high_water: Buffered bytes above which mergeable frames are dropped
+            hard_limit: Buffered bytes at which the connection is closed
+        """
+        self._writer = writer
+        self._name = name
+        self._frames: List[bytes] = []
+        self._mergeable: Set[bytes] = set()
+        self._queued_bytes = 0
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self.high_water = high_water
+        self.hard_limit = hard_limit
+        self.frames_sent = 0
+        self.frames_merged = 0
+        self.frames_dropped = 0
+        self.flushes = 0
+
+    @property
+    def depth(self) -> int:
+        """Frames waiting for the next flush."""
+        return len(self._frames)
+
+    @property
+    def buffered_bytes(self) -> int:
+        """Bytes queued here plus bytes still in the transport's write buffer."""
+        transport = getattr(self._writer, "transport", None)
+        buffered = transport.get_write_buffer_size() if transport is not None else 0
+        return self._queued_bytes + buffered
+
+    def enqueue(self, frame: bytes, mergeable: bool = False) -> Enqueued:
+        """
+        Queue a frame for the next flush.
+
+        Args:
+            frame: Encoded frame
+            mergeable: Whether an identical waiting frame makes this one redundant
+
+        Returns:
+            ``QUEUED`` if the frame will be written, ``MERGED`` if an identical
+            waiting frame is written instead, ``NOT_SENT`` if it was dropped
+        """
+        writer = self._writer
+        if not writer or writer.is_closing():
+            return Enqueued.NOT_SENT
+
+        if mergeable:
+            if frame in self._mergeable:
+                self.frames_merged += 1
+                return Enqueued.MERGED
+            buffered = self.buffered_bytes + len(frame)
+            if buffered > self.high_water:
+                self.frames_dropped += 1
+                _LOGGER.debug("Dropping request to %s, %d bytes buffered", self._name, buffered)
+                return Enqueued.NOT_SENT
+            self._mergeable.add(frame)
+        elif self.buffered_bytes + len(frame) > self.hard_limit:
+            _LOGGER.warning("Plug %s is not reading its connection, closing it", self._name)
+            self._frames.clear()
+            self._mergeable.clear()
+            self._queued_bytes = 0
+            writer.close()
+            return Enqueued.NOT_SENT
+
+        self._frames.append(frame)
+        self._queued_bytes += len(frame)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self.flush)
+        return Enqueued.QUEUED
+
+    def flush(self) -> None:
+        """Write all queued frames in one call."""
+        self._flush_handle = None
+        if not self._frames:
+            return
+
+        frames = self._frames
+        self._frames = []
+        self._mergeable.clear()
+        self._queued_bytes = 0
+        writer = self._writer
+        if writer.is_closing():
+            return
+
+        try:
+            writer.writelines(frames)
+        except Exception as err:
+            _LOGGER.error("Failed to send %d frames to %s: %s", len(frames), self._name, err)
+            return
+        self.frames_sent += len(frames)
+        self.flushes += 1
+
+    def clear(self) -> None:
+        """Discard queued frames and cancel the pending flush."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._frames.clear()
+        self._mergeable.clear()
+        self._queued_bytes = 0
+
+
+class ProvisioningProtocol(asyncio.Protocol):
+    """
+    Provisioning connection from a single plug.
+
+    The first two chunks received are the plug's handshake, answered the same
+    way as the stream-based handler does. Everything after that is queued
+    and processed in order by a worker task that only runs while there is
+    data to process. Reading is paused if the queue grows too long.
+    """
+
+    MAX_PENDING_CHUNKS = 16
+
+    def __init__(
+        self,
+        hub: "TendaBeliServer",
+        handshake_timeout: float = HANDSHAKE_TIMEOUT,
+        idle_timeout: float = DEFAULT_TIMEOUT,
+    ) -> None:
+        """
+        Initialize the protocol for a new connection.
+
+        Args:
+            hub: Hub server that owns the plug
+            handshake_timeout: Seconds to wait for each handshake chunk
+            idle_timeout: Seconds without data before the connection is closed
+        """
+        self._hub = hub
+        self._handshake_timeout = handshake_timeout
+        self._idle_timeout = idle_timeout
+        self._loop = asyncio.get_running_loop()
+        self._transport: Optional[asyncio.Transport] = None
+        self._writer: Optional[TransportWriter] = None
+        self._plug: Optional["TendaBeliPlug"] = None
+        self._peer = ("unknown", 0)
+        self._handshake_chunks = 0
+        self._last_received = 0.0
+        self._deadline: Optional[asyncio.TimerHandle] = None
+        self._pending: Deque[bytes] = deque()
+        self._worker: Optional[asyncio.Task] = None
+        self._reading_paused = False
+        self._writing_paused = False
+        self._drain_waiter: Optional[asyncio.Future] = None
+        self._closed = self._loop.create_future()
+
+    @property
+    def plug(self) -> Optional["TendaBeliPlug"]:
+        """Get the plug served by this connection."""
+        return self._plug
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Create and track the plug, then register it once platforms are ready."""
+        self._transport = transport
+        self._writer = TransportWriter(transport, self)
+        self._peer = transport.get_extra_info("peername") or self._peer
+        address, port = self._peer[:2]
+        _LOGGER.info("Provisioning connection from %s:%d", address, port)
+
+        self._plug = self._hub._accept_plug(address, self._writer)
+        self._last_received = self._loop.time()
+        self._deadline = self._loop.call_later(self._handshake_timeout, self._check_deadline)
+        self._worker = self._start_worker(self._register_and_process())
+
+    def data_received(self, data: bytes) -> None:
+        """Answer the handshake or queue data for the packet worker."""
+        self._last_received = self._loop.time()
+
+        if self._handshake_chunks < 2:
+            self._handshake_chunks += 1
+            if self._handshake_chunks == 1:
+                self._transport.write(codec.HANDSHAKE_RESPONSE)
+            else:
+                _LOGGER.debug("Handshake completed for %s:%d", *self._peer[:2])
+            return
+
+        if not self._hub.is_running:
+            self._transport.close()
+            return
+
+        self._pending.append(data)
+        if self._worker is None or self._worker.done():
+            self._worker = self._start_worker(self._process_pending())
+        elif len(self._pending) >= self.MAX_PENDING_CHUNKS and not self._reading_paused:
+            self._reading_paused = True
+            self._transport.pause_reading()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        """Release waiters and disconnect the plug once queued data is processed."""
+        if exc is None:
+            _LOGGER.info("Connection closed by plug %s:%d", *self._peer[:2])
+        else:
+            _LOGGER.warning("Connection lost to plug %s:%d: %s", *self._peer[:2], exc)
+
+        if self._deadline is not None:
+            self._deadline.cancel()
+            self._deadline = None
+        self._writing_paused = False
+        self._wake_drain_waiter()
+        if not self._closed.done():
+            self._closed.set_result(None)
+
+        self._hub._create_background_task(self._disconnect())
+
+    def pause_writing(self) -> None:
+        self._writing_paused = True
+
+    def resume_writing(self) -> None:
+        self._writing_paused = False
+        self._wake_drain_waiter()
+
+    async def wait_writable(self) -> None:
+        """Wait for the transport to resume writing if it is paused."""
+        if not self._writing_paused:
+            return
+        if self._drain_waiter is None or self._drain_waiter.done():
+            self._drain_waiter = self._loop.create_future()
+        await self._drain_waiter
+
+    async def wait_closed(self) -> None:
+        """Wait until the connection is lost."""
+        await self._closed
+
+    def _start_worker(self, coro) -> asyncio.Task:
+        """Start a worker task, eagerly where the running Python supports it."""
+        if _EAGER_START:
+            return asyncio.Task(coro, loop=self._loop, eager_start=True)
+        return self._loop.create_task(coro)
+
+    def _wake_drain_waiter(self) -> None:
+        waiter = self._drain_waiter
+        self._drain_waiter = None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def _check_deadline(self) -> None:
+        """Close the connection if no data arrived within the current timeout."""
+        handshaking = self._handshake_chunks < 2
+        timeout = self._handshake_timeout if handshaking else self._idle_timeout
+        remaining = self._last_received + timeout - self._loop.time()
+        if remaining > 0:
+            self._deadline = self._loop.call_later(remaining, self._check_deadline)
+            return
+
+        self._deadline = None
+        address, port = self._peer[:2]
+        if handshaking:
+            _LOGGER.error("Handshake timeout with %s:%d", address, port)
+        else:
+            _LOGGER.warning("Read timeout for plug %s:%d, closing connection", address, port)
+        self._transport.close()
+
+    async def _register_and_process(self) -> None:
+        """Register the new plug, then process anything received meanwhile."""
+        try:
+            await self._hub._register_plug_if_ready(self._plug, "rendezvous")
+        except Exception as err:
+            _LOGGER.error("Error registering plug %s:%d: %s", *self._peer[:2], err)
+            self._hub.statistics.errors += 1
+        await self._process_pending()
+
+    async def _process_pending(self) -> None:
+        """Process queued data in arrival order until the queue is empty."""
+        try:
+            while self._pending:
+                data = self._pending.popleft()
+                if self._reading_paused and len(self._pending) < self.MAX_PENDING_CHUNKS // 2:
+                    self._reading_paused = False
+                    self._transport.resume_reading()
+                await self._hub._process_packet_data(data, self._plug, self._writer)
+        except Exception as err:
+            address, port = self._peer[:2]
+            _LOGGER.error("Error processing packet from %s:%d: %s", address, port, err)
+            self._hub.statistics.errors += 1
+            self._pending.clear()
+            self._transport.close()
+
+    async def _disconnect(self) -> None:
+        """Finish queued work and remove the plug from the hub."""
+        worker = self._worker
+        if worker is not None and not worker.done():
+            await asyncio.wait((worker,))
+        await self._hub._disconnect_plug(self._plug, "provisioning_disconnect")
+        _LOGGER.debug("Provisioning connection cleanup finished for %s:%d", *self._peer[:2])
@@ -0,0 +1,134 @@
+"""
+Tenda Beli Smart Plug Integration - Hub Worker Thread.
+
+This module runs an event loop in a dedicated thread so the hub's socket
+servers, packet decoding and plug state live off the Home Assistant event
+loop. The hub forwards calls made from Home Assistant to this loop and
+delivers decoded state changes back to the Home Assistant loop.
+
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HubWorker:
+    """
+    A dedicated event loop running in a daemon thread.
+
+    The loop is created by ``start`` and closed by ``stop``; a stopped
+    worker can be started again with a fresh loop.
+    """
+
+    def __init__(self, name: str = "tendabeli-hub") -> None:
+        """
+        Initialize a worker that is not running yet.
+
+        Args:
+            name: Name of the worker thread
+        """
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """Get the worker's event loop while it is running."""
+        return self._loop
+
+    @property
+    def running(self) -> bool:
+        """Check whether the worker thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """
+        Start the worker thread if it is not running.
+
+        Returns:
+            The worker's event loop
+        """
+        if self.running:
+            return self._loop
+
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        self._loop = loop
+        self._thread = threading.Thread(target=run, name=self._name, daemon=True)
+        self._thread.start()
+        ready.wait()
+        _LOGGER.debug("Hub worker thread %s started", self._name)
+        return loop
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stop the worker loop and wait for the thread to finish.
+
+        This blocks, so call it from an executor when on an event loop.
+
+        Args:
+            timeout: Seconds to wait for the thread
+        """
+        loop, thread = self._loop, self._thread
+        if loop is None or thread is None:
+            return
+
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if thread.is_alive():
+            _LOGGER.warning("Hub worker thread %s did not stop in time", self._name)
+            return
+
+        loop.close()
+        self._loop = None
+        self._thread = None
+        _LOGGER.debug("Hub worker thread %s stopped", self._name)
+
+    def in_worker(self) -> bool:
+        """Check whether the caller is running on the worker loop."""
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def run(self, coro: Awaitable) -> Any:
+        """
+        Run a coroutine on the worker loop and wait for its result.
+
+        Args:
+            coro: Coroutine to run
+
+        Returns:
+            The coroutine's result
+        """
+        if self.in_worker():
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    async def call(self, func: Callable, *args: Any) -> Any:
+        """
+        Call a function on the worker loop and wait for its result.
+
+        Args:
+            func: Function to call
+            *args: Positional arguments for ``func``
+
+        Returns:
+            The function's result
+        """
+        if self.in_worker():
+            return func(*args)
+
+        async def call_on_worker() -> Any:
+            return func(*args)
+
+        return await self.run(call_on_worker())